@@ -20,12 +20,19 @@ class Settings(BaseSettings):
     models_dir: str = "./models"
     allowed_model_formats: list[str] = ["pkl", "pickle"]
     max_model_size_mb: int = 500
+    # How long /predict reuses a model's resolved active version before asking MLflow again
+    model_versions_ttl_seconds: float = 10.0
+    
+    # Preprocessing Settings
+    preprocessing_configs_ttl_seconds: float = 60.0
     
     # CORS
     cors_origins: list[str] = ["http://localhost:3000", "http://localhost:3001"]
     
     # Weather API - Using Open-Meteo (free, no API key required)
-    # No configuration needed for Open-Meteo
+    # Responses are cached per rounded location for these durations
+    weather_current_ttl_seconds: float = 300.0
+    weather_forecast_ttl_seconds: float = 1800.0
     
     # Supabase Settings - supports both formats
     supabase_url: str = ""
@@ -4,11 +4,14 @@ Water Level Forecasting with MLflow Model Registry
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import mlflow
+from mlflow.tracking import MlflowClient
 
 from app.config import get_settings
 from app.routers import models, predict, health, data, weather, preprocessing, training, evaluation
+from app.services.weather_service import WeatherService
 
 import os
 
@@ -20,6 +23,8 @@ async def lifespan(app: FastAPI):
     """Application lifespan - initialize MLflow on startup"""
     # Initialize MLflow
     mlflow.set_tracking_uri(settings.mlflow_tracking_uri)
+    # One registry client shared by the request handlers
+    app.state.mlflow_client = MlflowClient(tracking_uri=settings.mlflow_tracking_uri)
     
     # Create artifact directory if it doesn't exist
     os.makedirs(settings.mlflow_artifact_root, exist_ok=True)
@@ -32,6 +37,7 @@ async def lifespan(app: FastAPI):
     
     # Cleanup on shutdown
     print("Shutting down ML Service...")
+    await WeatherService.aclose()
 
 
 app = FastAPI(
@@ -39,6 +45,8 @@ app = FastAPI(
     description="ML Service for Water Level Forecasting with MLflow integration and Data Merging API",
     version="1.0.0",
     lifespan=lifespan,
+    # orjson encodes the float-heavy forecast and model-list payloads much faster
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -46,8 +54,10 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists instead of wildcards; browsers cache preflights for max_age seconds
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 # Include routers
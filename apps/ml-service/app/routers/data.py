@@ -1,11 +1,13 @@
 """
 Data Operations Router - Merge station measurements with weather data
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from supabase import Client
 import pandas as pd
+import pyarrow.csv as pacsv
 import io
+from typing import List
 import logging
 
 from app.schemas.data_schemas import (
@@ -75,21 +77,22 @@ async def merge_and_download(
     try:
         service = DataMergeService(supabase)
         
-        df_merged, stats = await service.merge_station_with_weather(
+        table_merged, stats = await service.merge_station_with_weather(
             start_date=request.start_date,
             end_date=request.end_date,
-            tolerance_hours=request.tolerance_hours
+            tolerance_hours=request.tolerance_hours,
+            as_arrow=True
         )
         
-        # Convert to CSV
-        stream = io.StringIO()
-        df_merged.to_csv(stream, index=False)
+        # Convert to CSV with Arrow's native writer
+        stream = io.BytesIO()
+        pacsv.write_csv(table_merged, stream)
         stream.seek(0)
         
         filename = f"merged_data_{request.start_date or 'all'}_{request.end_date or 'all'}.csv"
         
         return StreamingResponse(
-            io.BytesIO(stream.getvalue().encode()),
+            stream,
             media_type="text/csv",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}"
@@ -122,6 +125,37 @@ async def list_stations(supabase: Client = Depends(get_supabase_client)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/stations/measurements")
+async def get_stations_measurements(
+    station_ids: List[str] = Query(..., description="Station IDs to fetch"),
+    start_date: str = None,
+    end_date: str = None,
+    limit: int = 100,
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Get measurements for several stations in batched requests"""
+    try:
+        limit = min(limit, 1000)
+        
+        service = DataMergeService(supabase)
+        measurements = await service.get_station_measurements_bulk(
+            station_ids=station_ids,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit
+        )
+        
+        return {
+            "success": True,
+            "count": sum(len(rows) for rows in measurements.values()),
+            "measurements": measurements
+        }
+        
+    except Exception as e:
+        logger.error(f"Failed to fetch measurements: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/stations/{station_id}/measurements")
 async def get_station_measurements(
     station_id: str,
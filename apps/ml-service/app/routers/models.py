@@ -2,16 +2,21 @@
 Models Router - Upload and manage ML models with MLflow
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
+import threading
 import mlflow
 from mlflow.tracking import MlflowClient
+import hashlib
 import pickle
+import pickletools
 import os
 from supabase import create_client, Client
 
 from app.config import get_settings
+from app.routers.predict import invalidate_model_caches
 from app.schemas.training import ModelSyncRequest, ModelSyncResponse, ModelMetrics
 
 router = APIRouter()
@@ -20,6 +25,119 @@ settings = get_settings()
 # Initialize Supabase client
 supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
 
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Model versions fetched per registry search request
+VERSION_SEARCH_PAGE_SIZE = 10000
+
+
+def _latest_versions_by_name(client: MlflowClient) -> dict:
+    """Latest version of every registered model, from one paged search over all versions"""
+    latest = {}
+    page_token = None
+    while True:
+        # Newest first, so the first version seen for a name is its latest
+        page = client.search_model_versions(
+            max_results=VERSION_SEARCH_PAGE_SIZE,
+            order_by=["version_number DESC"],
+            page_token=page_token,
+        )
+        for v in page:
+            latest.setdefault(v.name, v)
+        page_token = page.token
+        if not page_token:
+            return latest
+
+
+# Uploads log through MLflow's process-wide fluent run state, so one at a time
+_upload_lock = threading.Lock()
+
+
+def _load_pickle_file(path: str):
+    """Unpickle a file from disk"""
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _validate_pickle_file(path: str) -> None:
+    """
+    Check a file is a well-formed pickle by walking its opcode stream
+
+    Nothing is deserialized, so no model objects or arrays get allocated.
+    Raises ValueError on non-pickle or truncated data.
+    """
+    with open(path, "rb") as f:
+        for _ in pickletools.genops(f):
+            pass
+
+
+def _register_uploaded_model(
+    client: MlflowClient,
+    model,
+    temp_path: str,
+    model_name: str,
+    description: str,
+    algorithm: str,
+    station_id: Optional[int],
+    sha256: str,
+) -> Tuple[str, int]:
+    """
+    Log an uploaded model to MLflow and register it (blocking; run in a worker thread)
+
+    Returns:
+        (run_id, latest registered version)
+    """
+    with _upload_lock:
+        # Create MLflow experiment if doesn't exist
+        experiment_name = f"swfm-{algorithm}"
+        experiment = mlflow.get_experiment_by_name(experiment_name)
+        if experiment is None:
+            mlflow.create_experiment(experiment_name)
+        mlflow.set_experiment(experiment_name)
+
+        # Start MLflow run and log model
+        with mlflow.start_run(run_name=f"{model_name}-upload") as run:
+            # Log parameters
+            mlflow.log_param("algorithm", algorithm)
+            mlflow.log_param("upload_source", "manual")
+            mlflow.log_param("sha256", sha256)
+            if station_id:
+                mlflow.log_param("station_id", station_id)
+
+            # Log the model artifact
+            mlflow.log_artifact(temp_path, artifact_path="model")
+
+            # Also log with sklearn flavor for easier loading
+            try:
+                mlflow.sklearn.log_model(
+                    model,
+                    artifact_path="sklearn_model",
+                    registered_model_name=model_name,
+                )
+            except Exception:
+                # If not sklearn compatible, use pyfunc
+                mlflow.pyfunc.log_model(
+                    artifact_path="pyfunc_model",
+                    python_model=None,
+                    artifacts={"model": temp_path},
+                    registered_model_name=model_name,
+                )
+
+            run_id = run.info.run_id
+
+    # Get the registered model version
+    versions = client.search_model_versions(
+        f"name='{model_name}'", order_by=["version_number DESC"], max_results=1
+    )
+    latest_version = int(versions[0].version) if versions else 1
+
+    # Update model description
+    if description:
+        client.update_registered_model(name=model_name, description=description)
+
+    return run_id, latest_version
+
 
 class ModelUploadResponse(BaseModel):
     success: bool
@@ -48,6 +166,7 @@ class ModelListResponse(BaseModel):
 
 @router.post("/upload", response_model=ModelUploadResponse)
 async def upload_model(
+    request: Request,
     file: UploadFile = File(...),
     model_name: str = Form(...),
     description: str = Form(default=""),
@@ -67,78 +186,46 @@ async def upload_model(
     if not file.filename.endswith((".pkl", ".pickle")):
         raise HTTPException(status_code=400, detail="Only PKL/Pickle files are allowed")
 
-    # Validate file size
-    file_size = 0
-    content = await file.read()
-    file_size = len(content) / (1024 * 1024)  # MB
-
-    if file_size > settings.max_model_size_mb:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size exceeds {settings.max_model_size_mb}MB limit",
-        )
-
-    # Reset file position
-    await file.seek(0)
-
-    try:
-        # Validate it's a valid pickle file
-        model = pickle.loads(content)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid pickle file: {str(e)}")
-
     # Save model temporarily
     temp_path = os.path.join(settings.models_dir, f"temp_{file.filename}")
     os.makedirs(settings.models_dir, exist_ok=True)
 
-    with open(temp_path, "wb") as f:
-        f.write(content)
-
     try:
-        # Create MLflow experiment if doesn't exist
-        experiment_name = f"swfm-{algorithm}"
-        experiment = mlflow.get_experiment_by_name(experiment_name)
-        if experiment is None:
-            mlflow.create_experiment(experiment_name)
-        mlflow.set_experiment(experiment_name)
-
-        # Start MLflow run and log model
-        with mlflow.start_run(run_name=f"{model_name}-upload") as run:
-            # Log parameters
-            mlflow.log_param("algorithm", algorithm)
-            mlflow.log_param("upload_source", "manual")
-            if station_id:
-                mlflow.log_param("station_id", station_id)
-
-            # Log the model artifact
-            mlflow.log_artifact(temp_path, artifact_path="model")
+        # Stream the upload to disk, enforcing the size limit and hashing as it arrives
+        max_size = settings.max_model_size_mb * 1024 * 1024
+        file_size = 0
+        hasher = hashlib.sha256()
+        with open(temp_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > max_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File size exceeds {settings.max_model_size_mb}MB limit",
+                    )
+                hasher.update(chunk)
+                f.write(chunk)
 
-            # Also log with sklearn flavor for easier loading
-            try:
-                mlflow.sklearn.log_model(
-                    model,
-                    artifact_path="sklearn_model",
-                    registered_model_name=model_name,
-                )
-            except Exception:
-                # If not sklearn compatible, use pyfunc
-                mlflow.pyfunc.log_model(
-                    artifact_path="pyfunc_model",
-                    python_model=None,
-                    artifacts={"model": temp_path},
-                    registered_model_name=model_name,
-                )
-
-            run_id = run.info.run_id
-
-        # Get the registered model version
-        client = MlflowClient()
-        versions = client.search_model_versions(f"name='{model_name}'")
-        latest_version = max([int(v.version) for v in versions]) if versions else 1
-
-        # Update model description
-        if description:
-            client.update_registered_model(name=model_name, description=description)
+        try:
+            # Reject non-pickle bytes with a cheap opcode scan, then unpickle before
+            # anything is written to MLflow (CPU-bound, so off the event loop)
+            await asyncio.to_thread(_validate_pickle_file, temp_path)
+            model = await asyncio.to_thread(_load_pickle_file, temp_path)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid pickle file: {str(e)}")
+
+        # MLflow logging and registration block on disk and the tracking store
+        run_id, latest_version = await asyncio.to_thread(
+            _register_uploaded_model,
+            request.app.state.mlflow_client,
+            model,
+            temp_path,
+            model_name,
+            description,
+            algorithm,
+            station_id,
+            hasher.hexdigest(),
+        )
 
         return ModelUploadResponse(
             success=True,
@@ -148,6 +235,8 @@ async def upload_model(
             message=f"Model '{model_name}' v{latest_version} registered successfully",
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to register model: {str(e)}"
@@ -159,19 +248,19 @@ async def upload_model(
 
 
 @router.get("", response_model=ModelListResponse)
-async def list_models():
+async def list_models(request: Request):
     """List all registered models with metrics from MLflow"""
-    client = MlflowClient()
+    client = request.app.state.mlflow_client
 
     try:
         registered_models = client.search_registered_models()
+        latest_versions = _latest_versions_by_name(client)
         models = []
 
         for rm in registered_models:
             # Get latest version
-            versions = client.search_model_versions(f"name='{rm.name}'")
-            if versions:
-                latest = max(versions, key=lambda v: int(v.version))
+            latest = latest_versions.get(rm.name)
+            if latest is not None:
                 
                 # Get metrics and params from the run
                 try:
@@ -228,12 +317,14 @@ async def list_models():
 
 
 @router.get("/{model_name}/versions")
-async def get_model_versions(model_name: str):
+async def get_model_versions(model_name: str, request: Request):
     """Get all versions of a specific model"""
-    client = MlflowClient()
+    client = request.app.state.mlflow_client
 
     try:
-        versions = client.search_model_versions(f"name='{model_name}'")
+        versions = client.search_model_versions(
+            f"name='{model_name}'", order_by=["version_number DESC"]
+        )
 
         if not versions:
             raise HTTPException(
@@ -250,7 +341,7 @@ async def get_model_versions(model_name: str):
                     "status": v.status,
                     "created_at": str(v.creation_timestamp),
                 }
-                for v in sorted(versions, key=lambda x: int(x.version), reverse=True)
+                for v in versions
             ],
         }
 
@@ -263,7 +354,7 @@ async def get_model_versions(model_name: str):
 
 
 @router.post("/{model_name}/promote/{version}")
-async def promote_model(model_name: str, version: str, stage: str = "Production"):
+async def promote_model(request: Request, model_name: str, version: str, stage: str = "Production"):
     """Promote a model version to a stage (Staging, Production, Archived)"""
     valid_stages = ["Staging", "Production", "Archived", "None"]
     if stage not in valid_stages:
@@ -271,12 +362,13 @@ async def promote_model(model_name: str, version: str, stage: str = "Production"
             status_code=400, detail=f"Invalid stage. Must be one of: {valid_stages}"
         )
 
-    client = MlflowClient()
+    client = request.app.state.mlflow_client
 
     try:
         client.transition_model_version_stage(
             name=model_name, version=version, stage=stage
         )
+        invalidate_model_caches(model_name)
 
         return {
             "success": True,
@@ -290,9 +382,9 @@ async def promote_model(model_name: str, version: str, stage: str = "Production"
 
 
 @router.delete("/{model_name}")
-async def delete_model(model_name: str):
+async def delete_model(model_name: str, request: Request):
     """Delete a registered model and all its versions"""
-    client = MlflowClient()
+    client = request.app.state.mlflow_client
 
     try:
         # First archive all versions
@@ -305,6 +397,7 @@ async def delete_model(model_name: str):
 
         # Delete the model
         client.delete_registered_model(name=model_name)
+        invalidate_model_caches(model_name)
 
         return {
             "success": True,
@@ -316,7 +409,7 @@ async def delete_model(model_name: str):
 
 
 @router.post("/sync-from-db", response_model=ModelSyncResponse)
-async def sync_model_from_database(request: ModelSyncRequest):
+async def sync_model_from_database(request: ModelSyncRequest, http_request: Request):
     """
     Sync a trained model from Supabase to MLflow Model Registry.
     
@@ -337,7 +430,7 @@ async def sync_model_from_database(request: ModelSyncRequest):
     }
     ```
     """
-    client = MlflowClient()
+    client = http_request.app.state.mlflow_client
     
     try:
         # 1. Fetch model performance from Supabase
@@ -2,13 +2,21 @@
 Prediction Router - Load models and make predictions
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import binascii
+import threading
+import time
 import mlflow
 from mlflow.tracking import MlflowClient
 import numpy as np
 import pandas as pd
+from sklearn.linear_model import LinearRegression, Ridge
 from datetime import datetime, timedelta
 from supabase import create_client, Client
 
@@ -21,6 +29,83 @@ settings = get_settings()
 # Initialize Supabase client
 supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
 
+# Stations forecast in parallel by one batch request
+MAX_BATCH_WORKERS = 8
+
+# Random source for the demo input and mock-prediction fallbacks
+RNG = np.random.default_rng()
+
+# Loaded models by (model_name, version), least recently used first. A registered
+# version never changes, so entries only leave the cache when it is full.
+MAX_CACHED_MODELS = 32
+_model_cache: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+_model_cache_lock = threading.Lock()
+
+# model_name -> (resolved_at, active version or None); promotions and deletes through
+# /models invalidate an entry, new versions show up once it expires
+_active_version_cache: Dict[str, Tuple[float, Any]] = {}
+
+
+def _mock_predictions(base_value: float, num_points: int) -> np.ndarray:
+    """Random walk from base_value, used when a model can't produce predictions"""
+    # float32 and accumulated in place: one buffer, half the bytes of float64
+    noise = RNG.standard_normal(num_points, dtype=np.float32)
+    noise *= np.float32(0.1)
+    np.cumsum(noise, out=noise)
+    return base_value + noise
+
+
+def _get_active_version(client: MlflowClient, model_name: str):
+    """Production version of a model, else its latest version (None if it has none), cached briefly"""
+    cached = _active_version_cache.get(model_name)
+    if cached is not None and time.monotonic() - cached[0] < settings.model_versions_ttl_seconds:
+        return cached[1]
+
+    # Newest first; the registry can't filter on stage, so that is checked here
+    versions = client.search_model_versions(
+        f"name='{model_name}'", order_by=["version_number DESC"]
+    )
+    active_version = None
+    if versions:
+        # Prefer production stage, then latest version
+        active_version = next(
+            (v for v in versions if v.current_stage == "Production"), versions[0]
+        )
+
+    _active_version_cache[model_name] = (time.monotonic(), active_version)
+    return active_version
+
+
+def invalidate_model_caches(model_name: str) -> None:
+    """Forget a model's cached active version and loaded versions (after promote/delete)"""
+    _active_version_cache.pop(model_name, None)
+    with _model_cache_lock:
+        for key in [key for key in _model_cache if key[0] == model_name]:
+            del _model_cache[key]
+
+
+def _load_model(model_name: str, version: str):
+    """Load a registered model version (sklearn flavor, else pyfunc), memoized in-process"""
+    key = (model_name, str(version))
+    with _model_cache_lock:
+        model = _model_cache.get(key)
+        if model is not None:
+            _model_cache.move_to_end(key)
+            return model
+
+    model_uri = f"models:/{model_name}/{version}"
+    try:
+        model = mlflow.sklearn.load_model(model_uri)
+    except Exception:
+        model = mlflow.pyfunc.load_model(model_uri)
+
+    with _model_cache_lock:
+        _model_cache[key] = model
+        _model_cache.move_to_end(key)
+        while len(_model_cache) > MAX_CACHED_MODELS:
+            _model_cache.popitem(last=False)
+    return model
+
 
 class GenerateForecastRequest(BaseModel):
     """Request to generate forecasts for a station"""
@@ -40,10 +125,28 @@ class GenerateForecastResponse(BaseModel):
     forecasts: List[dict]
 
 
+class BatchPredictionRequest(BaseModel):
+    """Request to generate forecasts for several stations at once"""
+
+    station_ids: List[int]
+    horizons_minutes: List[int] = [15, 30, 45, 60]  # Prediction horizons
+    save_to_db: bool = True  # Save forecasts to database
+
+
+class BatchForecastResponse(BaseModel):
+    """Response from batch forecast generation (one result per station)"""
+
+    success: bool
+    message: str
+    results: List[GenerateForecastResponse]
+
+
 class PredictionRequest(BaseModel):
     station_id: int
     horizon_hours: int = 24  # 6-24 hours short-term, 72-168 hours medium-term
     input_data: Optional[list[float]] = None  # Historical water levels
+    # Alternative to input_data for long histories: base64 of little-endian float32 values
+    input_data_b64: Optional[str] = None
 
     class Config:
         json_schema_extra = {
@@ -72,317 +175,366 @@ class PredictionResponse(BaseModel):
     forecasts: list[ForecastPoint]
 
 
-@router.post("/generate-forecasts", response_model=GenerateForecastResponse)
-async def generate_forecasts_endpoint(request: GenerateForecastRequest):
+def _load_horizon_model(client: MlflowClient, horizon: int, model_cache: Dict[int, Any]):
     """
-    Generate forecasts using trained models and save to database
+    Find and load the unified model and scaler for a forecast horizon
 
-    This endpoint:
-    1. Fetches the latest data for the station(s)
-    2. Preprocesses the data (creates features)
-    3. Loads the best model for each horizon
-    4. Generates predictions
-    5. Saves forecasts to the 'forecasts' table in Supabase
+    Results are memoized in model_cache (keyed by horizon), so a batch of
+    stations loads each model once.
 
-    Example:
-    ```json
-    {
-        "station_id": 1,
-        "horizons_minutes": [15, 30, 45, 60],
-        "save_to_db": true
-    }
-    ```
+    Returns:
+        (model_name, version, model, scaler), or None if no model is registered
     """
+    if horizon in model_cache:
+        return model_cache[horizon]
+
+    # Use unified models (trained on all stations with station_id as feature)
+    # Try ridge first, then linear
+    model_name = None
+    for model_type in ["ridge", "linear"]:
+        candidate_name = f"swfm-{model_type}-unified-{horizon}min"
+        try:
+            versions = client.search_registered_models(
+                f"name='{candidate_name}'"
+            )
+            if versions:
+                model_name = candidate_name
+                break
+        except:
+            continue
+
+    if not model_name:
+        print(f"   ⚠️  No unified model found for {horizon}-min horizon")
+        print(f"   💡 Please train models first at /models page")
+        model_cache[horizon] = None
+        return None
+
+    # Get latest version
+    model_versions = client.search_model_versions(
+        f"name='{model_name}'", order_by=["version_number DESC"], max_results=1
+    )
+    if not model_versions:
+        print(f"   ⚠️  Model {model_name} has no versions, skipping...")
+        model_cache[horizon] = None
+        return None
+
+    latest_version = model_versions[0]
+    model = _load_model(model_name, latest_version.version)
+
+    print(f"   ✓ Loaded model: {model_name} v{latest_version.version}")
+
+    # Load scaler from run artifacts
+    run_id = latest_version.run_id
+    scaler = None
     try:
-        preprocessing_service = PreprocessingService()
-        client = MlflowClient()
+        import joblib
 
-        # Get station info if specific station requested
-        if request.station_id is not None:
-            # Check if station is excluded
-            if request.station_id in [1, 7]:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Station {request.station_id} is excluded from predictions due to data quality issues",
-                )
+        scaler_path = client.download_artifacts(
+            run_id, "preprocessing/scaler.pkl"
+        )
+        scaler = joblib.load(scaler_path)
+        print(f"   ✓ Loaded scaler from run {run_id[:8]}")
+    except Exception as e:
+        print(f"   ⚠️  No scaler found for this model (older model?): {e}")
 
-            station_info = (
-                supabase.table("stations")
-                .select("*")
-                .eq("id", request.station_id)
-                .execute()
-            )
-            if not station_info.data:
-                raise HTTPException(
-                    status_code=404, detail=f"Station {request.station_id} not found"
-                )
-            station_name = station_info.data[0]["name"]
-        else:
-            station_name = "All Stations (excluding stations 1 & 7)"
+    model_cache[horizon] = (model_name, latest_version.version, model, scaler)
+    return model_cache[horizon]
 
-        print(f"\n{'=' * 70}")
-        print(f"🔮 GENERATING FORECASTS")
-        print(f"📍 Station: {station_name}")
-        print(f"⏱️  Horizons: {request.horizons_minutes} minutes")
-        print(f"🎯 Using unified models (station_id as feature)")
-        print(f"{'=' * 70}\n")
 
-        # For unified model, always fetch data for the specific station (or all if None)
-        # but prepare features including station_id
-        print("📊 Fetching and preprocessing latest data...")
-        X_latest, feature_names, scaler_info = (
-            preprocessing_service.prepare_latest_data_for_prediction(
-                station_id=request.station_id
-            )
-        )
+def _generate_station_forecasts(
+    station_id: Optional[int],
+    horizons_minutes: List[int],
+    save_to_db: bool,
+    preprocessing_service: PreprocessingService,
+    client: MlflowClient,
+    model_cache: Dict[int, Any],
+) -> Tuple[str, List[dict]]:
+    """
+    Run the recursive multi-horizon forecast for one station (None = all stations)
 
-        if X_latest is None or len(X_latest) == 0:
+    Returns:
+        (station_name, forecast records)
+    """
+    # Get station info if specific station requested
+    if station_id is not None:
+        # Check if station is excluded
+        if station_id in [1, 7]:
             raise HTTPException(
                 status_code=400,
-                detail=f"No recent data available for {'station ' + str(request.station_id) if request.station_id else 'prediction'}. Please ensure there is data from the last 24 hours.",
+                detail=f"Station {station_id} is excluded from predictions due to data quality issues",
             )
 
-        print(
-            f"   ✓ Features prepared: {len(feature_names)} features, {len(X_latest)} samples"
+        station_info = (
+            supabase.table("stations")
+            .select("*")
+            .eq("id", station_id)
+            .execute()
+        )
+        if not station_info.data:
+            raise HTTPException(
+                status_code=404, detail=f"Station {station_id} not found"
+            )
+        station_name = station_info.data[0]["name"]
+    else:
+        station_name = "All Stations (excluding stations 1 & 7)"
+
+    print(f"\n{'=' * 70}")
+    print(f"🔮 GENERATING FORECASTS")
+    print(f"📍 Station: {station_name}")
+    print(f"⏱️  Horizons: {horizons_minutes} minutes")
+    print(f"🎯 Using unified models (station_id as feature)")
+    print(f"{'=' * 70}\n")
+
+    # For unified model, always fetch data for the specific station (or all if None)
+    # but prepare features including station_id
+    print("📊 Fetching and preprocessing latest data...")
+    X_latest, feature_names, scaler_info = (
+        preprocessing_service.prepare_latest_data_for_prediction(
+            station_id=station_id
+        )
+    )
+
+    if X_latest is None or len(X_latest) == 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No recent data available for {'station ' + str(station_id) if station_id else 'prediction'}. Please ensure there is data from the last 24 hours.",
         )
 
-        all_forecasts = []
-        forecast_date = datetime.utcnow()
+    print(
+        f"   ✓ Features prepared: {len(feature_names)} features, {len(X_latest)} samples"
+    )
+
+    all_forecasts = []
+    forecast_date = datetime.utcnow()
 
-        # RECURSIVE PREDICTION: Use each prediction as input for the next horizon
-        # This implements the ideal approach: predict 15min → use it to predict 30min → use that for 45min, etc.
+    # RECURSIVE PREDICTION: Use each prediction as input for the next horizon
+    # This implements the ideal approach: predict 15min → use it to predict 30min → use that for 45min, etc.
+    print(
+        f"\n🔮 Starting RECURSIVE prediction for horizons: {horizons_minutes}"
+    )
+    print(f"   💡 Each prediction will be used as input for the next horizon")
+
+    # Keep track of the current state (updated after each prediction)
+    X_current = X_latest.copy()
+    previous_prediction = None
+
+    # Generate forecasts for each horizon using UNIFIED models
+    for horizon_idx, horizon in enumerate(horizons_minutes):
         print(
-            f"\n🔮 Starting RECURSIVE prediction for horizons: {request.horizons_minutes}"
+            f"\n🎯 Generating forecast for {horizon}-minute horizon (step {horizon_idx + 1}/{len(horizons_minutes)})..."
         )
-        print(f"   💡 Each prediction will be used as input for the next horizon")
-
-        # Keep track of the current state (updated after each prediction)
-        X_current = X_latest.copy()
-        previous_prediction = None
 
-        # Generate forecasts for each horizon using UNIFIED models
-        for horizon_idx, horizon in enumerate(request.horizons_minutes):
+        # RECURSIVE UPDATE: If we have a previous prediction, update features
+        if previous_prediction is not None:
             print(
-                f"\n🎯 Generating forecast for {horizon}-minute horizon (step {horizon_idx + 1}/{len(request.horizons_minutes)})..."
+                f"   🔄 Updating features with previous prediction: {previous_prediction:.2f}cm"
             )
 
-            # RECURSIVE UPDATE: If we have a previous prediction, update features
-            if previous_prediction is not None:
+            # Update water_level with the predicted value (this becomes the "current" water level for next prediction)
+            if "water_level" in X_current.columns:
+                old_value = X_current["water_level"].values[0]
+                X_current["water_level"] = previous_prediction
                 print(
-                    f"   🔄 Updating features with previous prediction: {previous_prediction:.2f}cm"
+                    f"      • water_level: {old_value:.2f} → {previous_prediction:.2f}cm"
                 )
 
-                # Update water_level with the predicted value (this becomes the "current" water level for next prediction)
-                if "water_level" in X_current.columns:
-                    old_value = X_current["water_level"].values[0]
-                    X_current["water_level"] = previous_prediction
-                    print(
-                        f"      • water_level: {old_value:.2f} → {previous_prediction:.2f}cm"
-                    )
+            # Shift lag features (simplified approach - in production you'd need proper time-series lag handling)
+            # water_level_lag_1h should become the previous water_level
+            if "water_level_lag_1h" in X_current.columns:
+                X_current["water_level_lag_1h"] = previous_prediction
+                print(
+                    f"      • water_level_lag_1h updated to {previous_prediction:.2f}cm"
+                )
 
-                # Shift lag features (simplified approach - in production you'd need proper time-series lag handling)
-                # water_level_lag_1h should become the previous water_level
-                if "water_level_lag_1h" in X_current.columns:
-                    X_current["water_level_lag_1h"] = previous_prediction
+        # Load the model and scaler
+        try:
+            loaded = _load_horizon_model(client, horizon, model_cache)
+            if loaded is None:
+                continue
+            model_name, model_version, model, scaler = loaded
+
+            # Match features to what the model expects
+            if hasattr(model, "feature_names_in_"):
+                expected_features = list(model.feature_names_in_)
+                # Filter X_current to only include features the model was trained with
+                missing_features = [
+                    f for f in expected_features if f not in X_current.columns
+                ]
+                extra_features = [
+                    f for f in X_current.columns if f not in expected_features
+                ]
+
+                if missing_features:
                     print(
-                        f"      • water_level_lag_1h updated to {previous_prediction:.2f}cm"
+                        f"   ⚠️  WARNING: Missing {len(missing_features)} features: {missing_features[:5]}"
                     )
-
-            # Use unified models (trained on all stations with station_id as feature)
-            # Try ridge first, then linear
-            model_name = None
-            for model_type in ["ridge", "linear"]:
-                candidate_name = f"swfm-{model_type}-unified-{horizon}min"
-                try:
-                    versions = client.search_registered_models(
-                        f"name='{candidate_name}'"
-                    )
-                    if versions:
-                        model_name = candidate_name
-                        break
-                except:
-                    continue
-
-            if not model_name:
-                print(f"   ⚠️  No unified model found for {horizon}-min horizon")
-                print(f"   💡 Please train models first at /models page")
-                continue
-
-            # Load the model and scaler
-            try:
-                model_versions = client.search_model_versions(f"name='{model_name}'")
-                if not model_versions:
-                    print(f"   ⚠️  Model {model_name} has no versions, skipping...")
-                    continue
-
-                # Get latest version
-                latest_version = max(model_versions, key=lambda x: int(x.version))
-                model_uri = f"models:/{model_name}/{latest_version.version}"
-                model = mlflow.sklearn.load_model(model_uri)
-
-                print(f"   ✓ Loaded model: {model_name} v{latest_version.version}")
-
-                # Load scaler from run artifacts
-                run_id = latest_version.run_id
-                scaler = None
-                try:
-                    import joblib
-                    import tempfile
-                    import os
-
-                    scaler_path = client.download_artifacts(
-                        run_id, "preprocessing/scaler.pkl"
+                    print(
+                        f"   🔧 Adding missing features with mean value from scaler"
                     )
-                    scaler = joblib.load(scaler_path)
-                    print(f"   ✓ Loaded scaler from run {run_id[:8]}")
-                except Exception as e:
-                    print(f"   ⚠️  No scaler found for this model (older model?): {e}")
-
-                # Match features to what the model expects
-                if hasattr(model, "feature_names_in_"):
-                    expected_features = list(model.feature_names_in_)
-                    # Filter X_current to only include features the model was trained with
-                    missing_features = [
-                        f for f in expected_features if f not in X_current.columns
-                    ]
-                    extra_features = [
-                        f for f in X_current.columns if f not in expected_features
-                    ]
-
-                    if missing_features:
-                        print(
-                            f"   ⚠️  WARNING: Missing {len(missing_features)} features: {missing_features[:5]}"
-                        )
-                        print(
-                            f"   🔧 Adding missing features with mean value from scaler"
-                        )
-                        # Add missing features with scaler's mean (not 0!)
-                        # This is critical: filling with 0 before scaling causes extreme values
-                        for i, feat in enumerate(missing_features):
-                            if scaler is not None and hasattr(scaler, "mean_"):
-                                # Find the index of this feature in the scaler
-                                if feat in feature_names:
-                                    feat_idx = feature_names.index(feat)
-                                    if feat_idx < len(scaler.mean_):
-                                        # Use the training mean for this feature
-                                        X_current[feat] = scaler.mean_[feat_idx]
-                                        print(
-                                            f"      • {feat}: using training mean={scaler.mean_[feat_idx]:.2f}"
-                                        )
-                                    else:
-                                        X_current[feat] = 0
+                    # Add missing features with scaler's mean (not 0!)
+                    # This is critical: filling with 0 before scaling causes extreme values
+                    for i, feat in enumerate(missing_features):
+                        if scaler is not None and hasattr(scaler, "mean_"):
+                            # Find the index of this feature in the scaler
+                            if feat in feature_names:
+                                feat_idx = feature_names.index(feat)
+                                if feat_idx < len(scaler.mean_):
+                                    # Use the training mean for this feature
+                                    X_current[feat] = scaler.mean_[feat_idx]
+                                    print(
+                                        f"      • {feat}: using training mean={scaler.mean_[feat_idx]:.2f}"
+                                    )
                                 else:
                                     X_current[feat] = 0
                             else:
                                 X_current[feat] = 0
+                        else:
+                            X_current[feat] = 0
 
-                    if extra_features:
-                        print(
-                            f"   ℹ️  Removing {len(extra_features)} extra features: {extra_features[:5]}"
-                        )
+                if extra_features:
+                    print(
+                        f"   ℹ️  Removing {len(extra_features)} extra features: {extra_features[:5]}"
+                    )
 
-                    # Reorder columns to match model's expected feature order
-                    X_current = X_current[expected_features]
+                # Reorder columns to match model's expected feature order
+                X_current = X_current[expected_features]
 
-                # Apply scaler to features (CRITICAL: model was trained on scaled features)
-                if scaler is not None:
-                    # Store original values for debugging
-                    X_original = X_current.copy()
+            # Apply scaler to features (CRITICAL: model was trained on scaled features)
+            if scaler is not None:
+                # Store original values for debugging
+                X_original = X_current.copy()
 
-                    X_scaled = scaler.transform(X_current)
-                    X_scaled_df = pd.DataFrame(
-                        X_scaled, columns=X_current.columns, index=X_current.index
+                X_scaled = scaler.transform(X_current)
+                X_scaled_df = pd.DataFrame(
+                    X_scaled, columns=X_current.columns, index=X_current.index
+                )
+                print(f"   ✓ Applied StandardScaler to features")
+
+                # Check for extreme scaled values (which indicate data issues)
+                extreme_threshold = 10  # More than 10 std deviations is suspicious
+                extreme_features = []
+                for col in X_scaled_df.columns:
+                    val = X_scaled_df[col].values[0]
+                    if abs(val) > extreme_threshold:
+                        orig_val = X_original[col].values[0]
+                        extreme_features.append((col, orig_val, val))
+
+                if extreme_features:
+                    print(
+                        f"   ⚠️  WARNING: Found {len(extreme_features)} features with extreme scaled values:"
                     )
-                    print(f"   ✓ Applied StandardScaler to features")
-
-                    # Check for extreme scaled values (which indicate data issues)
-                    extreme_threshold = 10  # More than 10 std deviations is suspicious
-                    extreme_features = []
-                    for col in X_scaled_df.columns:
-                        val = X_scaled_df[col].values[0]
-                        if abs(val) > extreme_threshold:
-                            orig_val = X_original[col].values[0]
-                            extreme_features.append((col, orig_val, val))
-
-                    if extreme_features:
-                        print(
-                            f"   ⚠️  WARNING: Found {len(extreme_features)} features with extreme scaled values:"
-                        )
-                        for col, orig, scaled in extreme_features[:5]:
-                            print(
-                                f"      • {col}: original={orig:.2f}, scaled={scaled:.2f} ({scaled:.1f} std)"
-                            )
+                    for col, orig, scaled in extreme_features[:5]:
                         print(
-                            f"   💡 This may indicate missing/incorrect data that was filled with defaults"
+                            f"      • {col}: original={orig:.2f}, scaled={scaled:.2f} ({scaled:.1f} std)"
                         )
-                else:
                     print(
-                        f"   ⚠️  WARNING: No scaler available, using unscaled features (may cause poor predictions)"
+                        f"   💡 This may indicate missing/incorrect data that was filled with defaults"
                     )
-                    X_scaled_df = X_current
+            else:
+                print(
+                    f"   ⚠️  WARNING: No scaler available, using unscaled features (may cause poor predictions)"
+                )
+                X_scaled_df = X_current
 
-                # Calculate target datetime
-                target_date = forecast_date + timedelta(minutes=horizon)
+            # Calculate target datetime
+            target_date = forecast_date + timedelta(minutes=horizon)
 
-                # Make predictions (unified model predicts for all rows in X_scaled_df)
-                predictions = model.predict(X_scaled_df)
+            # Make predictions (unified model predicts for all rows in X_scaled_df)
+            predictions = model.predict(X_scaled_df)
 
-                # Single station forecast (unified model with station_id as feature)
-                predicted_value = float(np.mean(predictions))
+            # Single station forecast (unified model with station_id as feature)
+            predicted_value = float(np.mean(predictions))
 
-                # Store this prediction for the next iteration (RECURSIVE KEY STEP)
-                previous_prediction = predicted_value
+            # Store this prediction for the next iteration (RECURSIVE KEY STEP)
+            previous_prediction = predicted_value
 
-                forecast_record = {
-                    "station_id": request.station_id,
-                    "forecast_date": forecast_date.isoformat(),
-                    "target_date": target_date.isoformat(),
-                    "water_level": round(predicted_value, 3),
-                }
-                all_forecasts.append(forecast_record)
+            forecast_record = {
+                "station_id": station_id,
+                "forecast_date": forecast_date.isoformat(),
+                "target_date": target_date.isoformat(),
+                "water_level": round(predicted_value, 3),
+            }
+            all_forecasts.append(forecast_record)
 
+            print(
+                f"   ✓ Forecast generated: {predicted_value:.2f}cm ({predicted_value / 100:.2f}m) at {target_date.strftime('%Y-%m-%d %H:%M')}"
+            )
+            if horizon_idx < len(horizons_minutes) - 1:
                 print(
-                    f"   ✓ Forecast generated: {predicted_value:.2f}cm ({predicted_value / 100:.2f}m) at {target_date.strftime('%Y-%m-%d %H:%M')}"
+                    f"   📊 This prediction will be used as input for the next {horizons_minutes[horizon_idx + 1]}-min forecast"
                 )
-                if horizon_idx < len(request.horizons_minutes) - 1:
-                    print(
-                        f"   📊 This prediction will be used as input for the next {request.horizons_minutes[horizon_idx + 1]}-min forecast"
-                    )
 
-            except Exception as e:
-                print(f"   ⚠️  Error loading/using model: {str(e)}")
-                continue
+        except Exception as e:
+            print(f"   ⚠️  Error loading/using model: {str(e)}")
+            continue
 
-        # Check if any forecasts were generated
-        if len(all_forecasts) == 0:
-            raise HTTPException(
-                status_code=400,
-                detail="No forecasts generated. Please train unified models first at /models page.",
-            )
+    # Check if any forecasts were generated
+    if len(all_forecasts) == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="No forecasts generated. Please train unified models first at /models page.",
+        )
 
-        # Save to database
-        if request.save_to_db and len(all_forecasts) > 0:
-            print(f"\n💾 Saving {len(all_forecasts)} forecasts to database...")
-            try:
-                # Delete old forecasts for this station (keep last 7 days)
-                cutoff_date = (datetime.utcnow() - timedelta(days=7)).isoformat()
+    # Save to database
+    if save_to_db and len(all_forecasts) > 0:
+        print(f"\n💾 Saving {len(all_forecasts)} forecasts to database...")
+        try:
+            # Delete old forecasts for this station (keep last 7 days)
+            cutoff_date = (datetime.utcnow() - timedelta(days=7)).isoformat()
+
+            # Clear old forecasts for this specific station
+            supabase.table("forecasts").delete().eq(
+                "station_id", station_id
+            ).lt("forecast_date", cutoff_date).execute()
 
-                # Clear old forecasts for this specific station
-                supabase.table("forecasts").delete().eq(
-                    "station_id", request.station_id
-                ).lt("forecast_date", cutoff_date).execute()
+            # Insert new forecasts
+            response = supabase.table("forecasts").insert(all_forecasts).execute()
 
-                # Insert new forecasts
-                response = supabase.table("forecasts").insert(all_forecasts).execute()
+            if response.data:
+                print(f"   ✓ Forecasts saved successfully")
+            else:
+                print(f"   ⚠️  Warning: No data returned from insert")
 
-                if response.data:
-                    print(f"   ✓ Forecasts saved successfully")
-                else:
-                    print(f"   ⚠️  Warning: No data returned from insert")
+        except Exception as e:
+            print(f"   ⚠️  Error saving forecasts: {str(e)}")
+            # Don't fail the request if save fails
 
-            except Exception as e:
-                print(f"   ⚠️  Error saving forecasts: {str(e)}")
-                # Don't fail the request if save fails
+    return station_name, all_forecasts
+
+
+@router.post("/generate-forecasts", response_model=GenerateForecastResponse)
+async def generate_forecasts_endpoint(request: GenerateForecastRequest, http_request: Request):
+    """
+    Generate forecasts using trained models and save to database
+
+    This endpoint:
+    1. Fetches the latest data for the station(s)
+    2. Preprocesses the data (creates features)
+    3. Loads the best model for each horizon
+    4. Generates predictions
+    5. Saves forecasts to the 'forecasts' table in Supabase
+
+    Example:
+    ```json
+    {
+        "station_id": 1,
+        "horizons_minutes": [15, 30, 45, 60],
+        "save_to_db": true
+    }
+    ```
+    """
+    try:
+        preprocessing_service = PreprocessingService()
+        client = http_request.app.state.mlflow_client
+
+        station_name, all_forecasts = _generate_station_forecasts(
+            request.station_id,
+            request.horizons_minutes,
+            request.save_to_db,
+            preprocessing_service,
+            client,
+            model_cache={},
+        )
 
         print(f"\n{'=' * 70}")
         print(f"✅ FORECAST GENERATION COMPLETE")
@@ -408,55 +560,128 @@ async def generate_forecasts_endpoint(request: GenerateForecastRequest):
         )
 
 
+@router.post("/generate-forecasts-batch", response_model=BatchForecastResponse)
+async def generate_forecasts_batch_endpoint(request: BatchPredictionRequest, http_request: Request):
+    """
+    Generate and save forecasts for several stations in one request
+
+    Each horizon's model and scaler are loaded once and shared by all
+    stations. A station that fails is reported in its own result without
+    failing the batch.
+
+    Example:
+    ```json
+    {
+        "station_ids": [2, 3, 4],
+        "horizons_minutes": [15, 30, 45, 60],
+        "save_to_db": true
+    }
+    ```
+    """
+    preprocessing_service = PreprocessingService()
+    client = http_request.app.state.mlflow_client
+    model_cache: Dict[int, Any] = {}
+
+    def forecast_station(station_id: int) -> GenerateForecastResponse:
+        try:
+            station_name, all_forecasts = _generate_station_forecasts(
+                station_id,
+                request.horizons_minutes,
+                request.save_to_db,
+                preprocessing_service,
+                client,
+                model_cache,
+            )
+            return GenerateForecastResponse(
+                success=True,
+                message=f"Generated {len(all_forecasts)} forecasts for {station_name}",
+                station_id=station_id,
+                forecasts_generated=len(all_forecasts),
+                forecasts=all_forecasts,
+            )
+        except Exception as e:
+            message = e.detail if isinstance(e, HTTPException) else f"Forecast generation failed: {str(e)}"
+            print(f"\n❌ Forecast generation failed for station {station_id}: {message}")
+            return GenerateForecastResponse(
+                success=False,
+                message=message,
+                station_id=station_id,
+                forecasts_generated=0,
+                forecasts=[],
+            )
+
+    def run_batch() -> List[GenerateForecastResponse]:
+        # Load every horizon's model up front, so the station threads only read the cache
+        for horizon in request.horizons_minutes:
+            try:
+                _load_horizon_model(client, horizon, model_cache)
+            except Exception as e:
+                print(f"   ⚠️  Error loading model for {horizon}-min horizon: {str(e)}")
+
+        # Stations are independent; fetching, preprocessing and saving are mostly I/O
+        max_workers = max(1, min(MAX_BATCH_WORKERS, len(request.station_ids)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(forecast_station, request.station_ids))
+
+    # Off the event loop, so other requests are served while the batch runs
+    results = await asyncio.to_thread(run_batch)
+
+    succeeded = sum(r.success for r in results)
+    print(f"\n{'=' * 70}")
+    print(f"✅ BATCH FORECAST GENERATION COMPLETE ({succeeded}/{len(results)} stations)")
+    print(f"{'=' * 70}\n")
+
+    return BatchForecastResponse(
+        success=succeeded > 0,
+        message=f"Generated forecasts for {succeeded}/{len(results)} stations",
+        results=results,
+    )
+
+
 @router.post("/{model_name}", response_model=PredictionResponse)
-async def predict(model_name: str, request: PredictionRequest):
+async def predict(model_name: str, request: PredictionRequest, http_request: Request):
     """
     Generate predictions using a registered model.
 
     - **model_name**: Name of the registered model
     - **request**: Prediction request with station_id and optional input data
     """
-    client = MlflowClient()
+    client = http_request.app.state.mlflow_client
 
     try:
         # Find the production version of the model
-        versions = client.search_model_versions(f"name='{model_name}'")
+        model_version = _get_active_version(client, model_name)
 
-        if not versions:
+        if model_version is None:
             raise HTTPException(
                 status_code=404, detail=f"Model '{model_name}' not found"
             )
 
-        # Prefer production stage, then latest version
-        production_versions = [v for v in versions if v.current_stage == "Production"]
-        if production_versions:
-            model_version = production_versions[0]
-        else:
-            model_version = max(versions, key=lambda x: int(x.version))
-
         # Load the model
-        model_uri = f"models:/{model_name}/{model_version.version}"
-
         try:
-            model = mlflow.sklearn.load_model(model_uri)
-        except Exception:
+            model = _load_model(model_name, model_version.version)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to load model: {str(e)}"
+            )
+
+        # Prepare input data
+        if request.input_data_b64:
             try:
-                model = mlflow.pyfunc.load_model(model_uri)
-            except Exception as e:
+                raw = base64.b64decode(request.input_data_b64, validate=True)
+                input_array = np.frombuffer(raw, dtype="<f4").reshape(-1, 1)
+            except (binascii.Error, ValueError) as e:
                 raise HTTPException(
-                    status_code=500, detail=f"Failed to load model: {str(e)}"
+                    status_code=400, detail=f"Invalid input_data_b64: {str(e)}"
                 )
-
-        # Prepare input data
-        if request.input_data:
+        elif request.input_data:
             input_array = np.array(request.input_data).reshape(-1, 1)
         else:
             # Generate mock input for demo purposes
             # In production, this should fetch from database
-            input_array = np.random.uniform(4.0, 6.0, size=(7, 1))
+            input_array = RNG.uniform(4.0, 6.0, size=(7, 1))
 
         # Generate predictions
-        forecasts = []
         current_time = datetime.utcnow()
 
         # Calculate number of forecast points (hourly)
@@ -467,48 +692,60 @@ async def predict(model_name: str, request: PredictionRequest):
             if hasattr(model, "forecast"):
                 # ARIMA-style models
                 predictions = model.forecast(steps=num_points)
+            elif isinstance(model, (LinearRegression, Ridge)) and np.size(model.coef_) == 1:
+                # Single-input linear model: y_next = coef * y + intercept, iterated on
+                # plain floats rather than through one sklearn predict call per step
+                coef = float(np.ravel(model.coef_)[0])
+                intercept = float(np.ravel(model.intercept_)[0])
+                y = float(input_array[-1, 0]) if len(input_array) > 0 else 5.0
+
+                predictions = np.empty(num_points)
+                for i in range(num_points):
+                    y = coef * y + intercept
+                    predictions[i] = y
             elif hasattr(model, "predict"):
                 # Sklearn-style models
                 # For time series, we might need to do iterative prediction
-                predictions = []
-                current_input = (
-                    input_array[-1:] if len(input_array) > 0 else np.array([[5.0]])
-                )
+                # One (1, 1) input buffer, overwritten with each prediction
+                current_input = np.empty((1, 1))
+                current_input[0, 0] = input_array[-1, 0] if len(input_array) > 0 else 5.0
+                predictions = np.empty(num_points)
 
-                for _ in range(num_points):
+                for i in range(num_points):
                     pred = model.predict(current_input)
-                    predictions.append(
+                    predictions[i] = (
                         float(pred[0]) if hasattr(pred, "__iter__") else float(pred)
                     )
-                    current_input = np.array([[predictions[-1]]])
-
-                predictions = np.array(predictions)
+                    current_input[0, 0] = predictions[i]
             else:
                 # Fallback: generate mock predictions
-                base_value = float(input_array[-1]) if len(input_array) > 0 else 5.0
-                predictions = base_value + np.cumsum(
-                    np.random.normal(0, 0.1, num_points)
-                )
+                base_value = float(input_array[-1, 0]) if len(input_array) > 0 else 5.0
+                predictions = _mock_predictions(base_value, num_points)
 
         except Exception as e:
             # Fallback to mock predictions if model fails
-            base_value = float(input_array[-1]) if len(input_array) > 0 else 5.0
-            predictions = base_value + np.cumsum(np.random.normal(0, 0.1, num_points))
+            base_value = float(input_array[-1, 0]) if len(input_array) > 0 else 5.0
+            predictions = _mock_predictions(base_value, num_points)
 
         # Build forecast response
-        for i, pred in enumerate(predictions):
-            forecast_time = current_time + timedelta(hours=i + 1)
-            # Add confidence intervals (mock for now)
-            std = 0.2 + 0.01 * i  # Uncertainty grows with horizon
-
-            forecasts.append(
-                ForecastPoint(
-                    timestamp=forecast_time.isoformat(),
-                    value=round(float(pred), 3),
-                    lower_bound=round(float(pred) - 1.96 * std, 3),
-                    upper_bound=round(float(pred) + 1.96 * std, 3),
-                )
+        # Add confidence intervals (mock for now); uncertainty grows with horizon
+        predictions = np.asarray(predictions, dtype=np.float64)
+        stds = 0.2 + 0.01 * np.arange(len(predictions))
+        lower_bounds = predictions - 1.96 * stds
+        upper_bounds = predictions + 1.96 * stds
+
+        # Plain dicts, validated into ForecastPoints in one pass by PredictionResponse
+        forecasts = [
+            {
+                "timestamp": (current_time + timedelta(hours=i + 1)).isoformat(),
+                "value": round(pred, 3),
+                "lower_bound": round(lower, 3),
+                "upper_bound": round(upper, 3),
+            }
+            for i, (pred, lower, upper) in enumerate(
+                zip(predictions.tolist(), lower_bounds.tolist(), upper_bounds.tolist())
             )
+        ]
 
         return PredictionResponse(
             success=True,
@@ -527,26 +764,19 @@ async def predict(model_name: str, request: PredictionRequest):
 
 
 @router.get("/{model_name}/info")
-async def get_model_info(model_name: str):
+async def get_model_info(model_name: str, request: Request):
     """Get information about the model used for predictions"""
-    client = MlflowClient()
+    client = request.app.state.mlflow_client
 
     try:
-        versions = client.search_model_versions(f"name='{model_name}'")
+        # Get production version info
+        active_version = _get_active_version(client, model_name)
 
-        if not versions:
+        if active_version is None:
             raise HTTPException(
                 status_code=404, detail=f"Model '{model_name}' not found"
             )
 
-        # Get production version info
-        production_versions = [v for v in versions if v.current_stage == "Production"]
-        active_version = (
-            production_versions[0]
-            if production_versions
-            else max(versions, key=lambda x: int(x.version))
-        )
-
         # Get run info for additional metadata
         run = client.get_run(active_version.run_id)
 
@@ -9,6 +9,7 @@ from app.schemas.preprocessing import (
     PreprocessingRequest,
     PreprocessingResponse,
     PreprocessingConfig,
+    PreprocessingConfigList,
     PreprocessingConfigUpdate
 )
 from app.services.preprocessing_service import PreprocessingService
@@ -102,8 +103,7 @@ async def get_preprocessing_configs(
         
         response = query.execute()
         
-        configs = [PreprocessingConfig(**row) for row in response.data]
-        return configs
+        return PreprocessingConfigList.validate_python(response.data)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch configs: {str(e)}")
@@ -190,6 +190,8 @@ async def update_preprocessing_config(method_id: str, update: PreprocessingConfi
         if not response.data:
             raise HTTPException(status_code=404, detail=f"Config '{method_id}' not found")
         
+        PreprocessingService.invalidate_configs_cache()
+        
         return PreprocessingConfig(**response.data[0])
         
     except HTTPException:
@@ -1,8 +1,12 @@
 """
 Training Router - API endpoints for model training
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime
+import asyncio
+import uuid
+import numpy as np
 import mlflow
 from mlflow.tracking import MlflowClient
 
@@ -10,8 +14,11 @@ from app.schemas.training import (
     TrainingRequest,
     TrainingResponse,
     TrainingStatusResponse,
+    TrainingJobResponse,
     ModelListResponse,
-    ModelComparisonResponse
+    ModelComparisonResponse,
+    HorizonMinutes,
+    ModelType
 )
 from app.services.training_service import TrainingService
 from app.config import get_settings
@@ -19,7 +26,7 @@ from app.config import get_settings
 router = APIRouter()
 settings = get_settings()
 
-# Global training status
+# Global training status (mutated in place, never rebound)
 training_status = {
     "status": "idle",
     "current_model": None,
@@ -29,12 +36,110 @@ training_status = {
 }
 
 
-@router.post("/train", response_model=TrainingResponse)
-async def train_models(request: TrainingRequest):
+def _without_none(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop None-valued fields from a response record"""
+    return {key: value for key, value in record.items() if value is not None}
+
+
+# Background training jobs (job_id -> job record), most recent last
+training_jobs: Dict[str, Dict[str, Any]] = {}
+training_jobs_lock = asyncio.Lock()
+_training_tasks: Dict[str, asyncio.Task] = {}
+
+# Finished jobs kept around for polling before the oldest are evicted
+MAX_FINISHED_TRAINING_JOBS = 50
+
+
+async def _update_training_job(job_id: str, **fields) -> None:
+    """Update a training job record and evict old finished jobs"""
+    async with training_jobs_lock:
+        training_jobs[job_id].update(fields)
+        
+        finished = [jid for jid, job in training_jobs.items() if job["status"] in ("completed", "failed")]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_TRAINING_JOBS)]:
+            del training_jobs[jid]
+
+
+async def _run_training_job(job_id: str, request: TrainingRequest) -> None:
+    """Run a training request in a worker thread and record the outcome on the job"""
+    await _update_training_job(job_id, status="training")
+    
+    try:
+        # TrainingService is fully blocking (Supabase, sklearn, MLflow) - keep it off the event loop
+        def run():
+            training_service = TrainingService()
+            return training_service.train_models(
+                station_id=request.station_id,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                prediction_horizons=sorted(request.prediction_horizons),
+                model_types=sorted(request.model_types),
+                test_size=request.test_size,
+                use_time_split=request.use_time_split,
+                ridge_alpha=request.ridge_alpha,
+                experiment_name=request.experiment_name,
+                register_model=request.register_model,
+                model_stage=request.model_stage,
+                log_batch=request.log_batch,
+                compute_train_metrics=request.compute_train_metrics
+            )
+        
+        result = await asyncio.to_thread(run)
+        message = f"Training completed successfully. {len(result['results'])} models trained."
+        
+        # Update status
+        training_status.update(
+            status="completed",
+            current_model=None,
+            current_horizon=None,
+            progress=100,
+            message=message
+        )
+        
+        await _update_training_job(
+            job_id,
+            status="completed",
+            finished_at=datetime.utcnow().isoformat(),
+            message=message,
+            result=TrainingResponse.model_validate(result)
+        )
+    
+    except Exception as e:
+        import traceback
+        error_trace = traceback.format_exc()
+        print(f"\n❌ Training Error:\n{error_trace}")
+        
+        # Update status
+        training_status.update(
+            status="failed",
+            current_model=None,
+            current_horizon=None,
+            progress=0,
+            message=f"Training failed: {str(e)}"
+        )
+        
+        await _update_training_job(
+            job_id,
+            status="failed",
+            finished_at=datetime.utcnow().isoformat(),
+            message=f"Training failed: {str(e)}"
+        )
+    
+    finally:
+        _training_tasks.pop(job_id, None)
+
+
+@router.post("/train", response_model=TrainingJobResponse, status_code=202)
+async def train_models(request: TrainingRequest, http_request: Request):
     """
     Train ML models for water level prediction
     
-    This endpoint:
+    Training runs in the background. This endpoint returns 202 with a job_id
+    immediately; poll `GET /training/train/jobs/{job_id}` (the returned
+    `status_url`) until the job is `completed` or `failed`. The full training
+    result is included in the job once it completes.
+    
+    The training job:
     - Fetches and preprocesses station data
     - Trains Linear and Ridge models for multiple prediction horizons
     - Logs all training runs to MLflow
@@ -55,8 +160,6 @@ async def train_models(request: TrainingRequest):
     }
     ```
     """
-    global training_status
-    
     # Check if training is already in progress
     if training_status["status"] == "training":
         raise HTTPException(
@@ -64,79 +167,65 @@ async def train_models(request: TrainingRequest):
             detail="Training already in progress. Please wait for it to complete."
         )
     
-    try:
-        # Debug logging
-        print(f"🔍 Received station_id: {request.station_id} (type: {type(request.station_id)})")
-        
-        # Check if station is excluded
-        if request.station_id is not None and request.station_id in [1, 7]:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Station {request.station_id} is excluded from training due to data quality issues"
-            )
-        
-        # Update status
-        station_msg = f"station {request.station_id}" if request.station_id is not None else "all stations (unified model, excluding stations 1 & 7)"
-        training_status = {
-            "status": "training",
-            "current_model": request.model_types[0] if request.model_types else "ridge",
-            "current_horizon": request.prediction_horizons[0] if request.prediction_horizons else 60,
-            "progress": 0,
-            "message": f"Starting training for {station_msg}"
-        }
-        
-        # Initialize training service
-        training_service = TrainingService()
-        
-        # Train models
-        result = training_service.train_models(
-            station_id=request.station_id,
-            start_date=request.start_date,
-            end_date=request.end_date,
-            prediction_horizons=request.prediction_horizons,
-            model_types=request.model_types,
-            test_size=request.test_size,
-            use_time_split=request.use_time_split,
-            ridge_alpha=request.ridge_alpha,
-            experiment_name=request.experiment_name,
-            register_model=request.register_model,
-            model_stage=request.model_stage
+    # Debug logging
+    print(f"🔍 Received station_id: {request.station_id} (type: {type(request.station_id)})")
+    
+    # Check if station is excluded
+    if request.station_id is not None and request.station_id in [1, 7]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Station {request.station_id} is excluded from training due to data quality issues"
         )
-        
-        # Update status
-        training_status = {
-            "status": "completed",
-            "current_model": None,
-            "current_horizon": None,
-            "progress": 100,
-            "message": f"Training completed successfully. {len(result['results'])} models trained."
-        }
-        
-        return TrainingResponse(**result)
     
-    except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"\n❌ Training Error:\n{error_trace}")
-        
-        # Update status
-        training_status = {
-            "status": "failed",
-            "current_model": None,
-            "current_horizon": None,
-            "progress": 0,
-            "message": f"Training failed: {str(e)}"
-        }
-        
-        raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
+    # Update status
+    station_msg = f"station {request.station_id}" if request.station_id is not None else "all stations (unified model, excluding stations 1 & 7)"
+    training_status.update(
+        status="training",
+        current_model=min(request.model_types),
+        current_horizon=min(request.prediction_horizons),
+        progress=0,
+        message=f"Starting training for {station_msg}"
+    )
+    
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": http_request.url_for("get_training_job", job_id=job_id).path,
+        "created_at": datetime.utcnow().isoformat(),
+        "finished_at": None,
+        "message": f"Training queued for {station_msg}",
+        "result": None
+    }
+    async with training_jobs_lock:
+        training_jobs[job_id] = job
+    
+    _training_tasks[job_id] = asyncio.create_task(_run_training_job(job_id, request))
+    
+    return TrainingJobResponse(**job)
+
+
+@router.get("/train/jobs/{job_id}", response_model=TrainingJobResponse)
+async def get_training_job(job_id: str):
+    """
+    Get the status of a training job started with `POST /training/train`
+    
+    Returns the job status (queued, training, completed, failed) and, once
+    completed, the full training result.
+    """
+    async with training_jobs_lock:
+        job = training_jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Training job '{job_id}' not found")
+        return TrainingJobResponse(**job)
 
 
 @router.post("/train-all-stations")
 async def train_all_stations(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    prediction_horizons: List[int] = [15, 30, 45, 60],
-    model_types: List[str] = ["linear", "ridge"],
+    prediction_horizons: Tuple[HorizonMinutes, ...] = (15, 30, 45, 60),
+    model_types: Tuple[ModelType, ...] = ("linear", "ridge"),
     test_size: float = 0.2
 ):
     """
@@ -149,8 +238,6 @@ async def train_all_stations(
     
     Note: This may take significant time depending on number of stations
     """
-    global training_status
-    
     # Check if training is already in progress
     if training_status["status"] == "training":
         raise HTTPException(
@@ -168,6 +255,7 @@ async def train_all_stations(
         if not stations_response.data:
             raise HTTPException(status_code=404, detail="No stations found")
         
+        # Station list is fetched once here and handed to each training run
         stations = stations_response.data
         total_stations = len(stations)
         
@@ -181,13 +269,13 @@ async def train_all_stations(
             
             try:
                 # Update status
-                training_status = {
-                    "status": "training",
-                    "current_model": f"Station {station_id}",
-                    "current_horizon": None,
-                    "progress": int((idx / total_stations) * 100),
-                    "message": f"Training station {idx}/{total_stations}: {station_name}"
-                }
+                training_status.update(
+                    status="training",
+                    current_model=f"Station {station_id}",
+                    current_horizon=None,
+                    progress=int((idx / total_stations) * 100),
+                    message=f"Training station {idx}/{total_stations}: {station_name}"
+                )
                 
                 print(f"\n{'='*70}")
                 print(f"Training station {idx}/{total_stations}: {station_name} (ID: {station_id})")
@@ -205,7 +293,8 @@ async def train_all_stations(
                     ridge_alpha=1.0,
                     experiment_name=None,
                     register_model=False,
-                    model_stage="None"
+                    model_stage="None",
+                    station_name=station_name
                 )
                 
                 all_results.append({
@@ -229,13 +318,13 @@ async def train_all_stations(
                 failed += 1
         
         # Update final status
-        training_status = {
-            "status": "completed",
-            "current_model": None,
-            "current_horizon": None,
-            "progress": 100,
-            "message": f"Batch training completed. {successful} successful, {failed} failed."
-        }
+        training_status.update(
+            status="completed",
+            current_model=None,
+            current_horizon=None,
+            progress=100,
+            message=f"Batch training completed. {successful} successful, {failed} failed."
+        )
         
         return {
             "success": True,
@@ -249,17 +338,17 @@ async def train_all_stations(
     except HTTPException:
         raise
     except Exception as e:
-        training_status = {
-            "status": "failed",
-            "current_model": None,
-            "current_horizon": None,
-            "progress": 0,
-            "message": f"Batch training failed: {str(e)}"
-        }
+        training_status.update(
+            status="failed",
+            current_model=None,
+            current_horizon=None,
+            progress=0,
+            message=f"Batch training failed: {str(e)}"
+        )
         raise HTTPException(status_code=500, detail=f"Batch training failed: {str(e)}")
 
 
-@router.get("/status", response_model=TrainingStatusResponse)
+@router.get("/status", response_model=TrainingStatusResponse, response_model_exclude_none=True)
 async def get_training_status():
     """
     Get current training status
@@ -286,13 +375,13 @@ async def list_experiments():
         
         return {
             "experiments": [
-                {
+                _without_none({
                     "experiment_id": exp.experiment_id,
                     "name": exp.name,
                     "artifact_location": exp.artifact_location,
                     "lifecycle_stage": exp.lifecycle_stage,
                     "creation_time": exp.creation_time
-                }
+                })
                 for exp in experiments
             ],
             "total": len(experiments)
@@ -327,7 +416,7 @@ async def get_experiment_runs(experiment_name: str, limit: int = 50):
             "experiment_name": experiment_name,
             "experiment_id": experiment.experiment_id,
             "runs": [
-                {
+                _without_none({
                     "run_id": run.info.run_id,
                     "run_name": run.data.tags.get("mlflow.runName", ""),
                     "status": run.info.status,
@@ -336,7 +425,7 @@ async def get_experiment_runs(experiment_name: str, limit: int = 50):
                     "metrics": run.data.metrics,
                     "params": run.data.params,
                     "tags": run.data.tags
-                }
+                })
                 for run in runs
             ],
             "total": len(runs)
@@ -413,7 +502,7 @@ async def get_station_models(station_id: int):
                 if horizon not in models_by_horizon:
                     models_by_horizon[horizon] = []
                 
-                models_by_horizon[horizon].append({
+                models_by_horizon[horizon].append(_without_none({
                     "run_id": run.info.run_id,
                     "model_type": model_type,
                     "horizon_minutes": horizon,
@@ -422,7 +511,7 @@ async def get_station_models(station_id: int):
                     "test_r2": run.data.metrics.get("test_r2"),
                     "training_time": run.data.metrics.get("training_time_seconds"),
                     "start_time": run.info.start_time
-                })
+                }))
         
         return {
             "station_id": station_id,
@@ -454,10 +543,14 @@ async def get_best_models(station_id: int):
         best_models = {}
         
         for horizon, models in models_data["models_by_horizon"].items():
-            # Find model with lowest RMSE
+            # Find model with lowest RMSE (missing RMSE ranks last)
             if models:
-                best = min(models, key=lambda m: m["test_rmse"] if m["test_rmse"] is not None else float('inf'))
-                best_models[horizon] = best
+                rmse = np.fromiter(
+                    (m.get("test_rmse", np.inf) for m in models),
+                    dtype=np.float64,
+                    count=len(models)
+                )
+                best_models[horizon] = models[int(np.argmin(rmse))]
         
         return {
             "station_id": station_id,
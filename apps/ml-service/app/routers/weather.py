@@ -1,8 +1,8 @@
 """
 Weather Router - Fetch weather data from Open-Meteo API
 """
-from fastapi import APIRouter, HTTPException, Query
-from app.services.weather_service import WeatherService
+from fastapi import APIRouter, HTTPException, Query, Response
+from app.services.weather_service import WeatherService, DEFAULT_FORECAST_MINUTES
 from typing import List
 import logging
 
@@ -17,6 +17,7 @@ def get_weather_service() -> WeatherService:
 
 @router.get("/current")
 async def get_current_weather(
+    response: Response,
     latitude: float = Query(..., ge=-90, le=90, description="Latitude coordinate"),
     longitude: float = Query(..., ge=-180, le=180, description="Longitude coordinate")
 ):
@@ -38,6 +39,8 @@ async def get_current_weather(
     try:
         service = get_weather_service()
         weather_data = await service.get_weather_by_coordinates(latitude, longitude)
+        if service.served_stale:
+            response.headers["X-Served-Stale"] = "true"
         return weather_data
     except HTTPException:
         raise
@@ -51,10 +54,11 @@ async def get_current_weather(
 
 @router.get("/forecast")
 async def get_weather_forecast(
+    response: Response,
     latitude: float = Query(..., ge=-90, le=90, description="Latitude coordinate"),
     longitude: float = Query(..., ge=-180, le=180, description="Longitude coordinate"),
     minutes: List[int] = Query(
-        default=[0, 15, 30, 45, 60, 120, 180, 360],
+        default=list(DEFAULT_FORECAST_MINUTES),
         description="Forecast horizons in minutes (0=current, 15, 30, 45, 60, 120, 180, 360)"
     )
 ):
@@ -83,6 +87,8 @@ async def get_weather_forecast(
     try:
         service = get_weather_service()
         weather_data = await service.get_weather_forecast(latitude, longitude, minutes)
+        if service.served_stale:
+            response.headers["X-Served-Stale"] = "true"
         return weather_data
     except HTTPException:
         raise
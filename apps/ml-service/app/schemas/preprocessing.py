@@ -1,10 +1,12 @@
 """
 Preprocessing schemas and models
 """
-from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
+from app.schemas.training import HorizonMinutes
+
 
 class PreprocessingConfig(BaseModel):
     """Schema for preprocessing configuration"""
@@ -15,13 +17,17 @@ class PreprocessingConfig(BaseModel):
     updated_at: Optional[datetime] = None
 
 
+# Validates a whole list of config rows in one pydantic-core call
+PreprocessingConfigList = TypeAdapter(List[PreprocessingConfig])
+
+
 class PreprocessingRequest(BaseModel):
     """Request to preprocess data"""
     station_id: int = Field(..., description="Station ID to preprocess data for")
     start_date: Optional[str] = Field(None, description="Start date (YYYY-MM-DD)")
     end_date: Optional[str] = Field(None, description="End date (YYYY-MM-DD)")
-    prediction_horizons: List[int] = Field(
-        default=[15, 30, 45, 60, 90],
+    prediction_horizons: Tuple[HorizonMinutes, ...] = Field(
+        default=(15, 30, 45, 60, 90),
         description="Prediction horizons in minutes"
     )
     use_custom_configs: bool = Field(
@@ -1,8 +1,13 @@
 """
 Training Schemas - Request and response models for training API
 """
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import List, Dict, Any, Optional, Literal, Set
+
+
+# Supported prediction horizons (minutes) and model types
+HorizonMinutes = Literal[15, 30, 45, 60, 90]
+ModelType = Literal["linear", "ridge"]
 
 
 class TrainingRequest(BaseModel):
@@ -10,13 +15,15 @@ class TrainingRequest(BaseModel):
     station_id: Optional[int] = Field(None, description="Station ID to train model for (None = all stations)")
     start_date: Optional[str] = Field(None, description="Start date for training data (YYYY-MM-DD)")
     end_date: Optional[str] = Field(None, description="End date for training data (YYYY-MM-DD)")
-    prediction_horizons: List[int] = Field(
-        default=[15, 30, 45, 60],
-        description="Prediction horizons in minutes"
+    prediction_horizons: Set[HorizonMinutes] = Field(
+        default={15, 30, 45, 60},
+        min_length=1,
+        description="Prediction horizons in minutes (duplicates are ignored): 15, 30, 45, 60, 90"
     )
-    model_types: List[str] = Field(
-        default=["linear", "ridge"],
-        description="Model types to train: linear, ridge"
+    model_types: Set[ModelType] = Field(
+        default={"linear", "ridge"},
+        min_length=1,
+        description="Model types to train (duplicates are ignored): linear, ridge"
     )
     test_size: float = Field(default=0.2, ge=0.1, le=0.5, description="Test set size ratio")
     use_time_split: bool = Field(default=True, description="Use time-based split instead of random")
@@ -31,10 +38,14 @@ class TrainingRequest(BaseModel):
         default="None",
         description="Initial stage for registered model"
     )
+    log_batch: bool = Field(default=True, description="Log run params/metrics to MLflow in a single batch request")
+    compute_train_metrics: bool = Field(default=False, description="Also evaluate models on the training set (diagnostic only)")
 
 
 class ModelMetrics(BaseModel):
     """Metrics for a trained model"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     rmse: float
     mae: float
     r2: float
@@ -42,14 +53,20 @@ class ModelMetrics(BaseModel):
 
 class HorizonModelResult(BaseModel):
     """Result for a single model at a specific horizon"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     model_type: str
     horizon_minutes: int
-    train_metrics: ModelMetrics
+    train_metrics: Optional[ModelMetrics] = None
     test_metrics: ModelMetrics
     training_time_seconds: float
     mlflow_run_id: str
 
 
+# Validates the training service's result objects in one pydantic-core call
+HorizonModelResultList = TypeAdapter(List[HorizonModelResult])
+
+
 class ModelSyncRequest(BaseModel):
     """Request to sync model from Supabase to MLflow"""
     run_id: str = Field(..., description="MLflow run ID from model_performance table")
@@ -62,6 +79,8 @@ class ModelSyncRequest(BaseModel):
 
 class ModelSyncResponse(BaseModel):
     """Response from model sync operation"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     success: bool
     run_id: str
     model_name: str
@@ -78,6 +97,8 @@ class ModelSyncResponse(BaseModel):
 
 class TrainingResponse(BaseModel):
     """Response from training request"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     success: bool
     message: str
     station_id: Optional[int] = None
@@ -107,6 +128,8 @@ class TrainingResponse(BaseModel):
 
 class TrainingStatusResponse(BaseModel):
     """Response for training status"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     status: Literal["idle", "training", "completed", "failed"]
     current_model: Optional[str] = None
     current_horizon: Optional[int] = None
@@ -114,14 +137,31 @@ class TrainingStatusResponse(BaseModel):
     message: str
 
 
+class TrainingJobResponse(BaseModel):
+    """Status of a background training job"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
+    job_id: str
+    status: Literal["queued", "training", "completed", "failed"]
+    status_url: str = Field(description="Path to poll for job status")
+    created_at: str
+    finished_at: Optional[str] = None
+    message: Optional[str] = None
+    result: Optional[TrainingResponse] = Field(None, description="Training result, set once the job has completed")
+
+
 class ModelListResponse(BaseModel):
     """List of trained models"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     models: List[Dict[str, Any]]
     total: int
 
 
 class ModelComparisonResponse(BaseModel):
     """Comparison between models"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     station_id: int
     horizon_minutes: int
     models: List[Dict[str, Any]]
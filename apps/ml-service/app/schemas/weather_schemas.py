@@ -1,62 +1,97 @@
 """
 Weather Data Schemas
 """
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Dict, Optional
 
 
-class WeatherLocation(BaseModel):
+class WeatherDataResponse(BaseModel):
+    """Current weather for a location, flattened into a single model"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
+    # Location
     latitude: float
     longitude: float
     name: str
     country: str
-
-
-class WeatherCondition(BaseModel):
-    main: str
-    description: str
-    icon: Optional[str] = None
-
-
-class Temperature(BaseModel):
-    current: float
-    feels_like: float
-    min: float
-    max: float
-    unit: str = "celsius"
-
-
-class Atmospheric(BaseModel):
+    
+    # Condition
+    weather_main: str
+    weather_description: str
+    weather_icon: Optional[str] = None
+    
+    # Temperature
+    temperature_current: float
+    temperature_feels_like: float
+    temperature_min: float
+    temperature_max: float
+    temperature_unit: str = "celsius"
+    
+    # Atmospheric
     pressure: int
     humidity: int
     visibility: Optional[int] = None
     clouds: Optional[int] = None
-
-
-class Wind(BaseModel):
-    speed: Optional[float] = None
-    direction: Optional[int] = None
-    gust: Optional[float] = None
-
-
-class Precipitation(BaseModel):
+    
+    # Wind
+    wind_speed: Optional[float] = None
+    wind_direction: Optional[int] = None
+    wind_gust: Optional[float] = None
+    
+    # Precipitation
     rain_1h: Optional[float] = None
     rain_3h: Optional[float] = None
     snow_1h: Optional[float] = None
     snow_3h: Optional[float] = None
-
-
-class WeatherDataResponse(BaseModel):
-    location: WeatherLocation
-    weather: WeatherCondition
-    temperature: Temperature
-    atmospheric: Atmospheric
-    wind: Wind
-    precipitation: Precipitation
+    
     timestamp: int
     timezone: Optional[int] = None
     sunrise: Optional[int] = None
     sunset: Optional[int] = None
+    
+    def to_openweather_dict(self) -> Dict[str, Any]:
+        """Regroup the flat fields into the nested OpenWeather-style layout"""
+        return {
+            "location": {
+                "latitude": self.latitude,
+                "longitude": self.longitude,
+                "name": self.name,
+                "country": self.country
+            },
+            "weather": {
+                "main": self.weather_main,
+                "description": self.weather_description,
+                "icon": self.weather_icon
+            },
+            "temperature": {
+                "current": self.temperature_current,
+                "feels_like": self.temperature_feels_like,
+                "min": self.temperature_min,
+                "max": self.temperature_max,
+                "unit": self.temperature_unit
+            },
+            "atmospheric": {
+                "pressure": self.pressure,
+                "humidity": self.humidity,
+                "visibility": self.visibility,
+                "clouds": self.clouds
+            },
+            "wind": {
+                "speed": self.wind_speed,
+                "direction": self.wind_direction,
+                "gust": self.wind_gust
+            },
+            "precipitation": {
+                "rain_1h": self.rain_1h,
+                "rain_3h": self.rain_3h,
+                "snow_1h": self.snow_1h,
+                "snow_3h": self.snow_3h
+            },
+            "timestamp": self.timestamp,
+            "timezone": self.timezone,
+            "sunrise": self.sunrise,
+            "sunset": self.sunset
+        }
 
 
 class WeatherRequest(BaseModel):
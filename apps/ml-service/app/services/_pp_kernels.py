@@ -0,0 +1,169 @@
+"""
+Numba kernels for the preprocessing hot path
+"""
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def compute_features(values, group_offsets, lag_periods, window_periods, diff_periods,
+                     min_periods, out_lags, out_rmean, out_rstd, out_diffs):
+    """
+    Fill lag, rolling mean/std and diff features of a station-grouped series in one sweep
+
+    Args:
+        values: float64 series, rows grouped by station and time-ordered within a group
+        group_offsets: start row of each group plus a trailing len(values)
+        lag_periods: (n_groups, n_lags) shift size per group
+        window_periods: (n_groups, n_windows) rolling window size per group
+        diff_periods: (n_groups, n_diffs) diff size per group
+        min_periods: minimum non-NaN observations for a rolling value (as pandas rolling)
+        out_lags, out_rmean, out_rstd, out_diffs: (n_features, len(values)) outputs
+
+    Groups with fewer than two rows are left as NaN.
+    """
+    n_lags = lag_periods.shape[1]
+    n_windows = window_periods.shape[1]
+    n_diffs = diff_periods.shape[1]
+
+    for g in prange(len(group_offsets) - 1):
+        start = group_offsets[g]
+        end = group_offsets[g + 1]
+
+        if end - start < 2:
+            for i in range(start, end):
+                for j in range(n_lags):
+                    out_lags[j, i] = np.nan
+                for k in range(n_windows):
+                    out_rmean[k, i] = np.nan
+                    out_rstd[k, i] = np.nan
+                for j in range(n_diffs):
+                    out_diffs[j, i] = np.nan
+            continue
+
+        # Running Welford state per window: count, mean, sum of squared deviations
+        count = np.zeros(n_windows, dtype=np.int64)
+        mean = np.zeros(n_windows)
+        m2 = np.zeros(n_windows)
+
+        for i in range(start, end):
+            x = values[i]
+            pos = i - start
+
+            for j in range(n_lags):
+                p = lag_periods[g, j]
+                out_lags[j, i] = values[i - p] if pos >= p else np.nan
+
+            for j in range(n_diffs):
+                p = diff_periods[g, j]
+                out_diffs[j, i] = x - values[i - p] if pos >= p else np.nan
+
+            for k in range(n_windows):
+                if not np.isnan(x):
+                    count[k] += 1
+                    delta = x - mean[k]
+                    mean[k] += delta / count[k]
+                    m2[k] += delta * (x - mean[k])
+
+                w = window_periods[g, k]
+                if pos >= w:
+                    old = values[i - w]
+                    if not np.isnan(old):
+                        if count[k] == 1:
+                            count[k] = 0
+                            mean[k] = 0.0
+                            m2[k] = 0.0
+                        else:
+                            count[k] -= 1
+                            delta = old - mean[k]
+                            mean[k] -= delta / count[k]
+                            m2[k] -= delta * (old - mean[k])
+
+                if count[k] >= min_periods and count[k] > 0:
+                    out_rmean[k, i] = mean[k]
+                else:
+                    out_rmean[k, i] = np.nan
+
+                if count[k] >= min_periods and count[k] > 1:
+                    out_rstd[k, i] = np.sqrt(max(m2[k], 0.0) / (count[k] - 1))
+                else:
+                    out_rstd[k, i] = np.nan
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def rolling_sums(values, group_offsets, windows, min_periods, out):
+    """
+    Rolling sums for several window sizes of a station-grouped series in one sweep
+
+    Args:
+        values: float64 series, rows grouped by station and time-ordered within a group
+        group_offsets: start row of each group plus a trailing len(values)
+        windows: window sizes in rows, shared by all groups
+        min_periods: minimum non-NaN observations for a value (as pandas rolling)
+        out: (len(windows), len(values)) output
+    """
+    n_windows = len(windows)
+
+    for g in prange(len(group_offsets) - 1):
+        start = group_offsets[g]
+        end = group_offsets[g + 1]
+
+        total = np.zeros(n_windows)
+        count = np.zeros(n_windows, dtype=np.int64)
+
+        for i in range(start, end):
+            x = values[i]
+            pos = i - start
+
+            for k in range(n_windows):
+                if not np.isnan(x):
+                    total[k] += x
+                    count[k] += 1
+
+                w = windows[k]
+                if pos >= w:
+                    old = values[i - w]
+                    if not np.isnan(old):
+                        total[k] -= old
+                        count[k] -= 1
+                        if count[k] == 0:
+                            total[k] = 0.0
+
+                if count[k] >= min_periods and count[k] > 0:
+                    out[k, i] = total[k]
+                else:
+                    out[k, i] = np.nan
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def group_mean_std(values, group_offsets, out_mean, out_std):
+    """
+    Broadcast each group's mean and sample std (ddof=1, NaN-skipping) over its rows
+
+    Args:
+        values: float64 series, rows grouped by station
+        group_offsets: start row of each group plus a trailing len(values)
+        out_mean, out_std: len(values) outputs
+    """
+    for g in prange(len(group_offsets) - 1):
+        start = group_offsets[g]
+        end = group_offsets[g + 1]
+
+        count = 0
+        total = 0.0
+        for i in range(start, end):
+            if not np.isnan(values[i]):
+                count += 1
+                total += values[i]
+        mean = total / count if count > 0 else np.nan
+
+        # Second pass for the squared deviations, for accuracy
+        m2 = 0.0
+        for i in range(start, end):
+            if not np.isnan(values[i]):
+                m2 += (values[i] - mean) ** 2
+        std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+
+        for i in range(start, end):
+            out_mean[i] = mean
+            out_std[i] = std
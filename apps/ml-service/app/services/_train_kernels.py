@@ -0,0 +1,35 @@
+"""
+Numba kernels for the training hot path
+"""
+from numba import njit
+
+
+@njit(nogil=True, fastmath=True, cache=True)
+def residual_sums(y_true, y_pred, y_mean):
+    """
+    Sum of squared residuals, sum of absolute residuals and total sum of squares in one pass
+
+    Args:
+        y_true: observed values
+        y_pred: predicted values, same length as y_true
+        y_mean: mean of y_true
+
+    Returns:
+        (ss_res, sum_abs_res, ss_tot), accumulated in float64
+
+    Serial on purpose: it is called from the per-horizon training threads, which
+    already run side by side with the GIL released (nogil); fastmath lets LLVM
+    vectorize the reductions.
+    """
+    ss_res = 0.0
+    sum_abs = 0.0
+    ss_tot = 0.0
+
+    for i in range(y_true.shape[0]):
+        residual = float(y_true[i]) - float(y_pred[i])
+        ss_res += residual * residual
+        sum_abs += abs(residual)
+        deviation = float(y_true[i]) - y_mean
+        ss_tot += deviation * deviation
+
+    return ss_res, sum_abs, ss_tot
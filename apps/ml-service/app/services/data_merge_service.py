@@ -1,109 +1,343 @@
 """
 Data Merge Service - Merge station measurements with weather data
 """
+import asyncio
+import io
+import threading
+import httpx
 import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from collections import OrderedDict
 from datetime import datetime
-from typing import Tuple, Dict, Optional
+from typing import Callable, Tuple, Dict, List, Optional, Sequence, Union
 from supabase import Client
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Suffixes turning a YYYY-MM-DD filter into an inclusive UTC day range
+DAY_START = 'T00:00:00+00:00'
+DAY_END = 'T23:59:59.999999+00:00'
+
+# Stations per station_id IN (...) request, and batches fetched in parallel
+BULK_STATION_BATCH_SIZE = 10
+BULK_MAX_CONCURRENT_QUERIES = 4
+
+# Fetched Arrow tables kept for repeated requests over the same closed date range
+RANGE_CACHE_SIZE = 8
+
+# Rows requested per PostgREST round-trip (matches Supabase's default max-rows)
+MERGE_PAGE_SIZE = 1000
+
+# Columns the merge and downstream preprocessing actually consume, with fixed
+# Arrow types so pages skip type inference. measured_at is read as text and
+# cast to a UTC timestamp once the pages are combined.
+# Apart from the station_id/measured_at join keys the two schemas are disjoint,
+# so the asof join never has to suffix colliding columns.
+STATION_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('station_id', pa.int64()),
+    ('measured_at', pa.string()),
+    ('water_level', pa.float64()),
+    ('rainfall_1h', pa.float64()),
+    ('rainfall_6h', pa.float64()),
+    ('rainfall_12h', pa.float64()),
+    ('rainfall_24h', pa.float64())
+])
+WEATHER_SCHEMA = pa.schema([
+    ('station_id', pa.int64()),
+    ('measured_at', pa.string()),
+    ('temperature', pa.float64()),
+    ('temp_min', pa.float64()),
+    ('temp_max', pa.float64()),
+    ('feels_like', pa.float64()),
+    ('pressure', pa.float64()),
+    ('humidity', pa.float64()),
+    ('wind_speed', pa.float64()),
+    ('wind_deg', pa.float64()),
+    ('rain_1h', pa.float64()),
+    ('clouds', pa.float64()),
+    ('visibility', pa.float64()),
+    ('weather_main', pa.string()),
+    ('weather_description', pa.string())
+])
+# Columns returned by the merge_station_weather RPC
+MERGED_SCHEMA = pa.schema(list(STATION_SCHEMA) + list(WEATHER_SCHEMA)[2:])
+
 
 class DataMergeService:
     """Service for merging station measurements with weather data"""
     
+    # Shared across instances, since routers create a service per request
+    _range_cache: "OrderedDict[tuple, pa.Table]" = OrderedDict()
+    _range_cache_lock = threading.Lock()
+    
     def __init__(self, supabase_client: Client):
         self.supabase = supabase_client
     
-    async def merge_station_with_weather(
-        self,
-        start_date: Optional[str] = None,
-        end_date: Optional[str] = None,
-        tolerance_hours: int = 2
-    ) -> Tuple[pd.DataFrame, Dict]:
+    def _cached_range(self, key: tuple, end_date: Optional[str], fetch: Callable[[], pa.Table]) -> pa.Table:
         """
-        Merge station measurements with weather data from Supabase
+        Return the Arrow table for a fetch, reusing it for closed date ranges
         
-        Args:
-            start_date: Start date filter (YYYY-MM-DD)
-            end_date: End date filter (YYYY-MM-DD)
-            tolerance_hours: Maximum time difference for matching (hours)
-            
-        Returns:
-            Tuple of (merged_dataframe, statistics_dict)
+        Only ranges ending before today (UTC) are cached; open-ended or
+        current ranges may still receive new measurements and always hit
+        the database. Arrow tables are immutable, so cached entries can be
+        handed to callers directly.
         """
-        logger.info(f"Starting data merge: {start_date} to {end_date}")
+        if not end_date or end_date >= datetime.utcnow().strftime('%Y-%m-%d'):
+            return fetch()
+        
+        with self._range_cache_lock:
+            if key in self._range_cache:
+                self._range_cache.move_to_end(key)
+                return self._range_cache[key]
+        
+        table = fetch()
         
-        # Fetch station measurements
-        query = self.supabase.table('station_measurements').select('*')
+        with self._range_cache_lock:
+            self._range_cache[key] = table
+            self._range_cache.move_to_end(key)
+            while len(self._range_cache) > RANGE_CACHE_SIZE:
+                self._range_cache.popitem(last=False)
+        
+        return table
+    
+    def _rest_client(self) -> httpx.Client:
+        """HTTP client for PostgREST that asks for CSV instead of JSON"""
+        return httpx.Client(
+            base_url=f'{self.supabase.supabase_url}/rest/v1',
+            headers={
+                'apikey': self.supabase.supabase_key,
+                'Authorization': f'Bearer {self.supabase.supabase_key}',
+                'Accept': 'text/csv'
+            },
+            timeout=60.0
+        )
+    
+    def _fetch_table(
+        self,
+        table: str,
+        schema: pa.Schema,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> pa.Table:
+        """Fetch a measurements table page by page into a single Arrow table"""
+        # (measured_at, station_id) is unique, so pages never overlap
+        params = [
+            ('select', ','.join(schema.names)),
+            ('order', 'measured_at.asc,station_id.asc'),
+            ('limit', MERGE_PAGE_SIZE)
+        ]
         
         if start_date:
-            query = query.gte('measured_at', f'{start_date}T00:00:00+00:00')
+            params.append(('measured_at', 'gte.' + start_date + DAY_START))
         if end_date:
-            query = query.lte('measured_at', f'{end_date}T23:59:59+00:00')
+            params.append(('measured_at', 'lte.' + end_date + DAY_END))
         
-        station_result = query.execute()
-        df_station = pd.DataFrame(station_result.data)
+        def fetch() -> pa.Table:
+            with self._rest_client() as client:
+                return self._collect_pages(
+                    lambda offset: self._read_csv_page(
+                        client.get(f'/{table}', params=params + [('offset', offset)]),
+                        schema
+                    ),
+                    schema
+                )
         
-        if df_station.empty:
-            raise ValueError("No station measurements found for the specified date range")
+        return self._cached_range(('table', table, start_date, end_date), end_date, fetch)
+    
+    def _fetch_server_merge(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        tolerance_hours: int = 2
+    ) -> pa.Table:
+        """Run the nearest-timestamp join in Postgres via the merge_station_weather RPC"""
+        params = {
+            'p_start': start_date + DAY_START if start_date else None,
+            'p_end': end_date + DAY_END if end_date else None,
+            'p_tol': f'{tolerance_hours} hours',
+            'p_limit': MERGE_PAGE_SIZE
+        }
         
-        logger.info(f"Fetched {len(df_station)} station measurements")
+        def fetch() -> pa.Table:
+            # Keyset paging on (measured_at, station_id): each page starts after the
+            # previous one's last row, so no already-joined rows are recomputed and skipped
+            tables = []
+            after = {}
+            with self._rest_client() as client:
+                while True:
+                    page = self._read_csv_page(
+                        client.post('/rpc/merge_station_weather', json={**params, **after}),
+                        MERGED_SCHEMA
+                    )
+                    if page.num_rows:
+                        tables.append(page)
+                    if page.num_rows < MERGE_PAGE_SIZE:
+                        break
+                    after = {
+                        'p_after_measured_at': page.column('measured_at')[-1].as_py(),
+                        'p_after_station_id': page.column('station_id')[-1].as_py()
+                    }
+            return self._concat_pages(tables, MERGED_SCHEMA)
         
-        # Fetch weather measurements
-        weather_query = self.supabase.table('weather_measurements').select('*')
+        return self._cached_range(
+            ('merge_station_weather', start_date, end_date, tolerance_hours), end_date, fetch
+        )
+    
+    @staticmethod
+    def _read_csv_page(response: httpx.Response, schema: pa.Schema) -> pa.Table:
+        """Parse one PostgREST CSV response with Arrow's multithreaded reader"""
+        response.raise_for_status()
         
-        if start_date:
-            weather_query = weather_query.gte('measured_at', f'{start_date}T00:00:00+00:00')
-        if end_date:
-            weather_query = weather_query.lte('measured_at', f'{end_date}T23:59:59+00:00')
+        if not response.content.strip():
+            return schema.empty_table()
         
-        weather_result = weather_query.execute()
-        df_weather = pd.DataFrame(weather_result.data)
+        return pacsv.read_csv(
+            io.BytesIO(response.content),
+            convert_options=pacsv.ConvertOptions(
+                column_types=schema,
+                include_columns=schema.names,
+                strings_can_be_null=True
+            )
+        )
+    
+    @classmethod
+    def _collect_pages(cls, fetch_page: Callable[[int], pa.Table], schema: pa.Schema) -> pa.Table:
+        """Page through a result set into a single Arrow table"""
+        tables = []
+        offset = 0
+        
+        while True:
+            page = fetch_page(offset)
+            if page.num_rows:
+                tables.append(page)
+            if page.num_rows < MERGE_PAGE_SIZE:
+                break
+            offset += MERGE_PAGE_SIZE
+        
+        return cls._concat_pages(tables, schema)
+    
+    @staticmethod
+    def _concat_pages(tables: List[pa.Table], schema: pa.Schema) -> pa.Table:
+        """Combine fetched pages into one Arrow table with measured_at as a timestamp"""
+        table = pa.concat_tables(tables) if tables else schema.empty_table()
+        
+        # Postgres timestamptz text (ISO8601 with offset) -> timestamp[us, UTC]
+        index = table.schema.get_field_index('measured_at')
+        return table.set_column(
+            index, 'measured_at', pc.cast(table.column(index), pa.timestamp('us', tz='UTC'))
+        )
+    
+    async def _merge_client_side(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        tolerance_hours: int = 2
+    ) -> pa.Table:
+        """Download both tables and join them locally with an asof join"""
+        # Fetch station and weather measurements concurrently
+        station_table, weather_table = await asyncio.gather(
+            asyncio.to_thread(self._fetch_table, 'station_measurements', STATION_SCHEMA, start_date, end_date),
+            asyncio.to_thread(self._fetch_table, 'weather_measurements', WEATHER_SCHEMA, start_date, end_date)
+        )
         
-        logger.info(f"Fetched {len(df_weather)} weather measurements")
+        if station_table.num_rows == 0:
+            raise ValueError("No station measurements found for the specified date range")
         
-        # Convert timestamps
-        df_station['measured_at'] = pd.to_datetime(df_station['measured_at'])
-        df_weather['measured_at'] = pd.to_datetime(df_weather['measured_at'])
+        logger.info("Fetched %d station measurements", station_table.num_rows)
+        logger.info("Fetched %d weather measurements", weather_table.num_rows)
         
-        # Merge using pandas merge_asof with tolerance
-        df_station_sorted = df_station.sort_values('measured_at')
-        df_weather_sorted = df_weather.sort_values('measured_at')
+        # No weather in range: every row would miss anyway, so skip the join
+        if weather_table.num_rows == 0:
+            for field in list(WEATHER_SCHEMA)[2:]:
+                station_table = station_table.append_column(
+                    field, pa.nulls(station_table.num_rows, field.type)
+                )
+            return station_table
         
-        df_merged = pd.merge_asof(
-            df_station_sorted,
-            df_weather_sorted,
+        # Join each station with its own weather rows, mirroring merge_station_weather.
+        # Polars runs the sorted asof join natively without holding the GIL
+        # (_fetch_table already returns both tables ordered by measured_at)
+        merged = pl.from_arrow(station_table).join_asof(
+            pl.from_arrow(weather_table),
             on='measured_at',
-            direction='nearest',
-            tolerance=pd.Timedelta(hours=tolerance_hours),
-            suffixes=('_station', '_weather')
+            by='station_id',
+            strategy='nearest',
+            tolerance=f'{tolerance_hours}h',
+            check_sortedness=False
         )
         
-        # Calculate statistics
-        total_records = len(df_merged)
-        records_with_weather = df_merged['temperature'].notna().sum()
-        records_missing_weather = total_records - records_with_weather
-        coverage_percentage = (records_with_weather / total_records * 100) if total_records > 0 else 0
+        return merged.to_arrow()
+    
+    async def merge_station_with_weather(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        tolerance_hours: int = 2,
+        as_arrow: bool = False
+    ) -> Tuple[Union[pd.DataFrame, pa.Table], Dict]:
+        """
+        Merge station measurements with weather data from Supabase
+        
+        Args:
+            start_date: Start date filter (YYYY-MM-DD)
+            end_date: End date filter (YYYY-MM-DD)
+            tolerance_hours: Maximum time difference for matching (hours)
+            as_arrow: Return a pyarrow Table instead of a pandas DataFrame
+            
+        Returns:
+            Tuple of (merged_dataframe or table, statistics_dict)
+        """
+        logger.info("Starting data merge: %s to %s", start_date, end_date)
+        
+        # Prefer the server-side join; fall back to merging locally when the
+        # merge_station_weather function has not been deployed yet
+        try:
+            table_merged = await asyncio.to_thread(
+                self._fetch_server_merge, start_date, end_date, tolerance_hours
+            )
+        except Exception as e:
+            logger.warning("Server-side merge unavailable (%s), merging client-side", e)
+            table_merged = await self._merge_client_side(start_date, end_date, tolerance_hours)
+        else:
+            logger.info("Fetched %d merged records from merge_station_weather", table_merged.num_rows)
+            if table_merged.num_rows == 0:
+                raise ValueError("No station measurements found for the specified date range")
+        
+        # Calculate statistics on the Arrow columns, without a pandas copy
+        measured_at = table_merged.column('measured_at')  # timestamp[us, UTC]
+        total_records = table_merged.num_rows
+        records_missing_weather = pc.sum(
+            pc.is_null(table_merged.column('temperature'), nan_is_null=True)
+        ).as_py() or 0
+        records_with_weather = total_records - records_missing_weather
+        coverage_percentage = records_with_weather / total_records * 100
         
-        # Get unique stations
-        stations_count = df_merged['station_id'].nunique() if 'station_id' in df_merged.columns else 0
+        # Get unique stations (hash-based, no sort)
+        stations_count = len(pc.unique(table_merged.column('station_id')))
         
+        # Both merge paths return rows ordered by measured_at
         stats = {
             'total_records': int(total_records),
             'records_with_weather': int(records_with_weather),
             'records_missing_weather': int(records_missing_weather),
             'coverage_percentage': round(coverage_percentage, 2),
             'stations_count': int(stations_count),
-            'time_range_start': df_merged['measured_at'].min().isoformat() if not df_merged.empty else None,
-            'time_range_end': df_merged['measured_at'].max().isoformat() if not df_merged.empty else None,
+            'time_range_start': measured_at[0].as_py().isoformat(),
+            'time_range_end': measured_at[-1].as_py().isoformat(),
             'weather_source': 'supabase'
         }
         
-        logger.info(f"Merge completed: {stats}")
+        logger.info("Merge completed: %s", stats)
+        
+        if as_arrow:
+            return table_merged, stats
         
-        return df_merged, stats
+        return table_merged.to_pandas(), stats
     
     async def get_stations(self):
         """Fetch all stations"""
@@ -118,16 +352,63 @@ class DataMergeService:
         limit: int = 100
     ):
         """Fetch measurements for a specific station"""
-        query = self.supabase.table('station_measurements')\
-            .select('*')\
-            .eq('station_id', station_id)\
-            .order('measured_at', desc=True)\
-            .limit(limit)
+        measurements = await self.get_station_measurements_bulk(
+            [station_id], start_date=start_date, end_date=end_date, limit=limit
+        )
+        return measurements[str(station_id)]
+    
+    async def get_station_measurements_bulk(
+        self,
+        station_ids: Sequence[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        limit: int = 100
+    ) -> Dict[str, List[Dict]]:
+        """
+        Fetch the latest measurements for several stations at once
         
-        if start_date:
-            query = query.gte('measured_at', f'{start_date}T00:00:00+00:00')
-        if end_date:
-            query = query.lte('measured_at', f'{end_date}T23:59:59+00:00')
+        Stations are queried in batches with a single station_id IN (...)
+        request each, and at most BULK_MAX_CONCURRENT_QUERIES batches are
+        in flight at a time. A batch shares a limit * len(batch) row cap, so
+        a station reporting less often than its batch-mates may get fewer
+        than `limit` rows.
         
-        result = query.execute()
-        return result.data
+        Returns:
+            Dictionary mapping station_id to its measurements, newest first
+        """
+        station_ids = [str(sid) for sid in station_ids]
+        semaphore = asyncio.Semaphore(BULK_MAX_CONCURRENT_QUERIES)
+        
+        def fetch_batch(batch: List[str]) -> List[Dict]:
+            query = self.supabase.table('station_measurements')\
+                .select('*')\
+                .in_('station_id', batch)\
+                .order('measured_at', desc=True)\
+                .limit(limit * len(batch))
+            
+            if start_date:
+                query = query.gte('measured_at', start_date + DAY_START)
+            if end_date:
+                query = query.lte('measured_at', end_date + DAY_END)
+            
+            return query.execute().data
+        
+        async def run_batch(batch: List[str]) -> List[Dict]:
+            async with semaphore:
+                return await asyncio.to_thread(fetch_batch, batch)
+        
+        batches = [
+            station_ids[i:i + BULK_STATION_BATCH_SIZE]
+            for i in range(0, len(station_ids), BULK_STATION_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        
+        # Rows arrive newest first, so keep the first `limit` per station
+        measurements: Dict[str, List[Dict]] = {sid: [] for sid in station_ids}
+        for rows in results:
+            for row in rows:
+                station_rows = measurements.setdefault(str(row['station_id']), [])
+                if len(station_rows) < limit:
+                    station_rows.append(row)
+        
+        return measurements
@@ -4,48 +4,111 @@ Handles data preprocessing based on configurations from database
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+import pyarrow as pa
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
+import copy
 import time
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client, Client
 
 from app.config import get_settings
-from app.services.data_merge_service import DataMergeService
+from app.services.data_merge_service import DataMergeService, MERGED_SCHEMA, STATION_SCHEMA
+from app.services._pp_kernels import compute_features, group_mean_std, rolling_sums
 
 settings = get_settings()
 
+# Fallback (no weather) fetch: PostgREST page size and pages in flight at once
+STATION_PAGE_SIZE = 1000
+MAX_CONCURRENT_PAGES = 4
+# Only the columns the pipeline uses (same station columns as the weather merge)
+STATION_COLUMNS = ','.join(STATION_SCHEMA.names)
+# pandas dtypes for those columns (measured_at is parsed separately)
+STATION_DTYPES = {
+    field.name: field.type.to_pandas_dtype()
+    for field in STATION_SCHEMA if field.name != 'measured_at'
+}
+# Numeric columns either fetch path can return; engineered features are all numeric
+NUMERIC_SOURCE_COLUMNS = [
+    field.name for field in MERGED_SCHEMA
+    if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+]
+
 
 class PreprocessingService:
     """Service for preprocessing water level data"""
     
-    def __init__(self):
-        """Initialize preprocessing service with Supabase client"""
-        if not settings.supabase_url or not settings.supabase_key:
-            raise ValueError("Supabase credentials not configured")
-        
-        self.supabase: Client = create_client(
-            settings.supabase_url,
-            settings.supabase_key
-        )
+    # Shared across instances, since routers create a service per request
+    _configs_cache: Optional[Dict[str, Any]] = None
+    _configs_cache_time = 0.0
+    _configs_cache_lock = threading.Lock()
+    
+    # Event loop for the async weather merge, run on a daemon thread
+    _merge_loop: Optional[asyncio.AbstractEventLoop] = None
+    _merge_loop_lock = threading.Lock()
+    
+    def __init__(self, supabase: Optional[Client] = None):
+        """
+        Initialize preprocessing service with Supabase client
+        
+        Args:
+            supabase: Existing client to reuse; a new one is created from settings if omitted
+        """
+        if supabase is None:
+            if not settings.supabase_url or not settings.supabase_key:
+                raise ValueError("Supabase credentials not configured")
+            
+            supabase = create_client(
+                settings.supabase_url,
+                settings.supabase_key
+            )
+        self.supabase: Client = supabase
         
         # Initialize data merge service for weather data integration
         self.merge_service = DataMergeService(self.supabase)
     
+    @classmethod
+    def _background_loop(cls) -> asyncio.AbstractEventLoop:
+        """Start the shared merge event loop on first use and return it"""
+        with cls._merge_loop_lock:
+            if cls._merge_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='preprocessing-merge-loop', daemon=True).start()
+                cls._merge_loop = loop
+            return cls._merge_loop
+    
     def get_preprocessing_configs(self) -> Dict[str, Any]:
         """
         Fetch all preprocessing configurations from database
         
+        Enabled configs are cached for settings.preprocessing_configs_ttl_seconds;
+        callers get their own copy since preprocess_data adds keys to it.
+        
         Returns:
             Dictionary mapping method_id to config
         """
-        response = self.supabase.table('preprocessing_configs').select('*').eq('enabled', True).execute()
-        
-        configs = {}
-        for row in response.data:
-            configs[row['method_id']] = row['config']
-        
-        return configs
+        cls = type(self)
+        with cls._configs_cache_lock:
+            expired = time.monotonic() - cls._configs_cache_time >= settings.preprocessing_configs_ttl_seconds
+            if cls._configs_cache is None or expired:
+                response = self.supabase.table('preprocessing_configs').select('*').eq('enabled', True).execute()
+                
+                configs = {}
+                for row in response.data:
+                    configs[row['method_id']] = row['config']
+                
+                cls._configs_cache = configs
+                cls._configs_cache_time = time.monotonic()
+            
+            return copy.deepcopy(cls._configs_cache)
+    
+    @classmethod
+    def invalidate_configs_cache(cls) -> None:
+        """Drop cached configs so the next call re-reads them (e.g. after an update)"""
+        with cls._configs_cache_lock:
+            cls._configs_cache = None
     
     def get_station_data(self, station_id: Optional[int] = None, start_date: Optional[str] = None, 
                         end_date: Optional[str] = None, include_weather: bool = True) -> pd.DataFrame:
@@ -64,44 +127,20 @@ class PreprocessingService:
         # If weather merge is enabled, use DataMergeService
         if include_weather:
             try:
-                # Run async merge in sync context - handle both notebook and non-notebook environments
-                try:
-                    # Try to get existing event loop (Jupyter notebook case)
-                    loop = asyncio.get_running_loop()
-                    # If we're in a running loop, we need to use nest_asyncio
-                    import nest_asyncio
-                    nest_asyncio.apply()
-                    df_merged, stats = asyncio.run(
-                        self.merge_service.merge_station_with_weather(
-                            start_date=start_date,
-                            end_date=end_date,
-                            tolerance_hours=2
-                        )
-                    )
-                except RuntimeError:
-                    # No running loop, create new one (normal execution case)
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    df_merged, stats = loop.run_until_complete(
-                        self.merge_service.merge_station_with_weather(
-                            start_date=start_date,
-                            end_date=end_date,
-                            tolerance_hours=2
-                        )
-                    )
-                    loop.close()
-                
-                # Clean up column names from merge_asof suffixes
-                # Rename station columns (remove _station suffix)
-                df_merged = df_merged.rename(columns={
-                    'id_station': 'id',
-                    'station_id_station': 'station_id',
-                    'created_at_station': 'created_at'
-                })
+                # Run async merge on the shared background loop; works the same whether
+                # or not the caller is itself inside a running loop (e.g. notebooks)
+                future = asyncio.run_coroutine_threadsafe(
+                    self.merge_service.merge_station_with_weather(
+                        start_date=start_date,
+                        end_date=end_date,
+                        tolerance_hours=2
+                    ),
+                    self._background_loop()
+                )
+                df_merged, stats = future.result()
                 
-                # Drop weather duplicate columns, rainfall_7to7, flow_rate, and rainfall
-                cols_to_drop = ['id_weather', 'station_id_weather', 'created_at_weather', 'rainfall_7to7', 'flow_rate', 'rainfall']
-                df_merged = df_merged.drop(columns=[col for col in cols_to_drop if col in df_merged.columns])
+                # The merge only selects non-overlapping columns (no rainfall_7to7,
+                # flow_rate or rainfall), so there are no suffixes to clean up
                 
                 # Exclude problematic stations (1 and 7)
                 df_merged = df_merged[~df_merged['station_id'].isin([1, 7])]
@@ -128,285 +167,292 @@ class PreprocessingService:
                 # Fall through to original implementation
         
         # Original implementation (no weather data)
-        query = self.supabase.table('station_measurements').select('*')
+        if station_id is not None and station_id in [1, 7]:
+            # Check if requested station is excluded
+            raise ValueError(f"Station {station_id} is excluded from training/prediction")
+        
+        def build_query(*columns: str, **kwargs):
+            query = self.supabase.table('station_measurements').select(*columns, **kwargs)
+            
+            # Exclude problematic stations (1 and 7)
+            query = query.not_.in_('station_id', [1, 7])
+            
+            # Filter by station_id if provided
+            if station_id is not None:
+                query = query.eq('station_id', station_id)
+            
+            if start_date:
+                # Handle both date strings (YYYY-MM-DD) and ISO datetime strings
+                if 'T' in start_date:
+                    query = query.gte('measured_at', start_date)
+                else:
+                    query = query.gte('measured_at', f'{start_date}T00:00:00+00:00')
+            if end_date:
+                # Handle both date strings (YYYY-MM-DD) and ISO datetime strings
+                if 'T' in end_date:
+                    query = query.lte('measured_at', end_date)
+                else:
+                    query = query.lte('measured_at', f'{end_date}T23:59:59+00:00')
+            return query
         
-        # Exclude problematic stations (1 and 7)
-        query = query.not_.in_('station_id', [1, 7])
+        # Count once, then fetch every page concurrently (each page gets its own
+        # builder, since query builders are mutable)
+        total = build_query('id', count='exact').range(0, 0).execute().count or 0
         
-        # Filter by station_id if provided
-        if station_id is not None:
-            # Check if requested station is excluded
-            if station_id in [1, 7]:
-                raise ValueError(f"Station {station_id} is excluded from training/prediction")
-            query = query.eq('station_id', station_id)
-        
-        if start_date:
-            # Handle both date strings (YYYY-MM-DD) and ISO datetime strings
-            if 'T' in start_date:
-                query = query.gte('measured_at', start_date)
-            else:
-                query = query.gte('measured_at', f'{start_date}T00:00:00+00:00')
-        if end_date:
-            # Handle both date strings (YYYY-MM-DD) and ISO datetime strings
-            if 'T' in end_date:
-                query = query.lte('measured_at', end_date)
-            else:
-                query = query.lte('measured_at', f'{end_date}T23:59:59+00:00')
-        
-        # Fetch with pagination
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = query.order('measured_at').range(offset, offset + page_size - 1).execute()
-            if not response.data:
-                break
-            all_data.extend(response.data)
-            if len(response.data) < page_size:
-                break
-            offset += page_size
+        def fetch_page(offset: int) -> List[Dict[str, Any]]:
+            return build_query(STATION_COLUMNS).order('measured_at').order('id').range(
+                offset, offset + STATION_PAGE_SIZE - 1
+            ).execute().data
+        
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PAGES) as executor:
+            pages = executor.map(fetch_page, range(0, total, STATION_PAGE_SIZE))
+            all_data = [row for page in pages for row in page]
         
         if not all_data:
             raise ValueError(f"No data found for station {station_id}")
         
-        df = pd.DataFrame(all_data)
-        df['measured_at'] = pd.to_datetime(df['measured_at'])
-        
-        # Drop rainfall_7to7, flow_rate, and rainfall if they exist
-        cols_to_drop = ['rainfall_7to7', 'flow_rate', 'rainfall']
-        df = df.drop(columns=[col for col in cols_to_drop if col in df.columns])
+        # Columns and dtypes are known up front, so skip pandas' per-column inference
+        df = pd.DataFrame.from_records(all_data, columns=STATION_SCHEMA.names).astype(STATION_DTYPES)
+        df['measured_at'] = pd.to_datetime(df['measured_at'], format='ISO8601', utc=True, cache=True)
         
         return df.sort_values('measured_at').reset_index(drop=True)
     
-    def apply_lag_features(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
-        """Apply lag features based on configuration with adaptive interval detection"""
-        lag_periods = config.get('lag_periods', [1, 2, 3, 6, 12])  # Max 12h to reduce record loss
-        
-        # Check if we have multiple stations
-        if 'station_id' in df.columns and df['station_id'].nunique() > 1:
-            # Multi-station: detect interval for each station and apply adaptive lags
-            for station_id in df['station_id'].unique():
-                station_mask = df['station_id'] == station_id
-                station_df = df[station_mask].sort_values('measured_at')
-                
-                # Detect actual interval for this station (in minutes)
-                if len(station_df) > 1:
-                    time_diffs = station_df['measured_at'].diff().dt.total_seconds() / 60
-                    mode_interval = time_diffs.mode().values[0] if len(time_diffs.mode()) > 0 else 30
-                    periods_per_hour = 60 / mode_interval  # e.g., 15min -> 4, 30min -> 2
-                    
-                    # Apply lags for this station
-                    for lag in lag_periods:
-                        shift_periods = int(lag * periods_per_hour)
-                        col_name = f'water_level_lag_{lag}h'
-                        if col_name not in df.columns:
-                            df[col_name] = np.nan
-                        df.loc[station_mask, col_name] = station_df['water_level'].shift(shift_periods).values
+    def group_by_station(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sort rows by (station_id, measured_at) once and record where each station starts
+        
+        The offsets (CSR-style, with a trailing len(df)) are kept in
+        df.attrs['_station_offsets'] so feature steps can slice each station's
+        rows directly instead of masking and re-sorting per station. Each
+        station's readings per hour go in df.attrs['_periods_per_hour'].
+        """
+        if 'station_id' in df.columns:
+            df = df.sort_values(['station_id', 'measured_at'], kind='mergesort')
+            _, offsets = np.unique(df['station_id'].to_numpy(), return_index=True)
         else:
-            # Single station: detect interval once
-            if len(df) > 1:
-                time_diffs = df.sort_values('measured_at')['measured_at'].diff().dt.total_seconds() / 60
-                mode_interval = time_diffs.mode().values[0] if len(time_diffs.mode()) > 0 else 30
-                periods_per_hour = 60 / mode_interval
-                
-                for lag in lag_periods:
-                    shift_periods = int(lag * periods_per_hour)
-                    df[f'water_level_lag_{lag}h'] = df['water_level'].shift(shift_periods)
+            df = df.sort_values('measured_at', kind='mergesort')
+            offsets = np.zeros(min(len(df), 1), dtype=np.int64)
+        offsets = np.append(offsets, len(df)).astype(np.int64)
+        df.attrs['_station_offsets'] = offsets
+        df.attrs['_periods_per_hour'] = self._periods_per_hour(df['measured_at'], offsets)
+        return df
+    
+    def _periods_per_hour(self, measured_at: pd.Series, offsets: np.ndarray) -> np.ndarray:
+        """Readings per hour for each station slice, from its median sampling interval (minutes)"""
+        timestamps = pd.DatetimeIndex(measured_at)
+        ticks_per_minute = pd.Timedelta(minutes=1) // pd.Timedelta(1, unit=timestamps.unit)
+        diffs = np.diff(timestamps.asi8)
+        
+        intervals = np.full(len(offsets) - 1, 30.0)  # Default 30 minutes
+        for i in range(len(offsets) - 1):
+            start, end = offsets[i], offsets[i + 1]
+            if end - start > 1:
+                intervals[i] = np.median(diffs[start:end - 1]) / ticks_per_minute
+        # Mostly duplicate timestamps give a 0 median; never hand an infinite or
+        # negative period count to the (unchecked) feature kernels
+        intervals[~(intervals > 0) | ~np.isfinite(intervals)] = 30.0
+        return 60 / intervals  # e.g., 15min -> 4, 30min -> 2
+    
+    def apply_water_level_features(self, df: pd.DataFrame,
+                                   lag_config: Optional[Dict[str, Any]] = None,
+                                   rolling_config: Optional[Dict[str, Any]] = None,
+                                   rate_config: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Apply lag, rolling statistics and rate of change features with adaptive intervals
+        
+        All three are computed by a single fused kernel that walks each station's
+        water_level series once, instead of one pass per lag/window/statistic.
+        """
+        if len(df) < 2:
+            return df
+        
+        lags = lag_config.get('lag_periods', [1, 2, 3, 6, 12]) if lag_config is not None else []  # Max 12h to reduce record loss
+        windows = rolling_config.get('windows', [3, 6, 12, 24]) if rolling_config is not None else []
+        statistics = rolling_config.get('statistics', ['mean', 'std']) if rolling_config is not None else []
+        min_periods = rolling_config.get('min_periods', 1) if rolling_config is not None else 1
+        changes = rate_config.get('periods', [1, 3, 6]) if rate_config is not None else []
+        
+        if '_station_offsets' not in df.attrs:
+            df = self.group_by_station(df)
+        offsets = df.attrs['_station_offsets']
+        periods_per_hour = df.attrs['_periods_per_hour'][:, None]
+        
+        def periods(hours: Sequence[int]) -> np.ndarray:
+            return (np.asarray(hours, dtype=np.float64)[None, :] * periods_per_hour).astype(np.int64)
+        
+        # Features are stored as float32 (the kernel still accumulates in float64)
+        n = len(df)
+        out_lags = np.empty((len(lags), n), dtype=np.float32)
+        out_rmean = np.empty((len(windows), n), dtype=np.float32)
+        out_rstd = np.empty((len(windows), n), dtype=np.float32)
+        out_diffs = np.empty((len(changes), n), dtype=np.float32)
+        
+        compute_features(
+            df['water_level'].to_numpy(dtype=np.float64), offsets,
+            periods(lags), periods(windows), periods(changes), min_periods,
+            out_lags, out_rmean, out_rstd, out_diffs
+        )
+        
+        for j, lag in enumerate(lags):
+            df[f'water_level_lag_{lag}h'] = out_lags[j]
+        for k, window in enumerate(windows):
+            if 'mean' in statistics:
+                df[f'water_level_rolling_mean_{window}h'] = out_rmean[k]
+            if 'std' in statistics:
+                df[f'water_level_rolling_std_{window}h'] = out_rstd[k]
+        for j, period in enumerate(changes):
+            df[f'water_level_change_{period}h'] = out_diffs[j]
         
         return df
     
+    def apply_lag_features(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
+        """Apply lag features based on configuration with adaptive interval detection"""
+        return self.apply_water_level_features(df, lag_config=config)
+    
     def apply_rolling_statistics(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
         """Apply rolling statistics based on configuration with adaptive intervals"""
-        windows = config.get('windows', [3, 6, 12, 24])
-        statistics = config.get('statistics', ['mean', 'std'])
-        min_periods = config.get('min_periods', 1)
-        
-        # Check if we have multiple stations
-        if 'station_id' in df.columns and df['station_id'].nunique() > 1:
-            # Multi-station: detect interval for each station
-            for station_id in df['station_id'].unique():
-                station_mask = df['station_id'] == station_id
-                station_df = df[station_mask].sort_values('measured_at')
-                
-                if len(station_df) > 1:
-                    time_diffs = station_df['measured_at'].diff().dt.total_seconds() / 60
-                    mode_interval = time_diffs.mode().values[0] if len(time_diffs.mode()) > 0 else 30
-                    periods_per_hour = 60 / mode_interval
-                    
-                    for window in windows:
-                        window_periods = int(window * periods_per_hour)
-                        if 'mean' in statistics:
-                            col_name = f'water_level_rolling_mean_{window}h'
-                            if col_name not in df.columns:
-                                df[col_name] = np.nan
-                            df.loc[station_mask, col_name] = station_df['water_level'].rolling(
-                                window=window_periods, min_periods=min_periods
-                            ).mean().values
-                        if 'std' in statistics:
-                            col_name = f'water_level_rolling_std_{window}h'
-                            if col_name not in df.columns:
-                                df[col_name] = np.nan
-                            df.loc[station_mask, col_name] = station_df['water_level'].rolling(
-                                window=window_periods, min_periods=min_periods
-                            ).std().values
-        else:
-            # Single station: detect interval once
-            if len(df) > 1:
-                time_diffs = df.sort_values('measured_at')['measured_at'].diff().dt.total_seconds() / 60
-                mode_interval = time_diffs.mode().values[0] if len(time_diffs.mode()) > 0 else 30
-                periods_per_hour = 60 / mode_interval
-                
-                for window in windows:
-                    window_periods = int(window * periods_per_hour)
-                    if 'mean' in statistics:
-                        df[f'water_level_rolling_mean_{window}h'] = df['water_level'].rolling(
-                            window=window_periods, min_periods=min_periods
-                        ).mean()
-                    if 'std' in statistics:
-                        df[f'water_level_rolling_std_{window}h'] = df['water_level'].rolling(
-                            window=window_periods, min_periods=min_periods
-                        ).std()
-        
-        return df
+        return self.apply_water_level_features(df, rolling_config=config)
     
     def apply_rate_of_change(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
         """Apply rate of change features with adaptive intervals"""
-        periods = config.get('periods', [1, 3, 6])
-        
-        # Check if we have multiple stations
-        if 'station_id' in df.columns and df['station_id'].nunique() > 1:
-            # Multi-station: detect interval for each station
-            for station_id in df['station_id'].unique():
-                station_mask = df['station_id'] == station_id
-                station_df = df[station_mask].sort_values('measured_at')
-                
-                if len(station_df) > 1:
-                    time_diffs = station_df['measured_at'].diff().dt.total_seconds() / 60
-                    mode_interval = time_diffs.mode().values[0] if len(time_diffs.mode()) > 0 else 30
-                    periods_per_hour = 60 / mode_interval
-                    
-                    for period in periods:
-                        shift_periods = int(period * periods_per_hour)
-                        col_name = f'water_level_change_{period}h'
-                        if col_name not in df.columns:
-                            df[col_name] = np.nan
-                        df.loc[station_mask, col_name] = station_df['water_level'].diff(shift_periods).values
-        else:
-            # Single station: detect interval once
-            if len(df) > 1:
-                time_diffs = df.sort_values('measured_at')['measured_at'].diff().dt.total_seconds() / 60
-                mode_interval = time_diffs.mode().values[0] if len(time_diffs.mode()) > 0 else 30
-                periods_per_hour = 60 / mode_interval
-                
-                for period in periods:
-                    shift_periods = int(period * periods_per_hour)
-                    df[f'water_level_change_{period}h'] = df['water_level'].diff(shift_periods)
-        
-        return df
+        return self.apply_water_level_features(df, rate_config=config)
     
     def apply_time_features(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
         """Apply time-based features with cyclical encoding"""
-        df['hour'] = df['measured_at'].dt.hour
-        df['day_of_week'] = df['measured_at'].dt.dayofweek
-        df['day_of_month'] = df['measured_at'].dt.day
-        df['month'] = df['measured_at'].dt.month
-        df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
-        
-        # Cyclical encoding
+        measured_at = pd.DatetimeIndex(df['measured_at'])
+        
+        # Hour and weekday straight from the epoch integers (measured_at is UTC)
+        ticks_per_hour = pd.Timedelta(hours=1) // pd.Timedelta(1, unit=measured_at.unit)
+        hours_since_epoch = measured_at.asi8 // ticks_per_hour
+        hour = (hours_since_epoch % 24).astype(np.int8)
+        day_of_week = ((hours_since_epoch // 24 + 3) % 7).astype(np.int8)  # 1970-01-01 was a Thursday
+        month = measured_at.month.to_numpy().astype(np.int8)
+        
+        df['hour'] = hour
+        df['day_of_week'] = day_of_week
+        df['day_of_month'] = measured_at.day.to_numpy().astype(np.int8)
+        df['month'] = month
+        df['is_weekend'] = (day_of_week >= 5).astype(np.int8)
+        
+        # Cyclical encoding: one angle array per cycle, shared by sin and cos
         hour_cycle = config.get('hour_cycle', 24)
         month_cycle = config.get('month_cycle', 12)
         
-        df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / hour_cycle)
-        df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / hour_cycle)
-        df['month_sin'] = np.sin(2 * np.pi * (df['month'] - 1) / month_cycle)
-        df['month_cos'] = np.cos(2 * np.pi * (df['month'] - 1) / month_cycle)
+        hour_angle = (hour * (2 * np.pi / hour_cycle)).astype(np.float32)
+        month_angle = ((month - 1) * (2 * np.pi / month_cycle)).astype(np.float32)
+        df['hour_sin'] = np.sin(hour_angle)
+        df['hour_cos'] = np.cos(hour_angle)
+        df['month_sin'] = np.sin(month_angle)
+        df['month_cos'] = np.cos(month_angle)
         
         return df
     
+    @staticmethod
+    def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+        """NaN-filled shift of a 1-D array (negative periods shift backwards)"""
+        shifted = np.full(len(values), np.nan)
+        if periods == 0:
+            shifted[:] = values
+        elif 0 < periods < len(values):
+            shifted[periods:] = values[:-periods]
+        elif 0 < -periods < len(values):
+            shifted[:periods] = values[-periods:]
+        return shifted
+    
+    def _station_shift(self, df: pd.DataFrame, values: np.ndarray, periods: int) -> np.ndarray:
+        """
+        Shift a whole station-grouped column at once, NaN-filling rows whose
+        source would lie in a neighbouring station (a groupby shift without the groupby)
+        """
+        offsets = df.attrs['_station_offsets']
+        lengths = np.diff(offsets)
+        position = np.arange(len(values)) - np.repeat(offsets[:-1], lengths)
+        
+        shifted = self._shift(values, periods)
+        if periods > 0:
+            shifted[position < periods] = np.nan
+        elif periods < 0:
+            shifted[position >= np.repeat(lengths, lengths) + periods] = np.nan
+        return shifted
+    
     def apply_rainfall_features(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
         """Apply rainfall cumulative features"""
         if 'rainfall_1h' not in df.columns:
             return df
+        if '_station_offsets' not in df.attrs:
+            df = self.group_by_station(df)
         
         windows = config.get('windows', [3, 6, 12, 24])
         
-        # Check if we have multiple stations
-        if 'station_id' in df.columns and df['station_id'].nunique() > 1:
-            # Group by station_id for multi-station data
-            for window in windows:
-                df[f'rainfall_sum_{window}h'] = df.groupby('station_id')['rainfall_1h'].transform(
-                    lambda x: x.rolling(window=window, min_periods=1).sum()
-                )
-        else:
-            # Single station - no grouping needed
-            for window in windows:
-                df[f'rainfall_sum_{window}h'] = df['rainfall_1h'].rolling(
-                    window=window, min_periods=1
-                ).sum()
+        # Every window size in one kernel sweep over each station
+        out = np.empty((len(windows), len(df)), dtype=np.float32)
+        rolling_sums(
+            df['rainfall_1h'].to_numpy(dtype=np.float64), df.attrs['_station_offsets'],
+            np.asarray(windows, dtype=np.int64), 1, out
+        )
+        for k, window in enumerate(windows):
+            df[f'rainfall_sum_{window}h'] = out[k]
         
         return df
     
     def apply_weather_interactions(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
         """Apply weather interaction features"""
         if 'temperature' in df.columns and 'humidity' in df.columns:
-            df['temp_humidity_interaction'] = df['temperature'] * df['humidity'] / 100
+            df['temp_humidity_interaction'] = (df['temperature'] * df['humidity'] / 100).astype(np.float32)
         
         if 'pressure' in df.columns:
-            # Check if we have multiple stations
-            if 'station_id' in df.columns and df['station_id'].nunique() > 1:
-                df['pressure_diff_3h'] = df.groupby('station_id')['pressure'].diff(3)
-            else:
-                df['pressure_diff_3h'] = df['pressure'].diff(3)
+            if '_station_offsets' not in df.attrs:
+                df = self.group_by_station(df)
+            pressure = df['pressure'].to_numpy(dtype=np.float64)
+            df['pressure_diff_3h'] = (pressure - self._station_shift(df, pressure, 3)).astype(np.float32)
         
         return df
     
     def apply_station_statistics(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
         """Apply station-specific statistics"""
-        # Check if we have multiple stations
-        if 'station_id' in df.columns and df['station_id'].nunique() > 1:
-            # Calculate per-station statistics for multi-station data
-            df['station_water_mean'] = df.groupby('station_id')['water_level'].transform('mean')
-            df['station_water_std'] = df.groupby('station_id')['water_level'].transform('std')
-            df['water_level_deviation'] = df['water_level'] - df['station_water_mean']
-        else:
-            # Single station - calculate once
-            station_mean = df['water_level'].mean()
-            station_std = df['water_level'].std()
-            
-            df['station_water_mean'] = station_mean
-            df['station_water_std'] = station_std
-            df['water_level_deviation'] = df['water_level'] - station_mean
+        if '_station_offsets' not in df.attrs:
+            df = self.group_by_station(df)
+        
+        water_level = df['water_level'].to_numpy(dtype=np.float64)
+        station_mean = np.empty(len(df))
+        station_std = np.empty(len(df))
+        group_mean_std(water_level, df.attrs['_station_offsets'], station_mean, station_std)
+        
+        df['station_water_mean'] = station_mean.astype(np.float32)
+        df['station_water_std'] = station_std.astype(np.float32)
+        df['water_level_deviation'] = (water_level - station_mean).astype(np.float32)
         
         return df
     
     def create_targets(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
         """Create target variables for multiple prediction horizons"""
         horizons = config.get('prediction_horizons', [15, 30, 45, 60, 90])
-        
-        # Check if we have multiple stations
-        has_multiple_stations = 'station_id' in df.columns and df['station_id'].nunique() > 1
+        if '_station_offsets' not in df.attrs:
+            df = self.group_by_station(df)
         
         # Data interval is 15 minutes
         data_interval_minutes = 15
+        water_level = df['water_level'].to_numpy(dtype=np.float64)
         
         for horizon in horizons:
             # Convert horizon minutes to number of periods (15-minute intervals)
             shift_periods = horizon // data_interval_minutes
-            
-            if has_multiple_stations:
-                # Group by station_id for multi-station data
-                df[f'target_{horizon}min'] = df.groupby('station_id')['water_level'].shift(-shift_periods)
-            else:
-                # Single station - no grouping needed
-                df[f'target_{horizon}min'] = df['water_level'].shift(-shift_periods)
+            df[f'target_{horizon}min'] = self._station_shift(df, water_level, -shift_periods)
+        
+        df.attrs['_target_cols'] = [f'target_{horizon}min' for horizon in horizons]
         
         return df
     
-    def clean_data(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
-        """Clean data - handle missing values and remove invalid rows"""
-        # Make a copy to avoid SettingWithCopyWarning
-        df = df.copy()
+    def clean_data(self, df: pd.DataFrame, config: Dict[str, Any],
+                   numeric_cols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Clean data - handle missing values and remove invalid rows
+        
+        numeric_cols lists the columns eligible for imputation; preprocess_data
+        passes the ones it knows about, other callers fall back to a dtype scan.
+        """
+        # No defensive copy: dropna/fillna below return new frames, and columns
+        # they leave untouched keep sharing their buffers with the input
         
         # Remove rows with missing lag features
         if config.get('remove_rows_with_missing_lags', True):
@@ -417,25 +463,24 @@ class PreprocessingService:
         # Impute remaining missing values
         strategy = config.get('missing_value_strategy', 'median')
         # Exclude datetime columns and only process numeric columns
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        if numeric_cols is None:
+            numeric_cols = df.select_dtypes(include=[np.number]).columns
         # Exclude any datetime-related columns that might have been converted
         exclude_cols = ['measured_at', 'created_at', 'id', 'station_id']
         numeric_cols = [col for col in numeric_cols if col not in exclude_cols]
         
-        if strategy == 'median':
-            for col in numeric_cols:
-                if df[col].isnull().any():
-                    df[col] = df[col].fillna(df[col].median())
-        elif strategy == 'mean':
-            for col in numeric_cols:
-                if df[col].isnull().any():
-                    df[col] = df[col].fillna(df[col].mean())
+        if strategy in ('median', 'mean') and len(numeric_cols) > 0:
+            # One vectorized fill for all columns; only columns with gaps are rewritten,
+            # and float32 features stay float32
+            numeric = df[numeric_cols]
+            fill_values = numeric.median() if strategy == 'median' else numeric.mean()
+            df = df.fillna(fill_values)
         
         return df
     
     def preprocess_data(self, station_id: Optional[int] = None, start_date: Optional[str] = None,
                        end_date: Optional[str] = None, 
-                       prediction_horizons: List[int] = [15, 30, 45, 60, 90],
+                       prediction_horizons: Sequence[int] = (15, 30, 45, 60, 90),
                        custom_configs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Main preprocessing pipeline
@@ -461,20 +506,26 @@ class PreprocessingService:
         # Fetch station data
         df = self.get_station_data(station_id, start_date, end_date)
         initial_records = len(df)
+        # Every column added from here on is a numeric feature or target
+        source_numeric_cols = [col for col in NUMERIC_SOURCE_COLUMNS if col in df.columns]
+        source_column_count = len(df.columns)
         
         # Apply preprocessing steps in order
         if configs.get('time_features', {}).get('enabled', True) if isinstance(configs.get('time_features'), dict) else 'time_features' in configs:
             time_config = configs.get('time_features', {})
             df = self.apply_time_features(df, time_config)
         
-        if 'lag_features' in configs:
-            df = self.apply_lag_features(df, configs['lag_features'])
-        
-        if 'rolling_statistics' in configs:
-            df = self.apply_rolling_statistics(df, configs['rolling_statistics'])
+        # Group rows by station once; feature steps slice stations by offset
+        df = self.group_by_station(df)
         
-        if 'rate_of_change' in configs:
-            df = self.apply_rate_of_change(df, configs['rate_of_change'])
+        # Lag, rolling statistics and rate of change share one pass over water_level
+        if any(key in configs for key in ('lag_features', 'rolling_statistics', 'rate_of_change')):
+            df = self.apply_water_level_features(
+                df,
+                lag_config=configs.get('lag_features'),
+                rolling_config=configs.get('rolling_statistics'),
+                rate_config=configs.get('rate_of_change')
+            )
         
         if 'rainfall_features' in configs:
             df = self.apply_rainfall_features(df, configs['rainfall_features'])
@@ -491,41 +542,47 @@ class PreprocessingService:
             target_config['prediction_horizons'] = prediction_horizons
             df = self.create_targets(df, target_config)
         
+        # Back to time order (get_station_data returns a fresh RangeIndex)
+        df = df.sort_index()
+        del df.attrs['_station_offsets'], df.attrs['_periods_per_hour']
+        
         # Clean data
         if 'data_cleaning' in configs:
-            df = self.clean_data(df, configs['data_cleaning'])
+            df = self.clean_data(
+                df, configs['data_cleaning'],
+                numeric_cols=source_numeric_cols + list(df.columns[source_column_count:])
+            )
         
         execution_time = time.time() - start_time
         
         # Generate summary
         # Exclude metadata and datetime columns from features
-        exclude_from_features = ['id', 'station_id', 'measured_at', 'created_at']
-        feature_cols = [col for col in df.columns 
-                       if col not in exclude_from_features and not col.startswith('target_')]
-        target_cols = [col for col in df.columns if col.startswith('target_')]
+        # Classified once here and kept in df.attrs for prepare_latest_data_for_prediction
+        target_cols = df.attrs.get('_target_cols', [])
+        exclude_from_features = {'id', 'station_id', 'measured_at', 'created_at', *target_cols}
+        feature_cols = [col for col in df.columns if col not in exclude_from_features]
+        df.attrs['_feature_cols'] = feature_cols
+        df.attrs['_target_cols'] = target_cols
         
         # Get sample data (first 10 rows)
         sample_size = min(10, len(df))
         sample_df = df.head(sample_size)
         
-        # Convert sample to list of dicts, handling datetime and NaN values
-        sample_data = []
-        for _, row in sample_df.iterrows():
-            record = {}
-            for col in df.columns:
-                value = row[col]
-                # Convert timestamps to ISO format
-                if pd.api.types.is_datetime64_any_dtype(df[col]):
-                    record[col] = value.isoformat() if pd.notna(value) else None
-                # Convert NaN to None
-                elif pd.isna(value):
-                    record[col] = None
-                # Round floats to 4 decimal places
-                elif isinstance(value, (float, np.float64, np.float32)):
-                    record[col] = round(float(value), 4)
-                else:
-                    record[col] = value
-            sample_data.append(record)
+        # Convert sample to list of dicts, handling datetime and NaN values.
+        # Columns are partitioned by dtype once and converted block-wise
+        datetime_cols = [col for col, dtype in sample_df.dtypes.items()
+                         if pd.api.types.is_datetime64_any_dtype(dtype)]
+        float_cols = [col for col, dtype in sample_df.dtypes.items()
+                      if pd.api.types.is_float_dtype(dtype)]
+        
+        sample = sample_df.copy()
+        # Round floats to 4 decimal places
+        sample[float_cols] = sample_df[float_cols].astype(np.float64).round(4)
+        # Convert timestamps to ISO format
+        for col in datetime_cols:
+            sample[col] = sample_df[col].map(lambda ts: ts.isoformat(), na_action='ignore')
+        # Convert NaN to None
+        sample_data = sample.astype(object).where(sample.notna(), None).to_dict(orient='records')
         
         return {
             'status': 'success',
@@ -581,15 +638,10 @@ class PreprocessingService:
             return None, None, None
         
         # Get feature columns (exclude targets and metadata, but KEEP station_id)
-        target_cols = [col for col in df.columns if col.startswith('target_')]
-        
-        # Exclude only metadata/identifier columns, keep all engineered features
-        exclude_cols = ['measured_at', 'id', 'created_at', 'fetched_at', 'source', 'status']
-        
-        feature_cols = [col for col in df.columns 
-                       if col not in target_cols 
-                       and col not in exclude_cols
-                       and not col.startswith('target_')]
+        # preprocess_data already classified the columns; station_id leads as in the frame
+        feature_cols = df.attrs['_feature_cols']
+        if 'station_id' in df.columns:
+            feature_cols = ['station_id'] + feature_cols
         
         # Get the most recent complete record
         # IMPORTANT: At this point, all lag and rolling features have been computed correctly
@@ -602,15 +654,15 @@ class PreprocessingService:
             print(f"   ⚠️  WARNING: Found {len(nan_cols)} features with NaN values: {nan_cols[:10]}")
             print(f"   🔧 These will be filled with the column mean from historical data")
             
-            # Fill NaN with the column mean from the full dataset (better than 0)
-            for col in nan_cols:
-                col_mean = df[col].mean()
+            # Fill NaN with the column mean from the full dataset (better than 0);
+            # all means in one pass, and 0 where the column has no historical data
+            col_means = df[nan_cols].mean()
+            X_latest = X_latest.fillna(col_means.fillna(0))
+            
+            for col, col_mean in col_means.items():
                 if pd.isna(col_mean):
-                    # If mean is also NaN (all values are NaN), use 0
-                    X_latest[col] = X_latest[col].fillna(0)
                     print(f"      • {col}: filled with 0 (no historical data)")
                 else:
-                    X_latest[col] = X_latest[col].fillna(col_mean)
                     print(f"      • {col}: filled with mean={col_mean:.2f}")
         else:
             print(f"   ✓ No NaN values in features - all computed correctly!")
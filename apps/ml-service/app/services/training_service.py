@@ -3,104 +3,229 @@ Training Service - Handles model training with MLflow tracking
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Any, NamedTuple, Optional, Tuple
 from datetime import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
 import time
+import joblib
 import mlflow
+from mlflow.entities import Metric, Param, Run, RunStatus, RunTag
+from mlflow.exceptions import MlflowException
+from mlflow.protos.databricks_pb2 import RESOURCE_ALREADY_EXISTS, ErrorCode
 from mlflow.tracking import MlflowClient
+from mlflow.tracking.default_experiment import DEFAULT_EXPERIMENT_ID
 from sklearn.linear_model import LinearRegression, Ridge
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.preprocessing import StandardScaler
 
 from app.config import get_settings
 from app.services.preprocessing_service import PreprocessingService
-from app.schemas.training import ModelMetrics, HorizonModelResult
+from app.services._train_kernels import residual_sums
+from app.schemas.training import HorizonModelResultList
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# MLflow log_batch limits: 1000 entities per request, at most 100 of them params/tags
+MLFLOW_BATCH_MAX_ENTITIES = 1000
+MLFLOW_BATCH_MAX_PARAMS_TAGS = 100
+
+# Horizons trained concurrently; per-horizon work is mostly MLflow I/O and GIL-releasing BLAS
+MAX_PARALLEL_HORIZONS = 4
+
+
+class TrainedMetrics(NamedTuple):
+    """Server-side metrics for a trained model (validated as ModelMetrics on output)"""
+    rmse: float
+    mae: float
+    r2: float
+
+
+def _regression_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> TrainedMetrics:
+    """RMSE, MAE and R² from one fused residual pass (same values as sklearn.metrics)"""
+    y_true = np.ascontiguousarray(y_true)
+    y_pred = np.ascontiguousarray(y_pred)
+    n = len(y_true)
+    
+    ss_res, sum_abs, ss_tot = residual_sums(y_true, y_pred, float(y_true.mean(dtype=np.float64)))
+    
+    # sklearn convention for a constant target: perfect fit is 1, anything else 0
+    if ss_tot == 0:
+        r2 = 1.0 if ss_res == 0 else 0.0
+    else:
+        r2 = 1.0 - ss_res / ss_tot
+    
+    return TrainedMetrics(
+        rmse=float(np.sqrt(ss_res / n)),
+        mae=float(sum_abs / n),
+        r2=r2
+    )
+
+
+def _fit_linear_multi_target(X: np.ndarray, Y: np.ndarray, alpha: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fit least squares (alpha=0) or ridge coefficients for every column of Y at once
+    
+    Same model as LinearRegression/Ridge with fit_intercept=True: X and Y are centered,
+    then the Gram matrix is built and factorized once for all targets instead of once
+    per horizon.
+    
+    Returns:
+        (coef, intercept) with shapes (n_targets, n_features) and (n_targets,)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    x_mean = X.mean(axis=0)
+    y_mean = Y.mean(axis=0)
+    X_centered = X - x_mean
+    Y_centered = Y - y_mean
+    
+    if alpha > 0:
+        gram = X_centered.T @ X_centered
+        gram[np.diag_indices_from(gram)] += alpha
+        coef = np.linalg.solve(gram, X_centered.T @ Y_centered)
+    else:
+        # Minimum-norm solution, like LinearRegression, for collinear features
+        coef = np.linalg.lstsq(X_centered, Y_centered, rcond=None)[0]
+    
+    return coef.T, y_mean - x_mean @ coef
+
+
+def _as_fitted(model, coef: np.ndarray, intercept: float, feature_names) -> Any:
+    """Give an unfitted sklearn linear model precomputed coefficients"""
+    model.coef_ = coef
+    model.intercept_ = float(intercept)
+    model.n_features_in_ = len(feature_names)
+    model.feature_names_in_ = np.asarray(feature_names, dtype=object)
+    return model
+
+
+@dataclass(slots=True, frozen=True)
+class TrainedHorizonResult:
+    """Server-side result for one model/horizon (validated as HorizonModelResult on output)"""
+    model_type: str
+    horizon_minutes: int
+    train_metrics: Optional[TrainedMetrics]
+    test_metrics: TrainedMetrics
+    training_time_seconds: float
+    mlflow_run_id: str
 
 
 class TrainingService:
     """Service for training ML models"""
     
+    # Experiment name -> id, shared by all service instances (experiments are never renamed here)
+    _experiment_ids: Dict[str, str] = {}
+    _experiment_ids_lock = threading.Lock()
+    
     def __init__(self):
         """Initialize training service"""
         self.preprocessing_service = PreprocessingService()
-        self.mlflow_client = MlflowClient()
         
         # Setup MLflow
         mlflow.set_tracking_uri(settings.mlflow_tracking_uri)
+        self.mlflow_client = MlflowClient()
+        
+        # Scratch space for artifacts shared by every run of a training call (removed with the service)
+        self._artifact_tmp = tempfile.TemporaryDirectory()
         
         # Disable logged model CRUD to avoid version mismatch between client and server
-        import os
         os.environ["MLFLOW_ENABLE_LOGGED_MODEL_CRUD"] = "false"
     
-    def save_performance_to_db_and_register(self, station_id: Optional[int], model_type: str, 
-                                           test_metrics: ModelMetrics, run_id: str, 
-                                           horizon_minutes: int, register_to_mlflow: bool = True) -> None:
+    def _build_performance_row(self, station_id: Optional[int], model_type: str,
+                               test_metrics: TrainedMetrics, run_id: str,
+                               horizon_minutes: int) -> Dict[str, Any]:
         """
-        Save model performance metrics to database and automatically register to MLflow Model Registry
+        Build a model_performance row for one trained model
         
         Note: The horizon is encoded in the model_type field (e.g., 'linear_15min', 'ridge_30min')
+        """
+        # Use station_id=0 for unified models (global station entry)
+        db_station_id = station_id if station_id is not None else 0
+        
+        # Calculate MAPE and accuracy
+        mape = (test_metrics.mae / abs(test_metrics.rmse)) * 100 if test_metrics.rmse != 0 else 0
+        accuracy = max(0, min(100, (1 - test_metrics.rmse) * 100))  # Simple accuracy calculation
+        
+        return {
+            'id': run_id,  # Use MLflow run_id as the primary key
+            'station_id': db_station_id,
+            'model_type': f"{model_type}_{horizon_minutes}min",
+            'rmse': float(test_metrics.rmse),
+            'mae': float(test_metrics.mae),
+            'r2': float(test_metrics.r2),
+            'mape': float(mape),
+            'accuracy': float(accuracy)
+        }
+    
+    def _flush_performance_rows(self, rows: List[Dict[str, Any]]) -> Any:
+        """Insert all model_performance rows in a single request"""
+        return self.preprocessing_service.supabase.table('model_performance').insert(rows).execute()
+    
+    def save_performance_to_db_and_register(self, station_id: Optional[int],
+                                           results: List[TrainedHorizonResult],
+                                           register_to_mlflow: bool = True) -> None:
+        """
+        Save model performance metrics to database and automatically register to MLflow Model Registry
+        
+        All rows go to the database in one insert; registration runs afterwards and
+        does not depend on the insert succeeding.
         
         Args:
             station_id: Station ID (None for unified model across all stations)
-            model_type: Type of model (linear, ridge) - will be combined with horizon
-            test_metrics: Test set metrics
-            run_id: MLflow run ID
-            horizon_minutes: Prediction horizon in minutes
+            results: Best model result for each horizon
             register_to_mlflow: Whether to register model to MLflow Model Registry (default: True)
         """
-        # Use station_id=0 for unified models (global station entry)
-        db_station_id = station_id if station_id is not None else 0
+        performance_rows = [
+            self._build_performance_row(
+                station_id=station_id,
+                model_type=result.model_type,
+                test_metrics=result.test_metrics,
+                run_id=result.mlflow_run_id,
+                horizon_minutes=result.horizon_minutes
+            )
+            for result in results
+        ]
         
         try:
-            # Calculate MAPE and accuracy
-            mape = (test_metrics.mae / abs(test_metrics.rmse)) * 100 if test_metrics.rmse != 0 else 0
-            accuracy = max(0, min(100, (1 - test_metrics.rmse) * 100))  # Simple accuracy calculation
-            
-            performance_data = {
-                'id': run_id,  # Use MLflow run_id as the primary key
-                'station_id': db_station_id,
-                'model_type': f"{model_type}_{horizon_minutes}min",
-                'rmse': float(test_metrics.rmse),
-                'mae': float(test_metrics.mae),
-                'r2': float(test_metrics.r2),
-                'mape': float(mape),
-                'accuracy': float(accuracy)
-            }
-            
             # Insert into model_performance table
-            response = self.preprocessing_service.supabase.table('model_performance').insert(performance_data).execute()
+            response = self._flush_performance_rows(performance_rows)
             
             if response.data:
                 model_scope = "unified" if station_id is None else f"station {station_id}"
-                print(f"      ✓ Performance saved to database ({model_scope}, MLflow ID: {run_id[:8]}...)")
-                
-                # Auto-register to MLflow Model Registry
-                print(f"      🔍 DEBUG: register_to_mlflow={register_to_mlflow}, type={type(register_to_mlflow)}")
-                if register_to_mlflow:
-                    print(f"      🔄 Calling _register_model_to_mlflow()...")
-                    self._register_model_to_mlflow(
-                        run_id=run_id,
-                        station_id=station_id,
-                        model_type=model_type,
-                        horizon_minutes=horizon_minutes,
-                        test_metrics=test_metrics
-                    )
-                else:
-                    print(f"      ⏭️  Skipping registration (register_to_mlflow={register_to_mlflow})")
+                print(f"      ✓ Performance saved to database ({model_scope}, {len(response.data)} models)")
             
         except Exception as e:
-            import traceback
-            error_details = traceback.format_exc()
             print(f"      ⚠ Warning: Failed to save performance to database:")
             print(f"         Error: {str(e)}")
-            print(f"         Data attempted: {performance_data}")
+            print(f"         Data attempted: {performance_rows}")
             # Don't fail training if database insert fails
+        
+        # Auto-register to MLflow Model Registry
+        logger.debug("register_to_mlflow=%s for %d results", register_to_mlflow, len(results))
+        if register_to_mlflow:
+            for result in results:
+                logger.debug("Registering run %s", result.mlflow_run_id)
+                self._register_model_to_mlflow(
+                    run_id=result.mlflow_run_id,
+                    station_id=station_id,
+                    model_type=result.model_type,
+                    horizon_minutes=result.horizon_minutes,
+                    test_metrics=result.test_metrics
+                )
+        else:
+            logger.debug("Skipping MLflow registration")
     
     def _register_model_to_mlflow(self, run_id: str, station_id: Optional[int], 
                                   model_type: str, horizon_minutes: int, 
-                                  test_metrics: ModelMetrics) -> None:
+                                  test_metrics: TrainedMetrics) -> None:
         """
         Register trained model to MLflow Model Registry
         
@@ -111,62 +236,42 @@ class TrainingService:
             horizon_minutes: Prediction horizon in minutes
             test_metrics: Test set metrics
         """
-        print(f"      🎯 _register_model_to_mlflow() called with run_id={run_id[:8]}...")
+        logger.debug("_register_model_to_mlflow(run_id=%s)", run_id)
         try:
             # Generate model name
             station_tag = f"station{station_id}" if station_id is not None else "unified"
             model_name = f"swfm-{model_type}-{station_tag}-{horizon_minutes}min"
             
-            # Get the model URI from the run
-            model_uri = f"runs:/{run_id}/model"
+            # Resolve the logged model's artifact location from the run
+            run = self.mlflow_client.get_run(run_id)
+            model_source = f"{run.info.artifact_uri}/model"
             
-            # Register the model
-            model_version = mlflow.register_model(
-                model_uri=model_uri,
-                name=model_name
-            )
-            version = model_version.version
-            
-            # Add tags with metadata
-            self.mlflow_client.set_model_version_tag(
-                name=model_name,
-                version=version,
-                key="station_id",
-                value=str(station_id) if station_id is not None else "unified"
-            )
-            self.mlflow_client.set_model_version_tag(
-                name=model_name,
-                version=version,
-                key="model_type",
-                value=model_type
-            )
-            self.mlflow_client.set_model_version_tag(
-                name=model_name,
-                version=version,
-                key="horizon_minutes",
-                value=str(horizon_minutes)
-            )
-            self.mlflow_client.set_model_version_tag(
-                name=model_name,
-                version=version,
-                key="rmse",
-                value=str(test_metrics.rmse)
-            )
-            self.mlflow_client.set_model_version_tag(
-                name=model_name,
-                version=version,
-                key="r2",
-                value=str(test_metrics.r2)
-            )
+            # Same steps as mlflow.register_model, but on the shared client: make sure the
+            # registered model exists, then create the version with its tags in one request
+            try:
+                self.mlflow_client.create_registered_model(model_name)
+            except MlflowException as e:
+                if e.error_code != ErrorCode.Name(RESOURCE_ALREADY_EXISTS):
+                    raise
             
-            # Update model description
             station_desc = f"Station {station_id}" if station_id is not None else "All stations (unified)"
             description = f"{model_type.title()} regression model for {station_desc}, {horizon_minutes}-min horizon. RMSE: {test_metrics.rmse:.4f}, R²: {test_metrics.r2:.4f}"
-            self.mlflow_client.update_model_version(
+            
+            # Tags and description go with the version itself - no follow-up update requests
+            model_version = self.mlflow_client.create_model_version(
                 name=model_name,
-                version=version,
+                source=model_source,
+                run_id=run_id,
+                tags={
+                    "station_id": str(station_id) if station_id is not None else "unified",
+                    "model_type": model_type,
+                    "horizon_minutes": str(horizon_minutes),
+                    "rmse": str(test_metrics.rmse),
+                    "r2": str(test_metrics.r2)
+                },
                 description=description
             )
+            version = model_version.version
             
             print(f"      ✓ Model registered in MLflow: {model_name} v{version}")
             
@@ -174,6 +279,87 @@ class TrainingService:
             # Don't fail training if model registration fails
             print(f"      ⚠ Warning: Failed to register model to MLflow: {str(e)}")
     
+    def _ensure_experiment(self, experiment_name: str) -> str:
+        """Return the id of an MLflow experiment, creating it on first use; cached across calls"""
+        with self._experiment_ids_lock:
+            experiment_id = self._experiment_ids.get(experiment_name)
+            if experiment_id is None:
+                experiment = self.mlflow_client.get_experiment_by_name(experiment_name)
+                if experiment is None:
+                    experiment_id = self.mlflow_client.create_experiment(experiment_name)
+                else:
+                    experiment_id = experiment.experiment_id
+                self._experiment_ids[experiment_name] = experiment_id
+            return experiment_id
+    
+    @contextmanager
+    def _client_run(self, experiment_id: Optional[str], run_name: str) -> Iterator[Run]:
+        """
+        Create and terminate a run through the shared MlflowClient
+        
+        Unlike mlflow.start_run this keeps no active-run state, so runs can be
+        open in several threads at once.
+        """
+        run = self.mlflow_client.create_run(experiment_id or DEFAULT_EXPERIMENT_ID, run_name=run_name)
+        status = RunStatus.to_string(RunStatus.FAILED)
+        try:
+            yield run
+            status = RunStatus.to_string(RunStatus.FINISHED)
+        finally:
+            self.mlflow_client.set_terminated(run.info.run_id, status=status)
+    
+    def _log_sklearn_model(self, run_id: str, model: Any) -> None:
+        """Save a sklearn model in MLflow format and upload it as the run's 'model' artifact"""
+        model_dir = os.path.join(self._artifact_tmp.name, run_id, "model")
+        try:
+            mlflow.sklearn.save_model(model, model_dir)
+            self.mlflow_client.log_artifacts(run_id, model_dir, artifact_path="model")
+        finally:
+            # Uploaded (or failed); don't keep one directory per run for the service's lifetime
+            shutil.rmtree(os.path.dirname(model_dir), ignore_errors=True)
+    
+    def _log_batch(self, run_id: str, params: Optional[Dict[str, Any]] = None,
+                   metrics: Optional[Dict[str, float]] = None,
+                   tags: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Log params, metrics and tags for a run with as few MLflow requests as possible
+        
+        Each log_param/log_metric call is a separate round trip to the tracking server,
+        so everything is sent through MlflowClient.log_batch, chunked to MLflow's limits.
+        
+        Args:
+            run_id: MLflow run ID
+            params: Parameters to log (values are stringified)
+            metrics: Metrics to log
+            tags: Run tags to log (values are stringified)
+        """
+        timestamp = int(time.time() * 1000)
+        param_list = [Param(key, str(value)) for key, value in (params or {}).items()]
+        tag_list = [RunTag(key, str(value)) for key, value in (tags or {}).items()]
+        metric_list = [Metric(key, float(value), timestamp, 0) for key, value in (metrics or {}).items()]
+        
+        while param_list or tag_list or metric_list:
+            param_chunk = param_list[:MLFLOW_BATCH_MAX_PARAMS_TAGS]
+            tag_chunk = tag_list[:MLFLOW_BATCH_MAX_PARAMS_TAGS - len(param_chunk)]
+            metric_chunk = metric_list[:MLFLOW_BATCH_MAX_ENTITIES - len(param_chunk) - len(tag_chunk)]
+            
+            self.mlflow_client.log_batch(run_id, metrics=metric_chunk, params=param_chunk, tags=tag_chunk)
+            
+            param_list = param_list[len(param_chunk):]
+            tag_list = tag_list[len(tag_chunk):]
+            metric_list = metric_list[len(metric_chunk):]
+    
+    def _log_run_data(self, run_id: str, params: Dict[str, Any], metrics: Dict[str, float],
+                      log_batch: bool = True) -> None:
+        """Log run params and metrics, batched into one request unless log_batch is False"""
+        if log_batch:
+            self._log_batch(run_id, params=params, metrics=metrics)
+        else:
+            for key, value in params.items():
+                self.mlflow_client.log_param(run_id, key, value)
+            for key, value in metrics.items():
+                self.mlflow_client.log_metric(run_id, key, value)
+    
     def prepare_training_data(
         self,
         station_id: Optional[int] = None,
@@ -182,7 +368,7 @@ class TrainingService:
         prediction_horizons: List[int] = [15, 30, 45, 60],
         test_size: float = 0.2,
         use_time_split: bool = True
-    ) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[int, pd.Series], Dict[int, pd.Series], List[str], StandardScaler, Dict[str, Any]]:
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[int, np.ndarray], Dict[int, np.ndarray], List[str], StandardScaler, Dict[str, Any]]:
         """
         Prepare data for training using preprocessing service
         
@@ -197,31 +383,27 @@ class TrainingService:
         # If dates not provided, fetch from training_data_range configuration
         if start_date is None or end_date is None:
             try:
-                training_range_config = self.preprocessing_service.supabase.table('preprocessing_configs')\
-                    .select('config')\
-                    .eq('method_id', 'training_data_range')\
-                    .eq('enabled', True)\
-                    .single()\
-                    .execute()
+                # Served from the preprocessing service's TTL-cached enabled configs
+                config = self.preprocessing_service.get_preprocessing_configs().get('training_data_range')
+                if config is None:
+                    raise ValueError("training_data_range config not found or disabled")
+                
+                from dateutil.relativedelta import relativedelta
+                from datetime import datetime as dt
+                
+                months = config.get('months', 1)
                 
-                if training_range_config.data:
-                    from dateutil.relativedelta import relativedelta
-                    from datetime import datetime as dt
-                    
-                    config = training_range_config.data['config']
-                    months = config.get('months', 1)
-                    
-                    # Calculate date range: current timestamp - N months to current timestamp
-                    if end_date is None:
-                        end_date = dt.now().strftime('%Y-%m-%d')
-                    
-                    if start_date is None:
-                        end_dt = dt.strptime(end_date, '%Y-%m-%d')
-                        start_dt = end_dt - relativedelta(months=months)
-                        start_date = start_dt.strftime('%Y-%m-%d')
-                    
-                    print(f"   📅 Using training_data_range config: {months} month(s)")
-                    print(f"   📅 Date range: {start_date} to {end_date}")
+                # Calculate date range: current timestamp - N months to current timestamp
+                if end_date is None:
+                    end_date = dt.now().strftime('%Y-%m-%d')
+                
+                if start_date is None:
+                    end_dt = dt.strptime(end_date, '%Y-%m-%d')
+                    start_dt = end_dt - relativedelta(months=months)
+                    start_date = start_dt.strftime('%Y-%m-%d')
+                
+                print(f"   📅 Using training_data_range config: {months} month(s)")
+                print(f"   📅 Date range: {start_date} to {end_date}")
             except Exception as e:
                 print(f"   ⚠️  Could not fetch training_data_range config: {e}")
                 # Use default dates if config not found
@@ -249,84 +431,111 @@ class TrainingService:
         
         # Get feature columns (exclude targets, timestamps, metadata)
         # Note: station_id is INCLUDED as a feature when training on all stations
-        exclude_cols = ['measured_at', 'id', 'created_at', 'weather_source', 
-                       'weather_lag_minutes', 'station_name', 'latitude', 'longitude', 
-                       'country', 'alarm_level']
+        exclude_cols = {'measured_at', 'id', 'created_at', 'weather_source', 
+                        'weather_lag_minutes', 'station_name', 'latitude', 'longitude', 
+                        'country', 'alarm_level'}
         
         # If training on single station, exclude station_id (it's constant)
         if station_id is not None:
-            exclude_cols.append('station_id')
+            exclude_cols.add('station_id')
         
         # Also exclude target columns
         target_cols = [f'target_{h}min' for h in prediction_horizons]
-        exclude_cols.extend(target_cols)
+        exclude_cols.update(target_cols)
         
-        # Filter for numeric columns only and exclude metadata/targets
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        feature_cols = [col for col in numeric_cols if col not in exclude_cols]
+        # Numeric (non-bool) columns minus metadata/targets, in one pass over the dtypes
+        feature_cols = [
+            col for col, dtype in df.dtypes.items()
+            if col not in exclude_cols
+            and pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        ]
         
         # Remove rows with NaN in any target
         valid_mask = df[target_cols].notna().all(axis=1)
-        df_clean = df[valid_mask].copy()
+        df_clean = df[valid_mask]
         
         print(f"   ✓ Data cleaned: {len(df_clean):,} valid samples (from {len(df):,})")
         
-        # Prepare features (ensure only numeric columns)
-        X = df_clean[feature_cols].copy()
+        # Prepare features as a single float32 matrix; this gather is the only full copy,
+        # everything below works on it in place or through views
+        X = df_clean[feature_cols].to_numpy(dtype=np.float32, copy=True)
         
         # Suppress numpy warnings about empty slices during feature validation
         import warnings
         warnings.filterwarnings('ignore', category=RuntimeWarning, message='Mean of empty slice')
         
-        # Check for features with all NaN or constant values and remove them
-        nan_features = X.columns[X.isna().all()].tolist()
-        constant_features = X.columns[X.nunique() <= 1].tolist()
-        invalid_features = list(set(nan_features + constant_features))
+        # Check for features with all NaN or constant values and remove them,
+        # using one NaN-aware min/max pass over the matrix (no per-column nunique hashing)
+        present = ~np.isnan(X)
+        col_max = np.max(X, axis=0, initial=-np.inf, where=present)
+        col_min = np.min(X, axis=0, initial=np.inf, where=present)
+        invalid_mask = (col_max == col_min) | (col_max < col_min)  # constant | all NaN
+        invalid_features = [col for col, invalid in zip(feature_cols, invalid_mask) if invalid]
         
         if invalid_features:
             print(f"   ⚠ Removing {len(invalid_features)} invalid features: {invalid_features[:5]}...")
-            X = X.drop(columns=invalid_features)
-            feature_cols = [col for col in feature_cols if col not in invalid_features]
+            X = X[:, ~invalid_mask]
+            present = present[:, ~invalid_mask]
+            feature_cols = [col for col, invalid in zip(feature_cols, invalid_mask) if not invalid]
         
         # Fill any remaining NaN values with 0 (after lag/rolling window initialization)
-        if X.isna().any().any():
-            nan_count = X.isna().sum().sum()
+        nan_count = X.size - int(np.count_nonzero(present))
+        if nan_count:
             print(f"   ⚠ Filling {nan_count} remaining NaN values with 0")
-            X = X.fillna(0)
+            X[~present] = 0
         
         # Re-enable warnings
         warnings.filterwarnings('default', category=RuntimeWarning)
         
-        # Create target dictionaries
-        y_dict = {h: df_clean[f'target_{h}min'] for h in prediction_horizons}
+        # All targets as one (samples, horizons) matrix, split with plain NumPy indexing
+        Y = df_clean[target_cols].to_numpy(dtype=np.float32)
         
         # Split train/test
         if use_time_split:
             # Time-based split
             split_idx = int(len(X) * (1 - test_size))
-            X_train = X.iloc[:split_idx]
-            X_test = X.iloc[split_idx:]
-            y_train_dict = {h: y_dict[h].iloc[:split_idx] for h in prediction_horizons}
-            y_test_dict = {h: y_dict[h].iloc[split_idx:] for h in prediction_horizons}
+            train_idx, test_idx = slice(None, split_idx), slice(split_idx, None)
+            X_train = X[train_idx]
+            X_test = X[test_idx]
+            Y_train, Y_test = Y[train_idx], Y[test_idx]
         else:
             # Random split
             from sklearn.model_selection import train_test_split
             train_idx, test_idx = train_test_split(
                 range(len(X)), test_size=test_size, random_state=42
             )
-            X_train = X.iloc[train_idx]
-            X_test = X.iloc[test_idx]
-            y_train_dict = {h: y_dict[h].iloc[train_idx] for h in prediction_horizons}
-            y_test_dict = {h: y_dict[h].iloc[test_idx] for h in prediction_horizons}
-        
-        # Scale features
+            X_train = X[train_idx]
+            X_test = X[test_idx]
+            Y_train, Y_test = Y[train_idx], Y[test_idx]
+        
+        y_train_dict = {h: Y_train[:, i] for i, h in enumerate(prediction_horizons)}
+        y_test_dict = {h: Y_test[:, i] for i, h in enumerate(prediction_horizons)}
+        
+        # Standardize in place on the float32 matrices: center with the float64 train mean,
+        # then take the variance from the centered values (float64 accumulation)
+        mean = X_train.mean(axis=0, dtype=np.float64)
+        X_train -= mean.astype(np.float32)
+        var = np.einsum('ij,ij->j', X_train, X_train, dtype=np.float64) / len(X_train)
+        scale = np.sqrt(var)
+        scale[scale == 0] = 1.0
+        X_train /= scale.astype(np.float32)
+        X_test -= mean.astype(np.float32)
+        X_test /= scale.astype(np.float32)
+        
+        # Expose the statistics as a fitted StandardScaler, which is what gets logged and
+        # what the prediction endpoint loads and calls transform/mean_ on
         scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-        
-        # Convert back to DataFrame
-        X_train = pd.DataFrame(X_train_scaled, columns=feature_cols, index=X_train.index)
-        X_test = pd.DataFrame(X_test_scaled, columns=feature_cols, index=X_test.index)
+        scaler.mean_ = mean
+        scaler.var_ = var
+        scaler.scale_ = scale
+        scaler.n_samples_seen_ = len(X_train)
+        scaler.n_features_in_ = len(feature_cols)
+        scaler.feature_names_in_ = np.asarray(feature_cols, dtype=object)
+        
+        # Wrap into DataFrames without copying; models need the column names
+        # (the prediction endpoint aligns inputs on feature_names_in_)
+        X_train = pd.DataFrame(X_train, columns=feature_cols, index=df_clean.index[train_idx], copy=False)
+        X_test = pd.DataFrame(X_test, columns=feature_cols, index=df_clean.index[test_idx], copy=False)
         
         prep_time = time.time() - start_time
         
@@ -348,70 +557,62 @@ class TrainingService:
         self,
         X_train: pd.DataFrame,
         X_test: pd.DataFrame,
-        y_train: pd.Series,
-        y_test: pd.Series,
+        y_train: np.ndarray,
+        y_test: np.ndarray,
         horizon: int = 60,
         run_name: Optional[str] = None,
-        scaler: Optional[StandardScaler] = None
-    ) -> Tuple[Any, Dict[str, ModelMetrics], float, str]:
-        """Train Linear Regression model"""
+        preprocessing_dir: Optional[str] = None,
+        log_batch: bool = True,
+        model: Optional[LinearRegression] = None,
+        compute_train_metrics: bool = False,
+        experiment_id: Optional[str] = None,
+        log_model_artifact: bool = True,
+        fit_time_seconds: float = 0.0
+    ) -> Tuple[Any, Dict[str, Optional[TrainedMetrics]], float, str]:
+        """Train Linear Regression model (or evaluate and log an already fitted one)"""
         start_time = time.time()
         
-        with mlflow.start_run(run_name=run_name or f"linear_{horizon}min") as run:
-            # Log parameters
-            mlflow.log_param("model_type", "linear")
-            mlflow.log_param("horizon_minutes", horizon)
-            mlflow.log_param("n_features", X_train.shape[1])
-            mlflow.log_param("train_samples", len(X_train))
-            mlflow.log_param("test_samples", len(X_test))
+        with self._client_run(experiment_id, run_name or f"linear_{horizon}min") as run:
+            params = {
+                "model_type": "linear",
+                "horizon_minutes": horizon,
+                "n_features": X_train.shape[1],
+                "train_samples": len(X_train),
+                "test_samples": len(X_test)
+            }
             
             # Train model
-            model = LinearRegression()
-            model.fit(X_train, y_train)
-            
-            # Predictions
-            y_train_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
-            
-            # Calculate metrics
-            train_metrics = ModelMetrics(
-                rmse=float(np.sqrt(mean_squared_error(y_train, y_train_pred))),
-                mae=float(mean_absolute_error(y_train, y_train_pred)),
-                r2=float(r2_score(y_train, y_train_pred))
-            )
+            if model is None:
+                model = LinearRegression()
+                model.fit(X_train, y_train)
+            
+            # Test metrics drive model selection; train metrics are an opt-in diagnostic
+            test_metrics = _regression_metrics(y_test, model.predict(X_test))
+            train_metrics = _regression_metrics(y_train, model.predict(X_train)) if compute_train_metrics else None
+            
+            # fit_time_seconds covers fitting done before an already fitted model was passed in
+            training_time = fit_time_seconds + time.time() - start_time
+            
+            run_metrics = {
+                "test_rmse": test_metrics.rmse,
+                "test_mae": test_metrics.mae,
+                "test_r2": test_metrics.r2,
+                "training_time_seconds": training_time
+            }
+            if train_metrics is not None:
+                run_metrics.update(train_rmse=train_metrics.rmse, train_mae=train_metrics.mae, train_r2=train_metrics.r2)
             
-            test_metrics = ModelMetrics(
-                rmse=float(np.sqrt(mean_squared_error(y_test, y_test_pred))),
-                mae=float(mean_absolute_error(y_test, y_test_pred)),
-                r2=float(r2_score(y_test, y_test_pred))
-            )
+            # Log parameters and metrics in a single batch
+            self._log_run_data(run.info.run_id, params, run_metrics, log_batch=log_batch)
             
-            # Log metrics
-            mlflow.log_metric("train_rmse", train_metrics.rmse)
-            mlflow.log_metric("train_mae", train_metrics.mae)
-            mlflow.log_metric("train_r2", train_metrics.r2)
-            mlflow.log_metric("test_rmse", test_metrics.rmse)
-            mlflow.log_metric("test_mae", test_metrics.mae)
-            mlflow.log_metric("test_r2", test_metrics.r2)
-            
-            training_time = time.time() - start_time
-            mlflow.log_metric("training_time_seconds", training_time)
-            
-            # Save scaler as artifact if provided
-            if scaler is not None:
-                import joblib
-                import tempfile
-                import os
-                with tempfile.TemporaryDirectory() as tmp_dir:
-                    scaler_path = os.path.join(tmp_dir, "scaler.pkl")
-                    joblib.dump(scaler, scaler_path)
-                    mlflow.log_artifact(scaler_path, artifact_path="preprocessing")
-            
-            # Log model artifact (required for model registration)
-            mlflow.sklearn.log_model(
-                model,
-                artifact_path="model"
-            )
+            # Attach the already serialized preprocessing artifacts (scaler, feature names) if provided
+            if preprocessing_dir is not None:
+                self.mlflow_client.log_artifacts(run.info.run_id, preprocessing_dir, artifact_path="preprocessing")
+            
+            # Log model artifact (required for model registration); callers comparing
+            # several candidates can skip it and log only the one they keep
+            if log_model_artifact:
+                self._log_sklearn_model(run.info.run_id, model)
             
             run_id = run.info.run_id
         
@@ -426,72 +627,64 @@ class TrainingService:
         self,
         X_train: pd.DataFrame,
         X_test: pd.DataFrame,
-        y_train: pd.Series,
-        y_test: pd.Series,
+        y_train: np.ndarray,
+        y_test: np.ndarray,
         alpha: float = 1.0,
         horizon: int = 60,
         run_name: Optional[str] = None,
-        scaler: Optional[StandardScaler] = None
-    ) -> Tuple[Any, Dict[str, ModelMetrics], float, str]:
-        """Train Ridge regression model"""
+        preprocessing_dir: Optional[str] = None,
+        log_batch: bool = True,
+        model: Optional[Ridge] = None,
+        compute_train_metrics: bool = False,
+        experiment_id: Optional[str] = None,
+        log_model_artifact: bool = True,
+        fit_time_seconds: float = 0.0
+    ) -> Tuple[Any, Dict[str, Optional[TrainedMetrics]], float, str]:
+        """Train Ridge regression model (or evaluate and log an already fitted one)"""
         start_time = time.time()
         
-        with mlflow.start_run(run_name=run_name or f"ridge_{horizon}min") as run:
-            # Log parameters
-            mlflow.log_param("model_type", "ridge")
-            mlflow.log_param("horizon_minutes", horizon)
-            mlflow.log_param("alpha", alpha)
-            mlflow.log_param("n_features", X_train.shape[1])
-            mlflow.log_param("train_samples", len(X_train))
-            mlflow.log_param("test_samples", len(X_test))
+        with self._client_run(experiment_id, run_name or f"ridge_{horizon}min") as run:
+            params = {
+                "model_type": "ridge",
+                "horizon_minutes": horizon,
+                "alpha": alpha,
+                "n_features": X_train.shape[1],
+                "train_samples": len(X_train),
+                "test_samples": len(X_test)
+            }
             
             # Train model
-            model = Ridge(alpha=alpha, random_state=42)
-            model.fit(X_train, y_train)
-            
-            # Predictions
-            y_train_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
-            
-            # Calculate metrics
-            train_metrics = ModelMetrics(
-                rmse=float(np.sqrt(mean_squared_error(y_train, y_train_pred))),
-                mae=float(mean_absolute_error(y_train, y_train_pred)),
-                r2=float(r2_score(y_train, y_train_pred))
-            )
+            if model is None:
+                model = Ridge(alpha=alpha, random_state=42)
+                model.fit(X_train, y_train)
+            
+            # Test metrics drive model selection; train metrics are an opt-in diagnostic
+            test_metrics = _regression_metrics(y_test, model.predict(X_test))
+            train_metrics = _regression_metrics(y_train, model.predict(X_train)) if compute_train_metrics else None
+            
+            # fit_time_seconds covers fitting done before an already fitted model was passed in
+            training_time = fit_time_seconds + time.time() - start_time
+            
+            run_metrics = {
+                "test_rmse": test_metrics.rmse,
+                "test_mae": test_metrics.mae,
+                "test_r2": test_metrics.r2,
+                "training_time_seconds": training_time
+            }
+            if train_metrics is not None:
+                run_metrics.update(train_rmse=train_metrics.rmse, train_mae=train_metrics.mae, train_r2=train_metrics.r2)
             
-            test_metrics = ModelMetrics(
-                rmse=float(np.sqrt(mean_squared_error(y_test, y_test_pred))),
-                mae=float(mean_absolute_error(y_test, y_test_pred)),
-                r2=float(r2_score(y_test, y_test_pred))
-            )
+            # Log parameters and metrics in a single batch
+            self._log_run_data(run.info.run_id, params, run_metrics, log_batch=log_batch)
             
-            # Log metrics
-            mlflow.log_metric("train_rmse", train_metrics.rmse)
-            mlflow.log_metric("train_mae", train_metrics.mae)
-            mlflow.log_metric("train_r2", train_metrics.r2)
-            mlflow.log_metric("test_rmse", test_metrics.rmse)
-            mlflow.log_metric("test_mae", test_metrics.mae)
-            mlflow.log_metric("test_r2", test_metrics.r2)
-            
-            training_time = time.time() - start_time
-            mlflow.log_metric("training_time_seconds", training_time)
-            
-            # Save scaler as artifact if provided
-            if scaler is not None:
-                import joblib
-                import tempfile
-                import os
-                with tempfile.TemporaryDirectory() as tmp_dir:
-                    scaler_path = os.path.join(tmp_dir, "scaler.pkl")
-                    joblib.dump(scaler, scaler_path)
-                    mlflow.log_artifact(scaler_path, artifact_path="preprocessing")
-            
-            # Log model artifact (required for model registration)
-            mlflow.sklearn.log_model(
-                model,
-                artifact_path="model"
-            )
+            # Attach the already serialized preprocessing artifacts (scaler, feature names) if provided
+            if preprocessing_dir is not None:
+                self.mlflow_client.log_artifacts(run.info.run_id, preprocessing_dir, artifact_path="preprocessing")
+            
+            # Log model artifact (required for model registration); callers comparing
+            # several candidates can skip it and log only the one they keep
+            if log_model_artifact:
+                self._log_sklearn_model(run.info.run_id, model)
             
             run_id = run.info.run_id
         
@@ -514,13 +707,18 @@ class TrainingService:
         ridge_alpha: float = 1.0,
         experiment_name: Optional[str] = None,
         register_model: bool = True,
-        model_stage: str = "None"
+        model_stage: str = "None",
+        log_batch: bool = True,
+        station_name: Optional[str] = None,
+        compute_train_metrics: bool = False
     ) -> Dict[str, Any]:
         """
         Train multiple models for multiple horizons
         
         Args:
             station_id: Station ID (if None, trains unified model on all stations)
+            station_name: Station name if already known (skips the stations lookup)
+            compute_train_metrics: Also evaluate each model on the training set
         
         Returns:
             Dictionary with training results
@@ -535,13 +733,14 @@ class TrainingService:
         
         overall_start = time.time()
         
-        # Get station info
-        if station_id is not None:
-            station_info = self.preprocessing_service.supabase.table('stations')\
-                .select('*').eq('id', station_id).execute()
-            station_name = station_info.data[0]['name'] if station_info.data else f"Station {station_id}"
-        else:
-            station_name = "All Stations (Unified Model)"
+        # Get station info (unless the caller already has it)
+        if station_name is None:
+            if station_id is not None:
+                station_info = self.preprocessing_service.supabase.table('stations')\
+                    .select('name').eq('id', station_id).execute()
+                station_name = station_info.data[0]['name'] if station_info.data else f"Station {station_id}"
+            else:
+                station_name = "All Stations (Unified Model)"
         
         # Setup experiment
         if experiment_name is None:
@@ -550,13 +749,8 @@ class TrainingService:
             else:
                 experiment_name = "swfm-unified-model"
         
-        experiment = mlflow.get_experiment_by_name(experiment_name)
-        if experiment is None:
-            experiment_id = mlflow.create_experiment(experiment_name)
-        else:
-            experiment_id = experiment.experiment_id
-        
-        mlflow.set_experiment(experiment_name)
+        # Runs are created with this id explicitly, so no fluent set_experiment is needed
+        experiment_id = self._ensure_experiment(experiment_name)
         
         # Prepare data
         X_train, X_test, y_train_dict, y_test_dict, feature_names, scaler, prep_stats = \
@@ -569,106 +763,142 @@ class TrainingService:
                 use_time_split=use_time_split
             )
         
-        # Train models
-        all_results = []
-        best_models = {}
-        
-        for horizon in prediction_horizons:
-            print(f"\n{'='*70}")
-            print(f"🎯 Training for {horizon}-minute horizon")
-            print(f"{'='*70}")
-            
+        # Serialize the preprocessing artifacts once; every run uploads the same directory.
+        # The scaler is a couple of small arrays, so skip compression
+        preprocessing_dir = os.path.join(self._artifact_tmp.name, "preprocessing")
+        os.makedirs(preprocessing_dir, exist_ok=True)
+        joblib.dump(scaler, os.path.join(preprocessing_dir, "scaler.pkl"), compress=0, protocol=5)
+        with open(os.path.join(preprocessing_dir, "feature_names.json"), "w") as f:
+            json.dump(feature_names, f)
+        
+        # X_train is shared by every horizon, so each model type is fitted for all
+        # horizons at once from a single factorization
+        Y_train = np.column_stack([y_train_dict[h] for h in prediction_horizons])
+        multi_fits = {}
+        # Each horizon's runs report an equal share of their model type's shared fit time
+        fit_time_per_horizon = {}
+        if "linear" in model_types:
+            fit_start = time.time()
+            multi_fits["linear"] = _fit_linear_multi_target(X_train, Y_train)
+            fit_time_per_horizon["linear"] = (time.time() - fit_start) / len(prediction_horizons)
+        if "ridge" in model_types:
+            fit_start = time.time()
+            multi_fits["ridge"] = _fit_linear_multi_target(X_train, Y_train, alpha=ridge_alpha)
+            fit_time_per_horizon["ridge"] = (time.time() - fit_start) / len(prediction_horizons)
+        
+        station_tag = f"station{station_id}" if station_id is not None else "unified"
+        
+        def train_horizon(horizon_idx: int, horizon: int) -> Optional[TrainedHorizonResult]:
+            """Train every model type for one horizon, log the best model and return its result"""
+            print(f"\n🎯 Training for {horizon}-minute horizon")
+            
+            # prepare_training_data already dropped rows with any missing target
             y_train = y_train_dict[horizon]
             y_test = y_test_dict[horizon]
             
-            # Remove NaN
-            train_mask = y_train.notna()
-            test_mask = y_test.notna()
-            
-            X_train_clean = X_train[train_mask]
-            y_train_clean = y_train[train_mask]
-            X_test_clean = X_test[test_mask]
-            y_test_clean = y_test[test_mask]
-            
-            horizon_models = []
             trained_results = []
+            trained_models = []
             
             # Train Linear Regression
             if "linear" in model_types:
-                print(f"\n   🔄 Training Linear Regression...")
-                station_tag = f"station{station_id}" if station_id is not None else "unified"
                 model, metrics, train_time, run_id = self.train_linear(
-                    X_train_clean, X_test_clean,
-                    y_train_clean, y_test_clean,
+                    X_train, X_test,
+                    y_train, y_test,
                     horizon=horizon,
                     run_name=f"linear_{station_tag}_{horizon}min",
-                    scaler=scaler
+                    preprocessing_dir=preprocessing_dir,
+                    log_batch=log_batch,
+                    model=_as_fitted(
+                        LinearRegression(), multi_fits["linear"][0][horizon_idx],
+                        multi_fits["linear"][1][horizon_idx], feature_names
+                    ),
+                    compute_train_metrics=compute_train_metrics,
+                    experiment_id=experiment_id,
+                    log_model_artifact=False,
+                    fit_time_seconds=fit_time_per_horizon["linear"]
                 )
                 
-                result = HorizonModelResult(
+                trained_models.append(model)
+                trained_results.append(TrainedHorizonResult(
                     model_type="linear",
                     horizon_minutes=horizon,
                     train_metrics=metrics['train'],
                     test_metrics=metrics['test'],
                     training_time_seconds=train_time,
                     mlflow_run_id=run_id
-                )
+                ))
                 
-                trained_results.append(result)
-                horizon_models.append(("linear", metrics['test'].rmse, run_id, metrics['test'], result))
-                
-                print(f"      ✓ RMSE: {metrics['test'].rmse:.4f}, R²: {metrics['test'].r2:.4f} ({train_time:.2f}s)")
+                print(f"      ✓ [{horizon}min] Linear RMSE: {metrics['test'].rmse:.4f}, R²: {metrics['test'].r2:.4f} ({train_time:.2f}s)")
             
             # Train Ridge
             if "ridge" in model_types:
-                print(f"\n   🔄 Training Ridge Regression...")
-                station_tag = f"station{station_id}" if station_id is not None else "unified"
                 model, metrics, train_time, run_id = self.train_ridge(
-                    X_train_clean, X_test_clean,
-                    y_train_clean, y_test_clean,
+                    X_train, X_test,
+                    y_train, y_test,
                     alpha=ridge_alpha,
                     horizon=horizon,
                     run_name=f"ridge_{station_tag}_{horizon}min",
-                    scaler=scaler
+                    preprocessing_dir=preprocessing_dir,
+                    log_batch=log_batch,
+                    model=_as_fitted(
+                        Ridge(alpha=ridge_alpha, random_state=42), multi_fits["ridge"][0][horizon_idx],
+                        multi_fits["ridge"][1][horizon_idx], feature_names
+                    ),
+                    compute_train_metrics=compute_train_metrics,
+                    experiment_id=experiment_id,
+                    log_model_artifact=False,
+                    fit_time_seconds=fit_time_per_horizon["ridge"]
                 )
                 
-                result = HorizonModelResult(
+                trained_models.append(model)
+                trained_results.append(TrainedHorizonResult(
                     model_type="ridge",
                     horizon_minutes=horizon,
                     train_metrics=metrics['train'],
                     test_metrics=metrics['test'],
                     training_time_seconds=train_time,
                     mlflow_run_id=run_id
-                )
-                
-                trained_results.append(result)
-                horizon_models.append(("ridge", metrics['test'].rmse, run_id, metrics['test'], result))
-                
-                print(f"      ✓ RMSE: {metrics['test'].rmse:.4f}, R²: {metrics['test'].r2:.4f} ({train_time:.2f}s)")
-            
-            # Find best model for this horizon and only save that one
-            if horizon_models:
-                best_model_type, best_rmse, best_run_id, best_metrics, best_result = min(horizon_models, key=lambda x: x[1])
-                best_models[horizon] = {
-                    "model_type": best_model_type,
-                    "rmse": best_rmse,
-                    "run_id": best_run_id
-                }
+                ))
                 
-                # Save the best model's performance to database and auto-register to MLflow
-                self.save_performance_to_db_and_register(
-                    station_id=station_id, 
-                    model_type=best_model_type, 
-                    test_metrics=best_metrics, 
-                    run_id=best_run_id, 
-                    horizon_minutes=horizon,
-                    register_to_mlflow=register_model  # Use the register_model parameter from train_models()
-                )
-                
-                # Only add best result to all_results
-                all_results.append(best_result)
-                
-                print(f"\n   🏆 Best model: {best_model_type} (RMSE: {best_rmse:.4f}) - Saved to database")
+                print(f"      ✓ [{horizon}min] Ridge RMSE: {metrics['test'].rmse:.4f}, R²: {metrics['test'].r2:.4f} ({train_time:.2f}s)")
+            
+            # Only the best model for this horizon is saved, so only its artifact is uploaded
+            if not trained_results:
+                return None
+            best_idx = min(range(len(trained_results)), key=lambda i: trained_results[i].test_metrics.rmse)
+            best_result = trained_results[best_idx]
+            self._log_sklearn_model(best_result.mlflow_run_id, trained_models[best_idx])
+            return best_result
+        
+        # Horizons are independent (own y, own MLflow runs), so train them concurrently
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_HORIZONS, len(prediction_horizons))) as executor:
+            horizon_bests = list(executor.map(train_horizon, range(len(prediction_horizons)), prediction_horizons))
+        
+        all_results = []
+        best_models = {}
+        
+        for horizon, best_result in zip(prediction_horizons, horizon_bests):
+            if best_result is None:
+                continue
+            
+            best_models[horizon] = {
+                "model_type": best_result.model_type,
+                "rmse": best_result.test_metrics.rmse,
+                "run_id": best_result.mlflow_run_id
+            }
+            
+            # Only add best result to all_results (saved to database below)
+            all_results.append(best_result)
+            
+            print(f"   🏆 Best model for {horizon}min: {best_result.model_type} (RMSE: {best_result.test_metrics.rmse:.4f})")
+        
+        # Save every horizon's best model to database in one insert and auto-register to MLflow
+        if all_results:
+            self.save_performance_to_db_and_register(
+                station_id=station_id,
+                results=all_results,
+                register_to_mlflow=register_model  # Use the register_model parameter from train_models()
+            )
         
         total_time = time.time() - overall_start
         
@@ -688,7 +918,7 @@ class TrainingService:
             'test_samples': prep_stats['test_samples'],
             'features_count': prep_stats['features_count'],
             'feature_names': feature_names,
-            'results': all_results,
+            'results': HorizonModelResultList.validate_python(all_results, from_attributes=True),
             'experiment_id': experiment_id,
             'experiment_name': experiment_name,
             'best_models': best_models,
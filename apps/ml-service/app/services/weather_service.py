@@ -2,22 +2,166 @@
 Weather Service - Fetch weather data from Open-Meteo API
 Free, open-source weather API with no API key required
 """
+import asyncio
 import httpx
 import logging
-from typing import Dict, List, Optional
+import time
+import numpy as np
+import orjson
+from typing import Dict, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 
+from app.config import get_settings
+
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Coordinates are rounded to this many decimals (~1 km) for requests and cache keys
+COORDINATE_DECIMALS = 2
+MAX_CACHED_RESPONSES = 1024
+
+# After a failed refresh, an expired entry is still served up to this many TTLs old
+STALE_TTL_MULTIPLIER = 4
+
+# Hourly history needed for the longest rainfall window, and the extra forecast hours
+# requested past the furthest horizon (closest-hour neighbour plus cache-TTL drift)
+FORECAST_PAST_HOURS = 24
+FORECAST_SLACK_HOURS = 2
+
+# Default forecast horizons (minutes ahead) and the cumulative rainfall windows (hours)
+DEFAULT_FORECAST_MINUTES: Tuple[int, ...] = (0, 15, 30, 45, 60, 120, 180, 360)
+RAINFALL_WINDOW_HOURS: Tuple[int, ...] = (3, 6, 12, 24)
+
 
 class WeatherService:
     """Service for fetching weather data from Open-Meteo API"""
     
     OPEN_METEO_API_BASE = "https://api.open-meteo.com/v1/forecast"
     
+    # Max concurrent requests to Open-Meteo across all service instances
+    MAX_CONCURRENT_REQUESTS = 8
+    _request_semaphore: Optional[asyncio.Semaphore] = None
+    
+    # One pooled client for all service instances, so keep-alive connections are reused
+    _client: Optional[httpx.AsyncClient] = None
+    
+    # (kind, lat, lon) -> (fetched_at, response, conditional request headers), shared by
+    # all service instances; one lock per key so concurrent misses make a single upstream request
+    _response_cache: Dict[Tuple[str, float, float], Tuple[float, Dict, Dict[str, str]]] = {}
+    _response_locks: Dict[Tuple[str, float, float], asyncio.Lock] = {}
+    
     def __init__(self):
         """Initialize Open-Meteo weather service (no API key required)"""
-        pass
+        # Set when the last lookup fell back to expired cached data
+        self.served_stale = False
+    
+    @classmethod
+    def _get_request_semaphore(cls) -> asyncio.Semaphore:
+        """Shared semaphore bounding concurrent Open-Meteo requests"""
+        if cls._request_semaphore is None:
+            cls._request_semaphore = asyncio.Semaphore(cls.MAX_CONCURRENT_REQUESTS)
+        return cls._request_semaphore
+    
+    @classmethod
+    def _get_client(cls) -> httpx.AsyncClient:
+        """Shared HTTP client for Open-Meteo (created on first use)"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0),
+                limits=httpx.Limits(
+                    max_keepalive_connections=cls.MAX_CONCURRENT_REQUESTS,
+                    max_connections=cls.MAX_CONCURRENT_REQUESTS
+                )
+            )
+        return cls._client
+    
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared HTTP client (called on application shutdown)"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+    
+    async def _fetch(
+        self,
+        params: Dict,
+        validators: Optional[Dict[str, str]] = None
+    ) -> Tuple[Optional[Dict], Dict[str, str]]:
+        """
+        GET the Open-Meteo forecast endpoint, respecting the concurrency limit
+        
+        All horizons of a forecast come from one response, so callers fan out
+        per location (e.g. with asyncio.gather), never per horizon.
+        
+        Args:
+            params: Query parameters
+            validators: Conditional request headers from a previous response
+            
+        Returns:
+            (decoded body, conditional headers for the next request); the body
+            is None if the server answered 304 Not Modified
+        """
+        async with self._get_request_semaphore():
+            response = await self._get_client().get(
+                self.OPEN_METEO_API_BASE, params=params, headers=validators
+            )
+            if response.status_code == 304:
+                return None, validators or {}
+            response.raise_for_status()
+            
+            next_validators = {}
+            if 'ETag' in response.headers:
+                next_validators['If-None-Match'] = response.headers['ETag']
+            if 'Last-Modified' in response.headers:
+                next_validators['If-Modified-Since'] = response.headers['Last-Modified']
+            # The hourly payload is mostly float arrays; orjson decodes those much faster
+            return orjson.loads(response.content), next_validators
+    
+    async def _fetch_cached(self, kind: str, params: Dict, ttl: float) -> Dict:
+        """
+        Fetch an Open-Meteo response through the shared TTL cache
+        
+        Entries are keyed by request kind and rounded coordinates. Expired
+        entries are refreshed with a conditional request, and a 304 answer
+        renews the cached response. If a refresh fails, an expired entry
+        younger than STALE_TTL_MULTIPLIER * ttl is served instead of raising,
+        and served_stale is set.
+        """
+        self.served_stale = False
+        params['latitude'] = round(params['latitude'], COORDINATE_DECIMALS)
+        params['longitude'] = round(params['longitude'], COORDINATE_DECIMALS)
+        key = (kind, params['latitude'], params['longitude'])
+        
+        cached = self._response_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        
+        lock = self._response_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another coroutine may have refreshed the entry while we waited
+            cached = self._response_cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < ttl:
+                return cached[1]
+            
+            try:
+                data, validators = await self._fetch(params, cached[2] if cached is not None else None)
+            except httpx.HTTPError as e:
+                if cached is None or time.monotonic() - cached[0] >= ttl * STALE_TTL_MULTIPLIER:
+                    raise
+                self.served_stale = True
+                logger.warning(f"Open-Meteo request failed ({e}), serving cached {kind} data for {key[1:]}")
+                return cached[1]
+            
+            if data is None:
+                # Not modified: keep the cached body, restart its TTL
+                data = cached[1]
+            elif key not in self._response_cache and len(self._response_cache) >= MAX_CACHED_RESPONSES:
+                # Evict the oldest entry (dicts keep insertion order)
+                oldest = next(iter(self._response_cache))
+                del self._response_cache[oldest]
+                self._response_locks.pop(oldest, None)
+            self._response_cache[key] = (time.monotonic(), data, validators)
+            return data
     
     async def get_weather_by_coordinates(
         self,
@@ -52,10 +196,7 @@ class WeatherService:
             'timezone': 'auto'
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(self.OPEN_METEO_API_BASE, params=params)
-            response.raise_for_status()
-            data = response.json()
+        data = await self._fetch_cached('current', params, settings.weather_current_ttl_seconds)
         
         current = data['current']
         
@@ -93,7 +234,7 @@ class WeatherService:
         self,
         latitude: float,
         longitude: float,
-        minutes_list: List[int] = [0, 15, 30, 45, 60, 120, 180, 360]
+        minutes_list: Sequence[int] = DEFAULT_FORECAST_MINUTES
     ) -> Dict:
         """
         Fetch weather forecasts for multiple time horizons from Open-Meteo
@@ -109,6 +250,9 @@ class WeatherService:
         Raises:
             httpx.HTTPError: If API request fails
         """
+        # Only fetch the hours the horizons and rainfall windows can reach
+        forecast_hours = -(-max(minutes_list) // 60) + FORECAST_SLACK_HOURS
+        
         params = {
             'latitude': latitude,
             'longitude': longitude,
@@ -122,57 +266,62 @@ class WeatherService:
                 'cloud_cover'
             ],
             'timezone': 'auto',
-            'forecast_days': 2  # Get 2 days to cover all horizons
+            'past_hours': FORECAST_PAST_HOURS,
+            'forecast_hours': forecast_hours
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(self.OPEN_METEO_API_BASE, params=params)
-            response.raise_for_status()
-            data = response.json()
+        data = await self._fetch_cached(f'forecast-{forecast_hours}h', params, settings.weather_forecast_ttl_seconds)
         
         hourly = data['hourly']
-        times = [datetime.fromisoformat(t) for t in hourly['time']]
+        # Hourly times are sorted ISO strings (local time of the location), parsed in C as
+        # datetime64; the closest hour to every target is found in one searchsorted
+        times = np.array(hourly['time'], dtype='datetime64[s]')
+        # Targets in the location's local time too, not the server's, so they fall
+        # inside the short fetched window whatever timezone the server runs in
+        now_local = datetime.utcnow() + timedelta(seconds=data.get('utc_offset_seconds', 0))
+        targets = np.datetime64(now_local) + np.asarray(minutes_list, dtype='timedelta64[m]')
         
-        forecasts = {}
+        # Closest time index per horizon (the earlier one on a tie)
+        after = np.searchsorted(times, targets)
+        before = np.maximum(after - 1, 0)
+        after_clipped = np.minimum(after, len(times) - 1)
+        use_before = (after == len(times)) | (
+            (after > 0) & (targets - times[before] <= times[after_clipped] - targets)
+        )
+        idx = np.where(use_before, before, after_clipped)
         
-        for minutes in minutes_list:
-            target_time = datetime.now() + timedelta(minutes=minutes)
-            
-            # Find closest time index
-            closest_idx = min(range(len(times)), key=lambda i: abs((times[i] - target_time).total_seconds()))
-            
-            # Calculate cumulative rainfall
-            rainfall_1h = hourly['precipitation'][closest_idx]
-            rainfall_3h = sum(hourly['precipitation'][max(0, closest_idx-2):closest_idx+1])
-            rainfall_6h = sum(hourly['precipitation'][max(0, closest_idx-5):closest_idx+1])
-            rainfall_12h = sum(hourly['precipitation'][max(0, closest_idx-11):closest_idx+1])
-            rainfall_24h = sum(hourly['precipitation'][max(0, closest_idx-23):closest_idx+1])
-            
-            # Calculate pressure difference
-            pressure_diff_3h = 0.0
-            if closest_idx >= 3:
-                pressure_diff_3h = hourly['pressure_msl'][closest_idx] - hourly['pressure_msl'][closest_idx - 3]
-            
-            time_label = "current" if minutes == 0 else f"+{minutes}min"
-            
-            forecasts[time_label] = {
+        # Rainfall windows from the precipitation prefix sum, all horizons at once
+        cum_precip = np.concatenate(([0.0], np.cumsum(np.asarray(hourly['precipitation'], dtype=np.float64))))
+        rainfall = {
+            hours: (cum_precip[idx + 1] - cum_precip[np.maximum(0, idx - hours + 1)]).tolist()
+            for hours in RAINFALL_WINDOW_HOURS
+        }
+        
+        # Pressure difference over 3 hours (0 where there is no earlier reading)
+        pressure = np.asarray(hourly['pressure_msl'], dtype=np.float64)
+        pressure_diff_3h = np.where(idx >= 3, pressure[idx] - pressure[np.maximum(idx - 3, 0)], 0.0).tolist()
+        
+        forecasts = {
+            ("current" if minutes == 0 else f"+{minutes}min"): {
                 "minutes_ahead": minutes,
-                "timestamp": hourly['time'][closest_idx],
+                "timestamp": hourly['time'][i],
                 "weather": {
-                    "temperature": hourly['temperature_2m'][closest_idx],
-                    "humidity": hourly['relative_humidity_2m'][closest_idx],
-                    "pressure": hourly['pressure_msl'][closest_idx],
-                    "wind_speed": hourly['wind_speed_10m'][closest_idx],
-                    "wind_direction": hourly['wind_direction_10m'][closest_idx],
-                    "cloud_cover": hourly['cloud_cover'][closest_idx],
-                    "rainfall_1h": rainfall_1h,
-                    "rainfall_3h": rainfall_3h,
-                    "rainfall_6h": rainfall_6h,
-                    "rainfall_12h": rainfall_12h,
-                    "rainfall_24h": rainfall_24h,
-                    "pressure_diff_3h": pressure_diff_3h
+                    "temperature": hourly['temperature_2m'][i],
+                    "humidity": hourly['relative_humidity_2m'][i],
+                    "pressure": hourly['pressure_msl'][i],
+                    "wind_speed": hourly['wind_speed_10m'][i],
+                    "wind_direction": hourly['wind_direction_10m'][i],
+                    "cloud_cover": hourly['cloud_cover'][i],
+                    "rainfall_1h": hourly['precipitation'][i],
+                    "rainfall_3h": rainfall[3][k],
+                    "rainfall_6h": rainfall[6][k],
+                    "rainfall_12h": rainfall[12][k],
+                    "rainfall_24h": rainfall[24][k],
+                    "pressure_diff_3h": pressure_diff_3h[k]
                 }
             }
+            for k, (minutes, i) in enumerate(zip(minutes_list, idx.tolist()))
+        }
         
         result = {
             "location": {
@@ -7,10 +7,10 @@ Automated Training and Prediction System
 - Uses dynamic date range (always latest data)
 """
 
-import requests
+import asyncio
+import httpx
 import json
 import time
-import schedule
 from datetime import datetime, timedelta
 import dotenv
 import os
@@ -21,6 +21,23 @@ TRAIN_HORIZONS = [15, 30, 45, 60]  # Training horizons in minutes
 PREDICT_HORIZONS = [15, 30, 45, 60]  # Prediction horizons
 TRAINING_PERIOD_DAYS = 30  # Use last 30 days of data
 RUN_INTERVAL_MINUTES = 60  # Run every 60 minutes
+TRAINING_TIMEOUT_SECONDS = 600  # Give up waiting for a training job after 10 minutes
+TRAINING_POLL_INTERVAL_SECONDS = 5
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))  # Station forecast requests in flight at once
+
+# Per-request timeouts (seconds), kept in one place
+HTTP_TIMEOUTS = {
+    "train": 60.0,    # submitting the training job (training itself is polled)
+    "status": 30.0,   # polling a training job
+    "predict": 60.0,  # generating one station's forecasts
+}
+
+# One pooled async client for all calls so connections to the ML service are kept alive
+CLIENT = httpx.AsyncClient(
+    base_url=ML_SERVICE_URL,
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    limits=httpx.Limits(max_keepalive_connections=MAX_CONCURRENCY, max_connections=MAX_CONCURRENCY + 2)
+)
 
 def get_active_stations():
     """Fetch stations from Supabase.
@@ -72,14 +89,31 @@ def print_header(text):
     print(f"  {text}")
     print("=" * 80)
 
-def train_unified_models():
+async def wait_for_training_job(job):
+    """Poll a background training job until it completes, fails or times out"""
+    status_url = job['status_url']
+    deadline = time.time() + TRAINING_TIMEOUT_SECONDS
+    
+    while job['status'] in ('queued', 'training'):
+        if time.time() > deadline:
+            raise httpx.TimeoutException(
+                f"Training job {job['job_id']} did not finish within {TRAINING_TIMEOUT_SECONDS}s"
+            )
+        await asyncio.sleep(TRAINING_POLL_INTERVAL_SECONDS)
+        response = await CLIENT.get(status_url, timeout=HTTP_TIMEOUTS["status"])
+        response.raise_for_status()
+        job = response.json()
+    
+    return job
+
+async def train_unified_models():
     """Train unified models using recent data"""
     print_header("TRAINING: Unified Models with Latest Data")
     
     # Get dynamic date range
     date_range = get_date_range()
     
-    url = f"{ML_SERVICE_URL}/training/train"
+    url = "/training/train"
     payload = {
         "train_all_stations": True,
         "start_date": date_range['start_date'],
@@ -98,13 +132,22 @@ def train_unified_models():
     print(f"\n📡 Sending training request...")
     
     try:
-        response = requests.post(url, json=payload, timeout=600)
+        response = await CLIENT.post(url, json=payload, timeout=HTTP_TIMEOUTS["train"])
         response.raise_for_status()
-        result = response.json()
+        job = response.json()
+        
+        print(f"   Training job {job['job_id']} started, waiting for it to finish...")
+        job = await wait_for_training_job(job)
+        
+        if job['status'] != 'completed':
+            print(f"\n❌ Training failed: {job.get('message', 'Unknown error')}")
+            return False
+        
+        result = job['result']
         
         print(f"\n✅ Training completed successfully!")
-        print(f"   Status: {result.get('status', 'N/A')}")
-        print(f"   Message: {result.get('message', 'N/A')}")
+        print(f"   Status: {job['status']}")
+        print(f"   Message: {job.get('message', 'N/A')}")
         
         if 'models_trained' in result:
             print(f"\n📊 Models trained:")
@@ -118,29 +161,27 @@ def train_unified_models():
         
         return True
         
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         print(f"\n⚠️  Training request timed out (may still be running)")
         return False
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"\n❌ Training failed: {e}")
-        if hasattr(e, 'response') and hasattr(e.response, 'text'):
+        if isinstance(e, httpx.HTTPStatusError):
             print(f"   Error details: {e.response.text}")
         return False
 
-def generate_predictions():
+async def generate_predictions():
     """Generate predictions for all active stations"""
     print_header("PREDICTION: Generating Forecasts for All Stations")
     
-    # Get active stations dynamically
-    stations_to_predict = get_active_stations()
+    # Get active stations dynamically (blocking Supabase call, so off the event loop)
+    stations_to_predict = await asyncio.to_thread(get_active_stations)
     print(f"\n📍 Stations to process: {stations_to_predict}")
     
-    url = f"{ML_SERVICE_URL}/predict/generate-forecasts"
+    url = "/predict/generate-forecasts"
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
     
-    results = []
-    for station_id in stations_to_predict:
-        print(f"\n🔮 Generating forecast for station {station_id}...")
-        
+    async def predict_station(station_id):
         payload = {
             "station_id": station_id,
             "horizons_minutes": PREDICT_HORIZONS,
@@ -148,32 +189,44 @@ def generate_predictions():
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=60)
+            async with semaphore:
+                response = await CLIENT.post(url, json=payload, timeout=HTTP_TIMEOUTS["predict"])
             response.raise_for_status()
             result = response.json()
             
             if result.get('success'):
-                print(f"   ✅ {result['message']} - {result['forecasts_generated']} forecasts saved")
-                results.append({
+                return {
                     'station_id': station_id,
                     'success': True,
+                    'message': result['message'],
                     'forecasts': result['forecasts_generated']
-                })
+                }
             else:
-                print(f"   ❌ Failed: {result.get('message', 'Unknown error')}")
-                results.append({
+                return {
                     'station_id': station_id,
                     'success': False,
                     'error': result.get('message')
-                })
+                }
                 
-        except requests.exceptions.RequestException as e:
-            print(f"   ❌ Request failed: {e}")
-            results.append({
+        except httpx.HTTPError as e:
+            return {
                 'station_id': station_id,
                 'success': False,
-                'error': str(e)
-            })
+                'error': f"request failed: {e}"
+            }
+    
+    # Stations are independent, so request their forecasts concurrently and
+    # report each one as soon as it finishes
+    total = len(stations_to_predict)
+    print(f"\n🔮 Generating forecasts for {total} stations...")
+    results = []
+    for done, future in enumerate(asyncio.as_completed([predict_station(s) for s in stations_to_predict]), start=1):
+        r = await future
+        results.append(r)
+        if r['success']:
+            print(f"   ✅ [{done}/{total}] Station {r['station_id']}: {r['message']} - {r['forecasts']} forecasts saved")
+        else:
+            print(f"   ❌ [{done}/{total}] Station {r['station_id']} failed: {r.get('error') or 'Unknown error'}")
     
     return results
 
@@ -200,7 +253,7 @@ def print_summary(results, elapsed_time):
     
     print(f"\n⏱️  Total execution time: {elapsed_time:.2f} seconds")
 
-def run_training_and_prediction():
+async def run_training_and_prediction():
     """Execute one cycle of training and prediction"""
     start_time = time.time()
     
@@ -210,7 +263,7 @@ def run_training_and_prediction():
     print("🚀 " * 20)
     
     # Step 1: Train models with latest data
-    training_success = train_unified_models()
+    training_success = await train_unified_models()
     
     if not training_success:
         print("\n⚠️  Training may not have completed successfully")
@@ -218,10 +271,10 @@ def run_training_and_prediction():
     
     # Wait for models to be registered
     print("\n⏳ Waiting 5 seconds for models to be registered...")
-    time.sleep(5)
+    await asyncio.sleep(5)
     
     # Step 2: Generate predictions
-    results = generate_predictions()
+    results = await generate_predictions()
     
     # Print summary
     elapsed_time = time.time() - start_time
@@ -230,6 +283,16 @@ def run_training_and_prediction():
     print(f"\n⏰ Next cycle will run in {RUN_INTERVAL_MINUTES} minutes")
     print("✨ " * 20 + "\n")
 
+async def scheduler():
+    """Run a cycle now, then sleep until the next one is due"""
+    try:
+        print("\n🎬 Running initial cycle...")
+        while True:
+            await run_training_and_prediction()
+            await asyncio.sleep(RUN_INTERVAL_MINUTES * 60)
+    finally:
+        await CLIENT.aclose()
+
 def main():
     """Main execution with scheduling"""
     print("\n" + "⚡ " * 20)
@@ -239,21 +302,12 @@ def main():
     print(f"  Run interval: Every {RUN_INTERVAL_MINUTES} minutes")
     print("⚡ " * 20)
     
-    # Run immediately on startup
-    print("\n🎬 Running initial cycle...")
-    run_training_and_prediction()
-    
-    # Schedule to run every 60 minutes
-    schedule.every(RUN_INTERVAL_MINUTES).minutes.do(run_training_and_prediction)
-    
     print(f"\n🔄 Scheduler active - will run every {RUN_INTERVAL_MINUTES} minutes")
     print("   Press Ctrl+C to stop")
     
-    # Keep running
+    # Run immediately on startup, then every RUN_INTERVAL_MINUTES
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(30)  # Check every 30 seconds
+        asyncio.run(scheduler())
     except KeyboardInterrupt:
         print("\n\n🛑 Stopping automated system...")
         print(f"   Stopped at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
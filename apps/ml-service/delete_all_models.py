@@ -5,11 +5,30 @@ import mlflow
 from mlflow.tracking import MlflowClient
 import os
 import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # Set MLflow tracking URI
 mlflow_uri = os.getenv("MLFLOW_TRACKING_URI", "sqlite:///mlflow.db")
 mlflow.set_tracking_uri(mlflow_uri)
 
+# Concurrent registry requests
+MAX_WORKERS = 8
+# Model versions fetched per registry search request
+SEARCH_PAGE_SIZE = 10000
+
+def get_versions_by_model(client):
+    """Fetch every model version in as few search requests as possible, grouped by model name"""
+    versions_by_model = defaultdict(list)
+    page_token = None
+    while True:
+        page = client.search_model_versions(max_results=SEARCH_PAGE_SIZE, page_token=page_token)
+        for version in page:
+            versions_by_model[version.name].append(version)
+        page_token = page.token
+        if not page_token:
+            return versions_by_model
+
 def delete_all_models():
     """Delete all registered models from MLflow"""
     client = MlflowClient()
@@ -25,28 +44,44 @@ def delete_all_models():
         print(f"Found {len(registered_models)} registered model(s) in MLflow.")
         print("\nDeleting models:")
         
-        for rm in registered_models:
-            model_name = rm.name
-            print(f"  - Deleting model: {model_name}")
+        versions_by_model = get_versions_by_model(client)
+        failed = {}
+        
+        # One shared pool bounds concurrent registry writes to MAX_WORKERS
+        # (the default tracking store is a single SQLite file)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Delete every version of every model
+            version_futures = [
+                (rm.name, version.version, executor.submit(client.delete_model_version, name=rm.name, version=version.version))
+                for rm in registered_models
+                for version in versions_by_model.get(rm.name, [])
+            ]
+            for model_name, version, future in version_futures:
+                if future.exception() is None:
+                    print(f"    - Deleted {model_name} version {version}")
+                else:
+                    failed.setdefault(model_name, f"version {version}: {future.exception()}")
             
-            try:
-                # Delete all versions of the model
-                versions = client.search_model_versions(f"name='{model_name}'")
-                for version in versions:
-                    print(f"    - Deleting version {version.version}")
-                    client.delete_model_version(
-                        name=model_name,
-                        version=version.version
-                    )
-                
-                # Delete the registered model
-                client.delete_registered_model(model_name)
-                print(f"    ✓ Model {model_name} deleted successfully")
-                
-            except Exception as e:
-                print(f"    ✗ Error deleting model {model_name}: {str(e)}")
+            # Then the registered models whose versions are all gone
+            model_futures = [
+                (rm.name, executor.submit(client.delete_registered_model, rm.name))
+                for rm in registered_models
+                if rm.name not in failed
+            ]
+            for model_name, future in model_futures:
+                if future.exception() is not None:
+                    failed[model_name] = str(future.exception())
+        
+        for rm in registered_models:
+            if rm.name in failed:
+                print(f"  ✗ Error deleting model {rm.name}: {failed[rm.name]}")
+            else:
+                print(f"  ✓ Model {rm.name} deleted successfully")
         
-        print("\n✓ All models deleted successfully!")
+        if failed:
+            print(f"\n✗ Failed to delete {len(failed)} of {len(registered_models)} model(s)")
+        else:
+            print("\n✓ All models deleted successfully!")
         
     except Exception as e:
         print(f"Error accessing MLflow: {str(e)}")
@@ -2,11 +2,26 @@
 Create Architecture Diagram
 Run this to generate an architecture visualization
 """
+import os
+from pathlib import Path
 
-try:
-    import matplotlib.pyplot as plt
-    import matplotlib.patches as patches
-    from matplotlib.patches import FancyBboxPatch, FancyArrowPatch
+OUTPUT_PATH = Path(__file__).with_name('architecture.png')
+
+
+def main():
+    """Render the diagram, unless the PNG is already newer than this script"""
+    if OUTPUT_PATH.exists() and OUTPUT_PATH.stat().st_mtime >= Path(__file__).stat().st_mtime:
+        print(f"✅ Architecture diagram is up to date: {OUTPUT_PATH}")
+        return
+    
+    # matplotlib is only imported when there is something to draw
+    try:
+        import matplotlib.pyplot as plt
+        from matplotlib.patches import FancyBboxPatch, FancyArrowPatch
+    except ImportError:
+        print("⚠️  matplotlib not installed. Install with: pip install matplotlib")
+        print("Architecture diagram skipped.")
+        return
     
     fig, ax = plt.subplots(1, 1, figsize=(14, 10))
     ax.set_xlim(0, 10)
@@ -159,10 +174,13 @@ try:
     ax.text(7.0, legend_y-0.5, '• Production ready', fontsize=8)
     
     plt.tight_layout()
-    plt.savefig('/home/nam/study/swfm/ml-service/architecture.png', dpi=300, bbox_inches='tight')
-    print("✅ Architecture diagram saved to: ml-service/architecture.png")
-    plt.show()
+    plt.savefig(OUTPUT_PATH, dpi=300, bbox_inches='tight')
+    print(f"✅ Architecture diagram saved to: {OUTPUT_PATH}")
+    
+    # Showing the window blocks, so it is opt-in
+    if os.environ.get('SHOW_DIAGRAM'):
+        plt.show()
+
 
-except ImportError:
-    print("⚠️  matplotlib not installed. Install with: pip install matplotlib")
-    print("Architecture diagram skipped.")
+if __name__ == "__main__":
+    main()
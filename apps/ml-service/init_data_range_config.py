@@ -10,24 +10,26 @@ import os
 # Add parent directory to path to import app modules
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from supabase import create_client, ClientOptions
+
+from app.config import get_settings
 from app.services.preprocessing_service import PreprocessingService
 
+settings = get_settings()
+
+# One client for the whole script, handed to the service rather than built inside it
+_supabase = create_client(
+    settings.supabase_url,
+    settings.supabase_key,
+    options=ClientOptions(postgrest_client_timeout=30, schema='public')
+)
+
 def main():
-    service = PreprocessingService()
-    
-    # Check if data_range config already exists
-    existing = service.supabase.table('preprocessing_configs')\
-        .select('*')\
-        .eq('method_id', 'data_range')\
-        .execute()
+    service = PreprocessingService(supabase=_supabase)
     
-    if existing.data:
-        print("✓ data_range configuration already exists")
-        print(f"  Current config: {existing.data[0]['config']}")
-        return
-    
-    # Insert data_range configuration
-    result = service.supabase.table('preprocessing_configs').insert({
+    # Insert data_range configuration unless it already exists, in one request;
+    # an ignored duplicate comes back with no rows
+    result = service.supabase.table('preprocessing_configs').upsert({
         'method_id': 'data_range',
         'enabled': True,
         'config': {
@@ -35,14 +37,13 @@ def main():
             'start_date': '2025-11-01',
             'end_date': '2025-12-01'
         }
-    }).execute()
+    }, on_conflict='method_id', ignore_duplicates=True).execute()
     
     if result.data:
         print("✓ Successfully created data_range configuration")
         print(f"  Config: {result.data[0]['config']}")
     else:
-        print("✗ Failed to create configuration")
-        sys.exit(1)
+        print("✓ data_range configuration already exists")
 
 if __name__ == '__main__':
     main()
@@ -8,6 +8,7 @@ This script:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
 from datetime import datetime
@@ -16,17 +17,67 @@ import os
 ML_SERVICE_URL = os.getenv("ML_SERVICE_URL", "http://localhost:8000")
 TRAIN_HORIZONS = [15, 30, 45, 60]  # Training horizons in minutes
 PREDICT_HORIZONS = [15, 30, 45, 60]  # Prediction horizons
+MODEL_TYPES = ["ridge", "linear"]
 STATIONS_TO_PREDICT = [2, 3, 4, 5, 6, 8, 9, 15]  # Fallback stations (excluded: 0, 1, 7)
+TRAINING_TIMEOUT_SECONDS = 600  # Give up waiting for a training job after 10 minutes
+TRAINING_POLL_INTERVAL_SECONDS = 5
+REGISTRATION_TIMEOUT_SECONDS = 30  # Give up waiting for trained models to appear in the registry
+USER_AGENT = "swfm-pretrain-and-predict"
 # Dates will be auto-determined from training_data_range config in database
 
+# One keep-alive session for the training request and its status polls
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+SESSION.headers["User-Agent"] = USER_AGENT
+
 def print_header(text):
     """Print a formatted header"""
     print("\n" + "=" * 80)
     print(f"  {text}")
     print("=" * 80)
 
+def wait_for_training_job(job):
+    """Poll a background training job until it completes, fails or times out"""
+    status_url = f"{ML_SERVICE_URL}{job['status_url']}"
+    deadline = time.time() + TRAINING_TIMEOUT_SECONDS
+    
+    while job['status'] in ('queued', 'training'):
+        if time.time() > deadline:
+            raise requests.exceptions.Timeout(
+                f"Training job {job['job_id']} did not finish within {TRAINING_TIMEOUT_SECONDS}s"
+            )
+        time.sleep(TRAINING_POLL_INTERVAL_SECONDS)
+        response = SESSION.get(status_url, timeout=30)
+        response.raise_for_status()
+        job = response.json()
+    
+    return job
+
+def wait_for_registered_models(expected_runs, timeout=REGISTRATION_TIMEOUT_SECONDS):
+    """
+    Poll the model registry with backoff until every expected model's latest
+    version comes from the expected run (expected_runs: model name -> run_id)
+    """
+    deadline = time.time() + timeout
+    delay = 0.2
+    
+    while time.time() < deadline:
+        try:
+            response = SESSION.get(f"{ML_SERVICE_URL}/models", timeout=5)
+            response.raise_for_status()
+            latest_runs = {model['name']: model['run_id'] for model in response.json()['models']}
+            if all(latest_runs.get(name) == run_id for name, run_id in expected_runs.items()):
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(min(delay, max(0.0, deadline - time.time())))
+        delay = min(delay * 1.5, 2.0)
+    
+    return False
+
 def train_unified_models():
-    """Train unified models for all horizons"""
+    """Train unified models for all horizons; returns the training result, or None on failure"""
     print_header("STEP 1: Training Unified Models")
     
     url = f"{ML_SERVICE_URL}/training/train"
@@ -34,7 +85,7 @@ def train_unified_models():
         "train_all_stations": True,
         # start_date and end_date will be auto-determined from training_data_range config
         "horizons_minutes": TRAIN_HORIZONS,
-        "model_types": ["ridge", "linear"]
+        "model_types": MODEL_TYPES
     }
     
     print(f"\n🔧 Training Configuration:")
@@ -46,13 +97,22 @@ def train_unified_models():
     print(f"\n📡 Sending training request to {url}...")
     
     try:
-        response = requests.post(url, json=payload, timeout=600)  # 10 min timeout
+        response = SESSION.post(url, json=payload, timeout=60)
         response.raise_for_status()
-        result = response.json()
+        job = response.json()
+        
+        print(f"   Training job {job['job_id']} started, waiting for it to finish...")
+        job = wait_for_training_job(job)
+        
+        if job['status'] != 'completed':
+            print(f"\n❌ Training failed: {job.get('message', 'Unknown error')}")
+            return None
+        
+        result = job['result']
         
         print(f"\n✅ Training completed successfully!")
-        print(f"   Status: {result.get('status', 'N/A')}")
-        print(f"   Message: {result.get('message', 'N/A')}")
+        print(f"   Status: {job['status']}")
+        print(f"   Message: {job.get('message', 'N/A')}")
         
         if 'models_trained' in result:
             print(f"\n📊 Models trained:")
@@ -64,60 +124,59 @@ def train_unified_models():
                           f"RMSE: {metrics.get('rmse', 'N/A'):.4f}, "
                           f"R²: {metrics.get('r2', 'N/A'):.4f}")
         
-        return True
+        return result
         
     except requests.exceptions.Timeout:
         print(f"\n⚠️  Training request timed out (may still be running in background)")
         print(f"   Check logs for training progress")
-        return False
+        return None
     except requests.exceptions.RequestException as e:
         print(f"\n❌ Training failed: {e}")
         if hasattr(e.response, 'text'):
             print(f"   Error details: {e.response.text}")
-        return False
+        return None
 
 def generate_predictions():
     """Generate predictions for all active stations"""
     print_header("STEP 2: Generating 15-Minute Predictions")
     
-    url = f"{ML_SERVICE_URL}/predict/generate-forecasts"
+    # One batch request; the service loads each horizon's model once for all stations
+    url = f"{ML_SERVICE_URL}/predict/generate-forecasts-batch"
+    payload = {
+        "station_ids": STATIONS_TO_PREDICT,
+        "horizons_minutes": PREDICT_HORIZONS,
+        "save_to_db": True
+    }
+    
+    print(f"\n🔮 Generating forecasts for {len(STATIONS_TO_PREDICT)} stations...")
+    
+    try:
+        response = SESSION.post(url, json=payload, timeout=60 * len(STATIONS_TO_PREDICT))
+        response.raise_for_status()
+        station_results = response.json()['results']
+    except requests.exceptions.RequestException as e:
+        print(f"   ❌ Request failed: {e}")
+        return [
+            {'station_id': station_id, 'success': False, 'error': str(e)}
+            for station_id in STATIONS_TO_PREDICT
+        ]
     
     results = []
-    for station_id in STATIONS_TO_PREDICT:
-        print(f"\n🔮 Generating forecast for station {station_id}...")
-        
-        payload = {
-            "station_id": station_id,
-            "horizons_minutes": PREDICT_HORIZONS,
-            "save_to_db": True
-        }
-        
-        try:
-            response = requests.post(url, json=payload, timeout=60)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('success'):
-                print(f"   ✅ {result['message']} - {result['forecasts_generated']} forecasts saved")
-                results.append({
-                    'station_id': station_id,
-                    'success': True,
-                    'forecasts': result['forecasts_generated']
-                })
-            else:
-                print(f"   ❌ Failed: {result.get('message', 'Unknown error')}")
-                results.append({
-                    'station_id': station_id,
-                    'success': False,
-                    'error': result.get('message')
-                })
-                
-        except requests.exceptions.RequestException as e:
-            print(f"   ❌ Request failed: {e}")
+    for result in station_results:
+        station_id = result['station_id']
+        if result.get('success'):
+            print(f"   ✅ Station {station_id}: {result['message']} - {result['forecasts_generated']} forecasts saved")
+            results.append({
+                'station_id': station_id,
+                'success': True,
+                'forecasts': result['forecasts_generated']
+            })
+        else:
+            print(f"   ❌ Station {station_id} failed: {result.get('message', 'Unknown error')}")
             results.append({
                 'station_id': station_id,
                 'success': False,
-                'error': str(e)
+                'error': result.get('message')
             })
     
     return results
@@ -154,19 +213,28 @@ def main():
     print(f"  Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("🚀 " * 20)
     
-    # Step 1: Train models
-    training_success = train_unified_models()
-    
-    if not training_success:
-        print("\n⚠️  Training may not have completed successfully")
-        print("   Continuing with predictions anyway (using existing models if available)...")
-    
-    # Wait a bit for models to be fully registered
-    print("\n⏳ Waiting 5 seconds for models to be registered...")
-    time.sleep(5)
-    
-    # Step 2: Generate predictions
-    results = generate_predictions()
+    try:
+        # Step 1: Train models
+        training_result = train_unified_models()
+        
+        if training_result is None:
+            print("\n⚠️  Training may not have completed successfully")
+            print("   Continuing with predictions anyway (using existing models if available)...")
+        else:
+            # Only the best model type per horizon is registered; its new version
+            # should now be the latest one for that name
+            print("\n⏳ Checking the new models are registered...")
+            expected_runs = {
+                f"swfm-{best['model_type']}-unified-{horizon}min": best['run_id']
+                for horizon, best in training_result['best_models'].items()
+            }
+            if not wait_for_registered_models(expected_runs):
+                print(f"   ⚠️  Not all models registered after {REGISTRATION_TIMEOUT_SECONDS}s, continuing anyway")
+        
+        # Step 2: Generate predictions
+        results = generate_predictions()
+    finally:
+        SESSION.close()
     
     # Print summary
     print_summary(results)
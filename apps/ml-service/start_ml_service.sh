@@ -260,6 +260,8 @@ start_api_service() {
     nohup uvicorn app.main:app \
         --host 0.0.0.0 \
         --port $API_PORT \
+        --loop uvloop \
+        --http httptools \
         --reload \
         > "$LOG_DIR/api_service.log" 2>&1 &
     
@@ -273,7 +273,7 @@ export interface ModelMetrics {
 export interface HorizonModelResult {
   model_type: string
   horizon_minutes: number
-  train_metrics: ModelMetrics
+  train_metrics: ModelMetrics | null
   test_metrics: ModelMetrics
   training_time_seconds: number
   mlflow_run_id: string
@@ -305,8 +305,24 @@ export interface TrainingStatus {
   message: string
 }
 
+export interface TrainingJob {
+  job_id: string
+  status: 'queued' | 'training' | 'completed' | 'failed'
+  status_url: string
+  created_at: string
+  finished_at?: string
+  message?: string
+  result?: TrainingResponse
+}
+
+// Interval between training job status polls
+const TRAINING_POLL_INTERVAL_MS = 2000
+
 /**
  * Train models for a specific station
+ *
+ * The ML service runs training as a background job; this polls the job
+ * until it finishes and returns the training result.
  */
 export async function trainModels(request: TrainingRequest): Promise<TrainingResponse> {
   try {
@@ -321,7 +337,29 @@ export async function trainModels(request: TrainingRequest): Promise<TrainingRes
       throw new Error(error.detail || 'Training failed')
     }
     
-    return await response.json()
+    let job: TrainingJob = await response.json()
+    
+    while (job.status === 'queued' || job.status === 'training') {
+      await new Promise((resolve) => setTimeout(resolve, TRAINING_POLL_INTERVAL_MS))
+      
+      const jobResponse = await fetch(`${ML_SERVICE_URL}${job.status_url}`, {
+        method: 'GET',
+        cache: 'no-store'
+      })
+      
+      if (!jobResponse.ok) {
+        const error = await jobResponse.json()
+        throw new Error(error.detail || 'Failed to get training job status')
+      }
+      
+      job = await jobResponse.json()
+    }
+    
+    if (job.status === 'failed' || !job.result) {
+      throw new Error(job.message || 'Training failed')
+    }
+    
+    return job.result
   } catch (error) {
     console.error('Error training models:', error)
     throw error
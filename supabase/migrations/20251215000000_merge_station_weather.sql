@@ -0,0 +1,73 @@
+-- Server-side nearest-timestamp join of station and weather measurements
+-- Equivalent to pandas merge_asof(direction='nearest') per station, so the
+-- ML service no longer has to download the un-joined weather table.
+-- The lateral lookup is served by the (station_id, measured_at) unique index.
+-- Pages are keyset-based: pass the last row's (measured_at, station_id) as
+-- p_after_* to continue after it, so earlier rows are never re-joined.
+
+-- Superseded OFFSET-paged signature
+DROP FUNCTION IF EXISTS "public"."merge_station_weather"(timestamp with time zone, timestamp with time zone, interval, integer, integer);
+
+-- Lets the (measured_at, station_id) ordering and keyset filter stream from an index
+CREATE INDEX IF NOT EXISTS "idx_station_measurements_time_station"
+    ON "public"."station_measurements" USING btree ("measured_at", "station_id");
+
+CREATE OR REPLACE FUNCTION "public"."merge_station_weather"(
+    "p_start" timestamp with time zone DEFAULT NULL,
+    "p_end" timestamp with time zone DEFAULT NULL,
+    "p_tol" interval DEFAULT interval '2 hours',
+    "p_limit" integer DEFAULT 1000,
+    "p_after_measured_at" timestamp with time zone DEFAULT NULL,
+    "p_after_station_id" bigint DEFAULT NULL
+)
+RETURNS TABLE (
+    "id" bigint,
+    "station_id" bigint,
+    "measured_at" timestamp with time zone,
+    "water_level" numeric,
+    "rainfall_1h" numeric,
+    "rainfall_6h" numeric,
+    "rainfall_12h" numeric,
+    "rainfall_24h" numeric,
+    "temperature" numeric,
+    "temp_min" numeric,
+    "temp_max" numeric,
+    "feels_like" numeric,
+    "pressure" numeric,
+    "humidity" numeric,
+    "wind_speed" numeric,
+    "wind_deg" numeric,
+    "rain_1h" numeric,
+    "clouds" numeric,
+    "visibility" numeric,
+    "weather_main" text,
+    "weather_description" text
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        s.id, s.station_id, s.measured_at, s.water_level,
+        s.rainfall_1h, s.rainfall_6h, s.rainfall_12h, s.rainfall_24h,
+        w.temperature, w.temp_min, w.temp_max, w.feels_like, w.pressure,
+        w.humidity, w.wind_speed, w.wind_deg, w.rain_1h, w.clouds,
+        w.visibility, w.weather_main, w.weather_description
+    FROM "public"."station_measurements" s
+    LEFT JOIN LATERAL (
+        SELECT wm.*
+        FROM "public"."weather_measurements" wm
+        WHERE wm.station_id = s.station_id
+          AND wm.measured_at BETWEEN s.measured_at - p_tol AND s.measured_at + p_tol
+        ORDER BY abs(extract(epoch FROM wm.measured_at - s.measured_at))
+        LIMIT 1
+    ) w ON true
+    WHERE (p_start IS NULL OR s.measured_at >= p_start)
+      AND (p_end IS NULL OR s.measured_at <= p_end)
+      AND (s.measured_at, s.station_id) >
+          (COALESCE(p_after_measured_at, '-infinity'::timestamptz), COALESCE(p_after_station_id, -1))
+    ORDER BY s.measured_at, s.station_id
+    LIMIT p_limit;
+$$;
+
+GRANT EXECUTE ON FUNCTION "public"."merge_station_weather"(timestamp with time zone, timestamp with time zone, interval, integer, timestamp with time zone, bigint) TO "anon";
+GRANT EXECUTE ON FUNCTION "public"."merge_station_weather"(timestamp with time zone, timestamp with time zone, interval, integer, timestamp with time zone, bigint) TO "authenticated";
+GRANT EXECUTE ON FUNCTION "public"."merge_station_weather"(timestamp with time zone, timestamp with time zone, interval, integer, timestamp with time zone, bigint) TO "service_role";